@@ -1,19 +1,199 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
 
 from django_scoped_permissions.models import ScopedPermission, ScopedPermissionGroup
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator which uses the planner's row estimate instead of `SELECT COUNT(*)` for
+    unfiltered querysets on PostgreSQL. Exact counts on tables with millions of rows
+    require a full scan, which makes every changelist page slow.
+
+    Filtered querysets, small tables and other database vendors fall back to an exact count.
+    """
+
+    # Estimates below this threshold are replaced by an exact count.
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, "query", None)
+
+        if query is not None and not query.where:
+            connection = connections[queryset.db]
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples FROM pg_class WHERE relname = %s",
+                        [queryset.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+
+                if row and row[0] >= self.estimate_threshold:
+                    return int(row[0])
+
+        return super().count
+
+
+def _through_count(m2m_field, column_name):
+    """
+    Create a subquery counting the rows of a many-to-many through table pointing to the outer object
+    via the foreign key `column_name`.
+    """
+    through = m2m_field.remote_field.through
+    counts = (
+        through.objects.filter(**{column_name: OuterRef("pk")})
+        .order_by()
+        .values(column_name)
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def _holder_count(model, exclude_model=None):
+    """
+    Sum the number of holders of `model` over every concrete many-to-many relation pointing to it,
+    e.g. `ScopedPermissionHolder.scoped_permissions` on all concrete holder models.
+    """
+    expression = Value(0)
+
+    for relation in model._meta.related_objects:
+        if not relation.many_to_many or relation.related_model is exclude_model:
+            continue
+
+        expression = expression + _through_count(
+            relation.field, relation.field.m2m_reverse_field_name()
+        )
+
+    return expression
+
+
+def _is_changelist(model_admin, request) -> bool:
+    """
+    Check whether a request is served by the changelist view of a model admin. The count annotations are
+    only shown there, and are left out of e.g. autocomplete and change views.
+    """
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is None:
+        return False
+
+    opts = model_admin.model._meta
+    return resolver_match.url_name == f"{opts.app_label}_{opts.model_name}_changelist"
+
+
 @admin.register(ScopedPermission)
 class ScopedPermissionAdmin(admin.ModelAdmin):
     list_display = (
         "__str__",
         "exact",
         "exclude",
+        "group_count",
+        "holder_count",
     )
+    list_filter = ("exact", "exclude")
+
+    # Searching uses a case sensitive prefix match on the scope, which can be served
+    # by the index on ScopedPermission.scope. See `get_search_results`.
+    search_fields = ("scope",)
+    ordering = ("pk",)
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if not _is_changelist(self, request):
+            return queryset
+
+        in_groups_field = ScopedPermissionGroup._meta.get_field("scoped_permissions")
+
+        return queryset.annotate(
+            group_count=_through_count(
+                in_groups_field, in_groups_field.m2m_reverse_field_name()
+            ),
+            holder_count=_holder_count(
+                ScopedPermission, exclude_model=ScopedPermissionGroup
+            ),
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        exclude = search_term.startswith("-")
+        if exclude:
+            search_term = search_term[1:]
+
+        exact = search_term.startswith("=")
+        if exact:
+            search_term = search_term[1:]
+
+        queryset = queryset.filter(scope__startswith=search_term)
+        if exclude:
+            queryset = queryset.filter(exclude=True)
+        if exact:
+            queryset = queryset.filter(exact=True)
+
+        return queryset, False
+
+    def group_count(self, obj):
+        return obj.group_count
+
+    group_count.short_description = "Groups"
+    group_count.admin_order_field = "group_count"
+
+    def holder_count(self, obj):
+        return obj.holder_count
+
+    holder_count.short_description = "Holders"
+    holder_count.admin_order_field = "holder_count"
 
 
 @admin.register(ScopedPermissionGroup)
 class ScopedPermissionGroupAdmin(admin.ModelAdmin):
-    list_display = ("name",)
+    list_display = ("name", "member_count", "holder_count")
+    search_fields = ("name",)
+    ordering = ("pk",)
+
+    autocomplete_fields = ("scoped_permissions",)
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if not _is_changelist(self, request):
+            return queryset
+
+        scoped_permissions_field = ScopedPermissionGroup._meta.get_field(
+            "scoped_permissions"
+        )
+
+        return queryset.annotate(
+            member_count=_through_count(
+                scoped_permissions_field,
+                scoped_permissions_field.m2m_field_name(),
+            ),
+            holder_count=_holder_count(ScopedPermissionGroup),
+        )
+
+    def member_count(self, obj):
+        return obj.member_count
+
+    member_count.short_description = "Permissions"
+    member_count.admin_order_field = "member_count"
+
+    def holder_count(self, obj):
+        return obj.holder_count
 
-    filter_horizontal = ("scoped_permissions",)
+    holder_count.short_description = "Holders"
+    holder_count.admin_order_field = "holder_count"
@@ -1,12 +1,113 @@
+from typing import Iterable, FrozenSet, List
+
+from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import AbstractUser
+from django.db.models import Q
+
+from django_scoped_permissions.core import GrantingScopeSet
+from django_scoped_permissions.models import (
+    ScopedPermissionHolder,
+    ScopedModelMixin,
+    clear_cached_granting_scopes,
+    get_cached_granting_scopes,
+)
+from django_scoped_permissions.querysets import scoped_permission_holders_filter
 
-from django_scoped_permissions.models import ScopedPermissionHolder, ScopedModelMixin
+PERM_CACHE_ATTRIBUTE = "_scoped_perm_cache"
 
 
 class ScopedAuthenticationBackend(ModelBackend):
+    """
+    Authentication backend answering permission checks with scoped permissions.
+
+    As in ModelBackend, inactive users have no permissions. Like the `_perm_cache` of ModelBackend, the
+    granting scopes of a user and the decision of every permission checked without an object are cached on
+    the user object, for as long as it lives. The granting scopes are shared with the views and GraphQL
+    types, see `get_cached_granting_scopes`. Fetch the user anew, or call `clear_cache`, after changing its
+    permissions.
+    """
+
+    def get_granting_scopes(self, user_obj: ScopedPermissionHolder) -> GrantingScopeSet:
+        """
+        Get the granting scopes of a user, resolved once per user object.
+        """
+        return get_cached_granting_scopes(user_obj)
+
+    def clear_cache(self, user_obj: AbstractUser) -> None:
+        """
+        Clear the cached granting scopes and permission decisions of a user.
+        """
+        clear_cached_granting_scopes(user_obj)
+        if hasattr(user_obj, PERM_CACHE_ATTRIBUTE):
+            delattr(user_obj, PERM_CACHE_ATTRIBUTE)
+
+    def _has_scoped_permission(self, user_obj: ScopedPermissionHolder, perm: str):
+        perm_cache = getattr(user_obj, PERM_CACHE_ATTRIBUTE, None)
+        if perm_cache is None:
+            perm_cache = {}
+            setattr(user_obj, PERM_CACHE_ATTRIBUTE, perm_cache)
+
+        try:
+            return perm_cache[perm]
+        except KeyError:
+            pass
+
+        # Holders overriding the matching itself cannot be answered from the granting scopes alone
+        if _uses_default_matching(user_obj):
+            decision = self.get_granting_scopes(user_obj).grants([perm])
+        else:
+            decision = user_obj.has_scoped_permissions(perm)
+
+        perm_cache[perm] = decision
+        return decision
+
     def has_perm(self, user_obj: AbstractUser, perm: str, obj=None):
-        if user_obj.is_anonymous:
+        if not user_obj.is_active or user_obj.is_anonymous:
+            return False
+
+        if user_obj.is_superuser:
+            return True
+
+        if not isinstance(user_obj, ScopedPermissionHolder):
+            return None
+
+        if not obj:
+            return self._has_scoped_permission(user_obj, perm)
+        elif isinstance(obj, ScopedModelMixin):
+            return self._has_object_permissions(user_obj, [perm], obj)
+        else:
+            return None
+
+    def _has_object_permissions(
+        self,
+        user_obj: ScopedPermissionHolder,
+        perm_list: List[str],
+        obj: ScopedModelMixin,
+    ) -> bool:
+        obj_type = type(obj)
+        verbs = [get_verb(perm, obj) for perm in perm_list]
+
+        # Objects overriding the deprecated `has_permission` or `can_be_accessed_by` decide for themselves
+        if obj_type.has_permission is not ScopedModelMixin.has_permission:
+            return all(obj.has_permission(user_obj, verb) for verb in verbs)
+        if obj_type.can_be_accessed_by is not ScopedModelMixin.can_be_accessed_by:
+            return all(obj.can_be_accessed_by(user_obj, verb) for verb in verbs)
+
+        granting_scopes = self.get_granting_scopes(user_obj)
+        required_scopes = obj.get_required_scopes()
+
+        return all(granting_scopes.grants(required_scopes, verb) for verb in verbs)
+
+    def has_perms(self, user_obj: AbstractUser, perm_list: Iterable[str], obj=None):
+        """
+        Check whether a user has all of the given permissions. The granting scopes of the user are
+        resolved at most once for all of them, as are the required scopes of `obj`, if given.
+
+        Django's `User.has_perms` calls `has_perm` once per permission, and never this method. Call it on
+        the backend directly to check several permissions against an object in one pass.
+        """
+        if not user_obj.is_active or user_obj.is_anonymous:
             return False
 
         if user_obj.is_superuser:
@@ -16,8 +117,118 @@ class ScopedAuthenticationBackend(ModelBackend):
             return None
 
         if not obj:
-            return user_obj.has_scoped_permissions(perm)
+            return all(
+                self._has_scoped_permission(user_obj, perm) for perm in perm_list
+            )
         elif isinstance(obj, ScopedModelMixin):
-            return obj.has_permission(user_obj, perm)
+            return self._has_object_permissions(user_obj, list(perm_list), obj)
         else:
             return None
+
+    def has_module_perms(self, user_obj: AbstractUser, app_label: str):
+        """
+        Check whether a user has any permission within an app, i.e. a granting scope below the scope
+        `app_label` which is not excluded, or a permission granting the scope `app_label` itself.
+        """
+        if not user_obj.is_active or user_obj.is_anonymous:
+            return False
+
+        if user_obj.is_superuser:
+            return True
+
+        if not isinstance(user_obj, ScopedPermissionHolder):
+            return False
+
+        if self._has_scoped_permission(user_obj, app_label):
+            return True
+
+        # Every including scope within the app is checked against the exclusions, with a leading wildcard
+        # standing in for the app, e.g. "*:1" for "invoice:1"
+        granting_scopes = self.get_granting_scopes(user_obj)
+        for scope in granting_scopes.include_exact + granting_scopes.include:
+            first_part, _, rest = scope.lstrip("=").partition(":")
+            if first_part not in (app_label, "*"):
+                continue
+
+            if granting_scopes.grants([f"{app_label}:{rest}" if rest else app_label]):
+                return True
+
+        return False
+
+    def get_all_permissions(self, user_obj: AbstractUser, obj=None) -> FrozenSet[str]:
+        """
+        Get the granting scopes of a user, from the cache.
+        """
+        if (
+            not user_obj.is_active
+            or user_obj.is_anonymous
+            or obj is not None
+            or not isinstance(user_obj, ScopedPermissionHolder)
+        ):
+            return frozenset()
+
+        return self.get_granting_scopes(user_obj).fingerprint
+
+    def with_perm(self, perm: str, is_active=True, include_superusers=True, obj=None):
+        """
+        Get the users whose scoped permissions, held directly or through groups, grant the scope `perm`,
+        or, if an object is given, grant access to the object with the verb of `perm`. The permissions are
+        matched in the database, see `scoped_permission_holders_filter`. By default, inactive users are
+        filtered out and superusers are included.
+
+        Only the scoped permissions stored in the database, i.e. the `resolved_scopes` of the users, are
+        matched. Scopes added by overrides of `get_granting_scopes`, e.g. "user:<id>", are not, so users
+        holding a permission only through such a scope are missing from the result.
+        """
+        if not isinstance(perm, str):
+            raise TypeError("The `perm` argument must be a string.")
+
+        UserModel = get_user_model()
+        if not issubclass(UserModel, ScopedPermissionHolder):
+            return UserModel._default_manager.none()
+
+        if obj is None:
+            user_q = scoped_permission_holders_filter(UserModel, [perm])
+        elif isinstance(obj, ScopedModelMixin):
+            user_q = scoped_permission_holders_filter(
+                UserModel, obj.get_required_scopes(), get_verb(perm, obj)
+            )
+        else:
+            return UserModel._default_manager.none()
+
+        # An empty filter already matches every user
+        if include_superusers and user_q:
+            user_q |= Q(is_superuser=True)
+        if is_active is not None:
+            user_q &= Q(is_active=is_active)
+
+        return UserModel._default_manager.filter(user_q)
+
+
+def _uses_default_matching(user_obj: ScopedPermissionHolder) -> bool:
+    user_type = type(user_obj)
+
+    return (
+        user_type.has_scoped_permissions
+        is ScopedPermissionHolder.has_scoped_permissions
+        and user_type.has_any_scoped_permissions
+        is ScopedPermissionHolder.has_any_scoped_permissions
+    )
+
+
+def get_verb(perm: str, obj=None) -> str:
+    """
+    Get the verb of a permission checked against an object. Django-style permissions "app_label.codename"
+    of the object's app are parsed into their action, e.g. "invoices.change_invoice" into "change", and
+    "invoices.approve" into "approve". Other permissions, e.g. "change" or "invoice:approve", are verbs as is.
+    """
+    app_label, dot, codename = perm.partition(".")
+    meta = getattr(obj, "_meta", None)
+    if not dot or meta is None or app_label != meta.app_label:
+        return perm
+
+    suffix = f"_{meta.model_name}"
+    if codename.endswith(suffix) and len(codename) > len(suffix):
+        return codename[: -len(suffix)]
+
+    return codename
@@ -0,0 +1,609 @@
+import inspect
+import itertools
+from typing import List, Union, Optional, Iterable
+
+from asgiref.sync import sync_to_async
+
+from django_scoped_permissions.core import GrantingScopeSet
+from django_scoped_permissions.guards import (
+    prepare_granting_scopes,
+    ScopedPermissionRequirement,
+    SPRUnOp,
+    SPRBinOp,
+    SPRAnd,
+    SPROr,
+    SPRXor,
+    SPRNot,
+)
+from django_scoped_permissions.util import (
+    ContextValues,
+    ScopeTemplate,
+    expand_scope_templates,
+    get_scope_template,
+)
+
+# Estimated relative costs of evaluating the different kinds of nodes. These are only used
+# to order the operands of AND and OR nodes when compiling with `reorder=True`.
+CONSTANT_COST = 0
+STATIC_SCOPE_COST = 1
+TEMPLATED_SCOPE_COST = 10
+CUSTOM_NODE_COST = 100
+
+
+class GuardStatistics:
+    """
+    Counters collected by a guard compiled with `collect_statistics=True`.
+
+    `evaluations` is the number of calls to `has_permission`, and `skipped_subtrees` the number of
+    operands of AND and OR nodes which were not evaluated due to short-circuiting.
+    """
+
+    def __init__(self):
+        self.evaluations = 0
+        self.skipped_subtrees = 0
+
+    def reset(self):
+        self.evaluations = 0
+        self.skipped_subtrees = 0
+
+    def __repr__(self):
+        return (
+            f"GuardStatistics(evaluations={self.evaluations}, "
+            f"skipped_subtrees={self.skipped_subtrees})"
+        )
+
+
+class PermissionCache(dict):
+    """
+    Cache of guard evaluation results, living for the duration of a single request.
+    See `get_permission_cache`.
+    """
+
+
+PERMISSION_CACHE_ATTRIBUTE = "_scoped_permission_cache"
+
+
+def get_permission_cache(request) -> Optional[PermissionCache]:
+    """
+    Get the PermissionCache of a request, e.g. `info.context` in GraphQL resolvers, creating
+    it on first access. Returns None if there is no request, or the cache cannot be attached to it.
+    """
+    if request is None:
+        return None
+
+    cache = getattr(request, PERMISSION_CACHE_ATTRIBUTE, None)
+    if isinstance(cache, PermissionCache):
+        return cache
+
+    cache = PermissionCache()
+    try:
+        setattr(request, PERMISSION_CACHE_ATTRIBUTE, cache)
+    except AttributeError:
+        return None
+
+    return cache
+
+
+def _freeze(value):
+    """
+    Convert a context value into a hashable value for use in a cache key. Raises TypeError
+    for values which cannot be hashed, e.g. dictionaries.
+    """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(item) for item in value)
+
+    hash(value)
+    return value
+
+
+class CompiledScopedPermissionGuard:
+    """
+    CompiledScopedPermissionGuard is the compiled form of a ScopedPermissionGuard, created
+    with `ScopedPermissionGuard.compile()`.
+
+    All node types of the guard tree are resolved once, at compile time, into plain
+    closures. Required scopes of every leaf are split into static scopes, which are used as-is,
+    and templated scopes, which are expanded from the context on evaluation. Boolean operators
+    short-circuit.
+
+    If compiled with `reorder=True`, the operands of AND and OR nodes are ordered by estimated
+    cost, so that cheap static checks run before templated ones. With `collect_statistics=True`,
+    the number of evaluations and skipped subtrees are counted in `statistics`.
+
+    `referenced_variables` contains the context variables the guard depends on, e.g.
+    `{"required_scopes", "input.facility"}`. The result of an evaluation is fully determined by
+    the granting scopes and the values of these variables, which allows `has_permission` to memoize
+    results in a per-request PermissionCache. Guards containing custom nodes may depend on anything,
+    and have `referenced_variables` set to None.
+
+    Before compilation, the guard tree is simplified: constant subtrees are folded, chains of AND and
+    OR nodes are flattened, and static scopes under an OR are merged into a single check.
+
+    The compiled guard is a drop-in replacement for the guard in any place where `has_permission` is called.
+    """
+
+    def __init__(
+        self,
+        guard: "ScopedPermissionGuard",
+        reorder: bool = False,
+        collect_statistics: bool = False,
+    ):
+        self.root = guard.root
+        self.statistics = GuardStatistics() if collect_statistics else None
+
+        compiler = _GuardCompiler(reorder=reorder, statistics=self.statistics)
+        self._evaluate, self.cost = compiler.compile_node(guard.root)
+        # The number of nodes remaining after simplification
+        self.node_count = compiler.node_count
+
+        self.referenced_variables = (
+            frozenset(compiler.variables) if compiler.is_memoizable else None
+        )  # type: Optional[frozenset]
+        # Sorted, so cache keys are built in a stable order
+        self._referenced_variables = sorted(compiler.variables)
+
+    def has_permission(
+        self,
+        granting_scopes: Union[List[str], str, GrantingScopeSet],
+        context=None,
+        cache: Optional[PermissionCache] = None,
+    ):
+        """
+        Check if the granting scopes pass the guard.
+
+        :param granting_scopes: The granting scopes, e.g. the result of `user.get_granting_scopes()`.
+        :param context: Context used to expand scope variables.
+        :param cache: An optional PermissionCache, see `get_permission_cache`. Results are memoized
+                      in the cache, keyed by the granting scopes and the referenced context variables.
+        """
+        if not context:
+            context = {}
+        if self.statistics is not None:
+            self.statistics.evaluations += 1
+
+        granting_scopes = GrantingScopeSet.coerce(granting_scopes)
+        # Variables are resolved once per evaluation, shared by the cache key and all leaves
+        values = ContextValues(context)
+
+        # Results for templated granting scopes depend on the context in ways the key does not capture
+        if (
+            cache is None
+            or self.referenced_variables is None
+            or granting_scopes.is_templated
+        ):
+            granting_scopes = prepare_granting_scopes(granting_scopes, values)
+            return self._evaluate(granting_scopes, values)
+
+        return self._evaluate_memoized(granting_scopes, values, cache)
+
+    async def has_permission_async(
+        self,
+        granting_scopes,
+        context=None,
+        cache: Optional[PermissionCache] = None,
+    ):
+        """
+        Async variant of `has_permission`. The granting scopes may also be awaitable, e.g.
+        `user.aget_granting_scopes()`.
+
+        Evaluation only touches the granting scopes and the context, and runs directly in the event loop.
+        Guards with custom nodes, which may do anything, are evaluated in a thread.
+        """
+        if inspect.isawaitable(granting_scopes):
+            granting_scopes = await granting_scopes
+
+        if self.referenced_variables is None:
+            return await sync_to_async(self.has_permission)(
+                granting_scopes, context, cache=cache
+            )
+
+        return self.has_permission(granting_scopes, context, cache=cache)
+
+    def has_permission_many(
+        self,
+        granting_scopes: Union[List[str], str, GrantingScopeSet],
+        contexts: Iterable,
+        cache: Optional[PermissionCache] = None,
+    ) -> List[bool]:
+        """
+        Check the granting scopes against the guard once per context, e.g. once per item of a
+        batch mutation, and return the decisions in the order of the contexts.
+
+        Unless they contain context variables, the granting scopes are prepared once for the whole batch.
+        Contexts with identical values for the referenced variables share a single evaluation, and
+        leaves expanding to identical sets of required scopes are only checked once.
+
+        :param granting_scopes: The granting scopes, e.g. the result of `user.get_granting_scopes()`.
+        :param contexts: One context per item.
+        :param cache: An optional PermissionCache, see `get_permission_cache`.
+        """
+        granting_scopes = GrantingScopeSet.coerce(granting_scopes)
+
+        if granting_scopes.is_templated:
+            return [
+                self.has_permission(granting_scopes, context, cache=cache)
+                for context in contexts
+            ]
+
+        batch_scopes = _BatchGrantingScopeSet(granting_scopes)
+        if cache is None or self.referenced_variables is None:
+            cache = PermissionCache()
+
+        results = []
+        for context in contexts:
+            if self.statistics is not None:
+                self.statistics.evaluations += 1
+
+            values = ContextValues(context or {})
+            if self.referenced_variables is None:
+                results.append(bool(self._evaluate(batch_scopes, values)))
+            else:
+                results.append(
+                    bool(self._evaluate_memoized(batch_scopes, values, cache))
+                )
+
+        return results
+
+    def _evaluate_memoized(
+        self, granting_scopes: GrantingScopeSet, values: ContextValues, cache
+    ):
+        try:
+            key = (
+                self,
+                granting_scopes.fingerprint,
+                tuple(
+                    _freeze(values.get(variable))
+                    for variable in self._referenced_variables
+                ),
+            )
+            return cache[key]
+        except TypeError:
+            # Unhashable context values, we cannot memoize
+            return self._evaluate(granting_scopes, values)
+        except KeyError:
+            result = self._evaluate(granting_scopes, values)
+            cache[key] = result
+            return result
+
+    def compile(self):
+        return self
+
+    def __len__(self):
+        # Temporary to work around graphene-django-cuds length requirement for permissions
+        return 1
+
+
+class _BatchGrantingScopeSet(GrantingScopeSet):
+    """
+    A prepared GrantingScopeSet which memoizes `grants` by the required scopes, for the duration of
+    a single batch evaluation. Leaves of many items often expand to identical sets of required scopes.
+    """
+
+    def __init__(self, granting_scopes: GrantingScopeSet):
+        # Share the partitions of the prepared set instead of partitioning again
+        self.__dict__.update(granting_scopes.__dict__)
+        self._decisions = {}
+
+    def grants(self, required_scopes: Iterable[str], verb: Optional[str] = None):
+        key = (frozenset(required_scopes), verb)
+
+        try:
+            return self._decisions[key]
+        except KeyError:
+            result = self._decisions[key] = super().grants(list(key[0]), verb)
+            return result
+
+
+class _Constant:
+    __slots__ = ("value",)
+
+    def __init__(self, value: bool):
+        self.value = value
+
+
+class _Leaf:
+    """
+    A check of required scopes against the granting scopes. Merged leaves keep the scopes of every
+    original leaf in `groups`, to check them one by one against granting scopes with exclusions.
+    """
+
+    __slots__ = ("templates", "verb", "groups")
+
+    def __init__(self, templates: List[ScopeTemplate], verb=None, groups=None):
+        self.templates = templates
+        self.verb = verb
+        self.groups = groups
+
+    @property
+    def is_static(self):
+        return all(template.is_static for template in self.templates)
+
+
+class _Not:
+    __slots__ = ("operand",)
+
+    def __init__(self, operand):
+        self.operand = operand
+
+
+class _Xor:
+    __slots__ = ("lhs", "rhs")
+
+    def __init__(self, lhs, rhs):
+        self.lhs = lhs
+        self.rhs = rhs
+
+
+class _NAry:
+    """
+    An n-ary AND (is_or=False) or OR (is_or=True) node.
+    """
+
+    __slots__ = ("is_or", "operands")
+
+    def __init__(self, is_or: bool, operands: list):
+        self.is_or = is_or
+        self.operands = operands
+
+
+class _Custom:
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+
+class _GuardCompiler:
+    """
+    Compiles nodes of a guard tree into evaluation functions with the signature
+    `evaluate(granting_scopes: GrantingScopeSet, values: ContextValues) -> bool`.
+
+    Compilation happens in two passes. The guard tree is first simplified into an intermediate tree:
+    constant subtrees are folded, chains of AND and OR nodes are flattened into n-ary nodes, and
+    static leaves of the same verb under an OR are merged into a single leaf. The simplified tree
+    is then compiled into closures. Every compile method returns a tuple of the evaluation function
+    and its estimated cost.
+    """
+
+    def __init__(self, reorder=False, statistics=None):
+        self.reorder = reorder
+        self.statistics = statistics
+
+        # The context variables referenced by the compiled nodes. Custom nodes may
+        # reference anything, which makes the guard unsafe to memoize.
+        self.variables = set()
+        self.is_memoizable = True
+        self.node_count = 0
+
+    def compile_node(self, node):
+        return self.compile(self.simplify_node(node))
+
+    # Simplification
+
+    def simplify_value(self, value):
+        """
+        Simplify the value of an SPRUnOp, mirroring the dispatch of `guards._evaluate_value`.
+        """
+        if isinstance(value, (SPRBinOp, SPRUnOp)):
+            return self.simplify_node(value)
+        elif isinstance(value, str):
+            return _Leaf([get_scope_template(value)])
+        elif isinstance(value, list):
+            if len(value) == 0:
+                # Empty required scopes are always granted
+                return _Constant(True)
+            return _Leaf([get_scope_template(scope) for scope in value])
+        elif isinstance(value, ScopedPermissionRequirement):
+            return _Leaf([value.template], value.verb)
+        elif isinstance(value, bool):
+            return _Constant(value)
+        else:
+            return _Constant(False)
+
+    def simplify_node(self, node):
+        node_type = type(node)
+
+        if node_type is SPRNot:
+            operand = self.simplify_value(node.value)
+            if isinstance(operand, _Constant):
+                return _Constant(not operand.value)
+            return _Not(operand)
+        elif node_type is SPRUnOp:
+            return self.simplify_value(node.value)
+        elif node_type is SPRAnd:
+            return self.simplify_n_ary(node, is_or=False)
+        elif node_type is SPROr:
+            return self.simplify_n_ary(node, is_or=True)
+        elif node_type is SPRXor:
+            lhs = self.simplify_value(node.lhs)
+            rhs = self.simplify_value(node.rhs)
+            if isinstance(lhs, _Constant) and isinstance(rhs, _Constant):
+                return _Constant(bool(lhs.value) != bool(rhs.value))
+            return _Xor(lhs, rhs)
+
+        return _Custom(node)
+
+    def simplify_n_ary(self, node, is_or: bool):
+        operands = []
+
+        for value in (node.lhs, node.rhs):
+            operand = self.simplify_value(value)
+
+            # AND and OR are associative, so nested chains of the same operator are flattened
+            if isinstance(operand, _NAry) and operand.is_or == is_or:
+                operands.extend(operand.operands)
+            else:
+                operands.append(operand)
+
+        # Fold constants. `is_or` short-circuits the node, while `not is_or` has no effect.
+        folded = []
+        for operand in operands:
+            if isinstance(operand, _Constant):
+                if bool(operand.value) == is_or:
+                    return _Constant(is_or)
+                continue
+            folded.append(operand)
+
+        if is_or:
+            folded = self.merge_static_leaves(folded)
+
+        if len(folded) == 0:
+            return _Constant(not is_or)
+        if len(folded) == 1:
+            return folded[0]
+
+        return _NAry(is_or, folded)
+
+    def merge_static_leaves(self, operands: list) -> list:
+        """
+        Merge the static leaves of an OR node with the same verb into a single leaf, placed at the position
+        of the first of them.
+        """
+        merged = {}
+        result = []
+
+        for operand in operands:
+            if not isinstance(operand, _Leaf) or not operand.is_static:
+                result.append(operand)
+                continue
+
+            groups = operand.groups or [operand.templates]
+            leaf = merged.get(operand.verb)
+            if leaf is None:
+                leaf = merged[operand.verb] = _Leaf(
+                    list(operand.templates), operand.verb, list(groups)
+                )
+                result.append(leaf)
+            else:
+                leaf.templates.extend(operand.templates)
+                leaf.groups.extend(groups)
+
+        return result
+
+    # Compilation
+
+    def compile(self, node):
+        self.node_count += 1
+
+        if isinstance(node, _Leaf):
+            return self.compile_leaf(node)
+        elif isinstance(node, _Constant):
+            return self.compile_constant(node.value)
+        elif isinstance(node, _Not):
+            operand, cost = self.compile(node.operand)
+
+            def evaluate_not(granting_scopes, values):
+                return not operand(granting_scopes, values)
+
+            return evaluate_not, cost
+        elif isinstance(node, _NAry):
+            return self.compile_n_ary(node)
+        elif isinstance(node, _Xor):
+            lhs, lhs_cost = self.compile(node.lhs)
+            rhs, rhs_cost = self.compile(node.rhs)
+
+            def evaluate_xor(granting_scopes, values):
+                return bool(lhs(granting_scopes, values)) != bool(
+                    rhs(granting_scopes, values)
+                )
+
+            return evaluate_xor, lhs_cost + rhs_cost
+
+        return self.compile_custom(node.node)
+
+    def compile_leaf(self, leaf: _Leaf):
+        templates = leaf.templates
+        verb = leaf.verb
+
+        static_scopes = [template.scope for template in templates if template.is_static]
+        templated = [template for template in templates if not template.is_static]
+        cost = (
+            len(static_scopes) * STATIC_SCOPE_COST
+            + len(templated) * TEMPLATED_SCOPE_COST
+        )
+
+        for template in templated:
+            self.variables.update(template.variables)
+
+        if leaf.groups is not None and len(leaf.groups) > 1:
+            groups = [[template.scope for template in group] for group in leaf.groups]
+
+            def evaluate_merged(granting_scopes, values):
+                # Without exclusions, an OR of leaves is granted exactly when their combined scopes are.
+                # Exclusions apply to the required scopes as a whole, so every leaf is checked on its own.
+                if not granting_scopes.has_exclusions:
+                    return granting_scopes.grants(static_scopes, verb)
+                return any(granting_scopes.grants(group, verb) for group in groups)
+
+            return evaluate_merged, cost
+
+        if not templated:
+
+            def evaluate_static(granting_scopes, values):
+                return granting_scopes.grants(static_scopes, verb)
+
+            return evaluate_static, cost
+
+        def evaluate_templated(granting_scopes, values):
+            # Expanded lazily, so expansion stops as soon as a scope is granted
+            scopes = itertools.chain(
+                static_scopes, expand_scope_templates(templated, values)
+            )
+            return granting_scopes.grants(scopes, verb)
+
+        return evaluate_templated, cost
+
+    def compile_constant(self, value: bool):
+        def evaluate_constant(granting_scopes, values):
+            return value
+
+        return evaluate_constant, CONSTANT_COST
+
+    def compile_custom(self, node):
+        # Custom node types are evaluated through their own `has_permission`. They receive the
+        # prepared GrantingScopeSet, which they will not expand again.
+        def evaluate_node(granting_scopes, values):
+            return node.has_permission(granting_scopes, values.context)
+
+        self.is_memoizable = False
+
+        return evaluate_node, CUSTOM_NODE_COST
+
+    def compile_n_ary(self, node: _NAry):
+        """
+        Compile an n-ary AND (is_or=False) or OR (is_or=True) node. Evaluation stops as soon
+        as an operand evaluates to `is_or`.
+        """
+        operands = [self.compile(operand) for operand in node.operands]
+
+        # Evaluation has no side-effects, so the operands of AND and OR commute.
+        if self.reorder:
+            operands.sort(key=lambda operand: operand[1])
+
+        cost = sum(operand_cost for _, operand_cost in operands)
+        evaluates = tuple(evaluate for evaluate, _ in operands)
+        short_circuit_on = node.is_or
+        statistics = self.statistics
+
+        if statistics is not None:
+
+            def evaluate_counted(granting_scopes, values):
+                for index, evaluate in enumerate(evaluates):
+                    if bool(evaluate(granting_scopes, values)) == short_circuit_on:
+                        statistics.skipped_subtrees += len(evaluates) - index - 1
+                        return short_circuit_on
+                return not short_circuit_on
+
+            return evaluate_counted, cost
+
+        if short_circuit_on:
+
+            def evaluate_or(granting_scopes, values):
+                return any(evaluate(granting_scopes, values) for evaluate in evaluates)
+
+            return evaluate_or, cost
+
+        def evaluate_and(granting_scopes, values):
+            return all(evaluate(granting_scopes, values) for evaluate in evaluates)
+
+        return evaluate_and, cost
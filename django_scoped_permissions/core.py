@@ -1,4 +1,4 @@
-from typing import Any, Union, Optional
+from typing import Any, Union, Optional, Iterable
 from django.db.models import Model
 from django.db.models.base import ModelBase
 
@@ -50,11 +50,32 @@ def scopes_grant_permissions(
         4. If the user has a scope that matches any of the scopes, we return True.
         5. Return False
     """
+    if isinstance(granting_scopes, GrantingScopeSet):
+        return granting_scopes.grants(required_scopes, verb)
+
+    if not isinstance(required_scopes, (list, tuple)):
+        required_scopes = list(required_scopes)
+
     if len(required_scopes) == 0:
         return True
 
-    exclude_exact, include_exact, exclude, include = partition_scopes(granting_scopes)
+    return _partitioned_scopes_grant_permissions(
+        required_scopes, *partition_scopes(granting_scopes), verb=verb
+    )
 
+
+def _partitioned_scopes_grant_permissions(
+    required_scopes: [str],
+    exclude_exact: [str],
+    include_exact: [str],
+    exclude: [str],
+    include: [str],
+    verb: Optional[str] = None,
+):
+    """
+    Implementation of `scopes_grant_permissions` for granting scopes which have already been partitioned
+    with `partition_scopes`.
+    """
     required_base_scopes_with_verb = expand_scopes_with_verb(required_scopes, verb)
     required_scopes_with_verb = expand_scopes_with_verb_recursively(
         required_scopes, verb
@@ -79,6 +100,98 @@ def scopes_grant_permissions(
     return False
 
 
+class GrantingScopeSet:
+    """
+    GrantingScopeSet is a set of granting scopes prepared for repeated permission checks.
+
+    The scopes are partitioned once, as opposed to on every call to `scopes_grant_permissions`, and we
+    precompute whether any of the scopes contains a context variable, e.g. "company:{context.company.id}".
+    Granting scopes without variables never have to be expanded from a context.
+
+    A GrantingScopeSet can be passed anywhere a list of granting scopes is accepted.
+    """
+
+    def __init__(self, scopes: Iterable[str]):
+        self.scopes = tuple(scopes)
+        self.is_templated = any("{" in scope for scope in self.scopes)
+        (
+            self.exclude_exact,
+            self.include_exact,
+            self.exclude,
+            self.include,
+        ) = partition_scopes(self.scopes)
+        self._fingerprint = None
+
+    @classmethod
+    def coerce(cls, scopes: Union[Iterable[str], str, "GrantingScopeSet"]):
+        """
+        Convert a single scope or an iterable of scopes into a GrantingScopeSet. Sets are returned as-is.
+        """
+        if isinstance(scopes, GrantingScopeSet):
+            return scopes
+        if isinstance(scopes, str):
+            scopes = [scopes]
+        return cls(scopes)
+
+    @property
+    def fingerprint(self) -> frozenset:
+        """
+        A hashable value identifying the set. Two sets have equal fingerprints if and only if
+        they contain the same scopes, regardless of order and duplicates.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = frozenset(self.scopes)
+        return self._fingerprint
+
+    @property
+    def has_exclusions(self):
+        return bool(self.exclude_exact or self.exclude)
+
+    def grants(self, required_scopes: Iterable[str], verb: Optional[str] = None):
+        """
+        Equivalent to `scopes_grant_permissions(required_scopes, self.scopes, verb)`.
+
+        The required scopes may be any iterable, including a lazy generator. Without exclusions,
+        the required scopes are granted as soon as a single one of them is, so iteration stops
+        at the first match.
+        """
+        if not self.has_exclusions:
+            is_empty = True
+            for required_scope in required_scopes:
+                is_empty = False
+                if _partitioned_scopes_grant_permissions(
+                    [required_scope], [], self.include_exact, [], self.include, verb
+                ):
+                    return True
+
+            # Empty required scopes are always granted
+            return is_empty
+
+        if not isinstance(required_scopes, (list, tuple)):
+            required_scopes = list(required_scopes)
+
+        if len(required_scopes) == 0:
+            return True
+
+        return _partitioned_scopes_grant_permissions(
+            required_scopes,
+            self.exclude_exact,
+            self.include_exact,
+            self.exclude,
+            self.include,
+            verb=verb,
+        )
+
+    def __iter__(self):
+        return iter(self.scopes)
+
+    def __len__(self):
+        return len(self.scopes)
+
+    def __repr__(self):
+        return f"GrantingScopeSet({list(self.scopes)!r})"
+
+
 def any_scope_matches(required_scopes: [str], scopes: [str]):
     """
     Check if any of the given scopes matches any of the required_scopes.
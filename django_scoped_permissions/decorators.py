@@ -1,8 +1,44 @@
+import asyncio
 from functools import wraps
 
+from asgiref.sync import sync_to_async
 from django.core.exceptions import PermissionDenied
 
+from django_scoped_permissions.compiler import get_permission_cache
 from django_scoped_permissions.guards import ScopedPermissionGuard
+from django_scoped_permissions.models import get_cached_granting_scopes
+
+
+def _get_authenticated_user(request):
+    """
+    Get the user of a request, or None if the request has no user or the user is anonymous.
+    """
+    user = getattr(request, "user", None)
+    if not user or user.is_anonymous:
+        return None
+
+    return user
+
+
+async def _aget_authenticated_user(request):
+    """
+    Async variant of `_get_authenticated_user`. The lazy user set by Django's AuthenticationMiddleware
+    queries the session when it is first accessed, so it is resolved with `request.auser()` where it exists,
+    and in a thread otherwise.
+    """
+    auser = getattr(request, "auser", None)
+    if not callable(auser):
+        return await sync_to_async(_get_authenticated_user)(request)
+
+    user = await auser()
+    if not user or user.is_anonymous:
+        return None
+
+    return user
+
+
+async def _aget_granting_scopes(user):
+    return await sync_to_async(get_cached_granting_scopes)(user)
 
 
 def gql_has_scoped_permissions(
@@ -22,11 +58,42 @@ def gql_has_scoped_permissions(
     :param fail_message: If fail_to_none is false, and the permission fails, this variable determines
                          the string which is thrown in the exception.
     :return:
+
+    The granting scopes of the user are resolved once, see `get_cached_granting_scopes`. Coroutine
+    functions are wrapped in an async wrapper, which resolves the granting scopes in a thread and
+    evaluates the guard without leaving the event loop. The lazy user of the request is resolved before it is
+    used, with `request.auser()` where it exists.
     """
 
-    guard = ScopedPermissionGuard(*args, **kwargs)
+    guard = ScopedPermissionGuard(*args, **kwargs).compile()
 
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(cls, info, *args, **kwargs):
+                if not hasattr(info, "context") or not hasattr(info.context, "user"):
+                    raise PermissionDenied(fail_message)
+
+                user = await _aget_authenticated_user(info.context)
+                if user is None:
+                    raise PermissionDenied(fail_message)
+
+                context = {}
+                context["context"] = info.context
+                context["user"] = user
+
+                if not await guard.has_permission_async(
+                    _aget_granting_scopes(user),
+                    context,
+                    cache=get_permission_cache(context["context"]),
+                ):
+                    raise PermissionDenied(fail_message)
+
+                return await func(cls, info, *args, **kwargs)
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(cls, info, *args, **kwargs):
             if not hasattr(info, "context") or not hasattr(info.context, "user"):
@@ -40,7 +107,11 @@ def gql_has_scoped_permissions(
             context["context"] = info.context
             context["user"] = info.context.user
 
-            if not guard.has_permission(user.get_granting_scopes(), context):
+            if not guard.has_permission(
+                get_cached_granting_scopes(user),
+                context,
+                cache=get_permission_cache(context["context"]),
+            ):
                 raise PermissionDenied(fail_message)
 
             return func(cls, info, *args, **kwargs)
@@ -55,9 +126,35 @@ def function_has_scoped_permissions(
     fail_message: str = "You are not permitted to view this",
     **kwargs,
 ):
-    guard = ScopedPermissionGuard(*args, **kwargs)
+    guard = ScopedPermissionGuard(*args, **kwargs).compile()
 
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not hasattr(request, "user"):
+                    raise PermissionDenied(fail_message)
+
+                user = await _aget_authenticated_user(request)
+                if user is None:
+                    raise PermissionDenied(fail_message)
+
+                context = {}
+                context["context"] = request
+                context["user"] = user
+
+                if not await guard.has_permission_async(
+                    _aget_granting_scopes(user),
+                    context,
+                    cache=get_permission_cache(context["context"]),
+                ):
+                    raise PermissionDenied(fail_message)
+
+                return await func(request, *args, **kwargs)
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(request, *args, **kwargs):
             if not hasattr(request, "user"):
@@ -71,7 +168,11 @@ def function_has_scoped_permissions(
             context["context"] = request
             context["user"] = request.user
 
-            if not guard.has_permission(user.get_granting_scopes(), context):
+            if not guard.has_permission(
+                get_cached_granting_scopes(user),
+                context,
+                cache=get_permission_cache(context["context"]),
+            ):
                 raise PermissionDenied(fail_message)
 
             return func(request, *args, **kwargs)
@@ -0,0 +1,186 @@
+from functools import lru_cache
+from typing import List
+
+from django_scoped_permissions.guards import (
+    ScopedPermissionGuard,
+    ScopedPermissionRequirement,
+    SPRAnd,
+    SPROr,
+    SPRXor,
+    SPRNot,
+    SPRUnOp,
+)
+
+OPERATOR_CHARACTERS = "&|^!~()"
+CONSTANTS = {"true": True, "false": False}
+
+# Token kinds
+OPERATOR = "operator"
+SCOPE = "scope"
+CONSTANT = "constant"
+END = "end"
+
+
+class GuardExpressionError(ValueError):
+    """
+    Raised when a guard expression cannot be parsed.
+    """
+
+    def __init__(self, message: str, expression: str, position: int):
+        super().__init__(f"{message} at position {position} in {expression!r}")
+        self.expression = expression
+        self.position = position
+
+
+def _tokenize(expression: str) -> List[tuple]:
+    tokens = []
+    position = 0
+    length = len(expression)
+
+    while position < length:
+        character = expression[position]
+
+        if character.isspace():
+            position += 1
+            continue
+
+        if character in OPERATOR_CHARACTERS:
+            tokens.append((OPERATOR, character, position))
+            position += 1
+            continue
+
+        start = position
+        while position < length:
+            character = expression[position]
+            if character.isspace() or character in OPERATOR_CHARACTERS:
+                break
+
+            if character == "{":
+                end = expression.find("}", position)
+                if end == -1:
+                    raise GuardExpressionError(
+                        "Unterminated context variable", expression, position
+                    )
+                position = end
+            position += 1
+
+        text = expression[start:position]
+        if text in CONSTANTS:
+            tokens.append((CONSTANT, CONSTANTS[text], start))
+        else:
+            tokens.append((SCOPE, text, start))
+
+    tokens.append((END, None, length))
+    return tokens
+
+
+def _parse_scope(text: str, expression: str, position: int):
+    # The verb follows the last "@" outside of context variables
+    verb = None
+    depth = 0
+    separator = -1
+
+    for index, character in enumerate(text):
+        if character == "{":
+            depth += 1
+        elif character == "}":
+            depth -= 1
+        elif character == "@" and depth == 0:
+            separator = index
+
+    if separator != -1:
+        text, verb = text[:separator], text[separator + 1 :]
+        if not text or not verb:
+            raise GuardExpressionError("Invalid scope or verb", expression, position)
+
+    return SPRUnOp(ScopedPermissionRequirement(text, verb))
+
+
+class _Parser:
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.index = 0
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def advance(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def accept(self, operator: str) -> bool:
+        kind, value, _ = self.peek()
+        if kind == OPERATOR and value == operator:
+            self.index += 1
+            return True
+        return False
+
+    def error(self, message: str):
+        raise GuardExpressionError(message, self.expression, self.peek()[2])
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek()[0] != END:
+            self.error("Unexpected token")
+        return node
+
+    def parse_or(self):
+        node = self.parse_xor()
+        while self.accept("|"):
+            node = SPROr(node, self.parse_xor())
+        return node
+
+    def parse_xor(self):
+        node = self.parse_and()
+        while self.accept("^"):
+            node = SPRXor(node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_unary()
+        while self.accept("&"):
+            node = SPRAnd(node, self.parse_unary())
+        return node
+
+    def parse_unary(self):
+        if self.accept("!") or self.accept("~"):
+            return SPRNot(self.parse_unary())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        if self.accept("("):
+            node = self.parse_or()
+            if not self.accept(")"):
+                self.error("Expected ')'")
+            return node
+
+        kind, value, position = self.peek()
+        if kind == SCOPE:
+            self.advance()
+            return _parse_scope(value, self.expression, position)
+        if kind == CONSTANT:
+            self.advance()
+            return SPRUnOp(value)
+
+        self.error("Expected a scope, a constant or '('")
+
+
+def parse_guard(expression: str) -> ScopedPermissionGuard:
+    """
+    Parse a guard expression, e.g. "(company:{input.company}@create | user:create) & !-=user:1", into a
+    ScopedPermissionGuard. The operators are `|`, `^`, `&` and `!` or `~`, in order of increasing precedence.
+    A verb is appended to a scope with "@". Raises a GuardExpressionError if the expression is invalid.
+    """
+    return ScopedPermissionGuard(_Parser(expression).parse())
+
+
+@lru_cache(maxsize=1024)
+def compile_guard(expression: str) -> "CompiledScopedPermissionGuard":
+    """
+    Parse and compile a guard expression. Compiled guards are cached for the lifetime of the process,
+    keyed by the text of the expression, so guards built dynamically, e.g. in `get_permissions`, are
+    only parsed and compiled once.
+    """
+    return parse_guard(expression).compile()
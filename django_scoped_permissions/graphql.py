@@ -1,8 +1,16 @@
-from typing import Tuple, Mapping, Union, Iterable, List
+from functools import lru_cache
+from typing import Tuple, Mapping, Union, Iterable, List, Optional, Dict, Callable
 
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from django.db.models import QuerySet
+import graphene
 from graphene import Node
-from graphene_django import DjangoObjectType
+from graphene.utils.str_converters import to_camel_case
+from graphene_django import DjangoObjectType, DjangoConnectionField
+from graphene_django.registry import get_global_registry
 from graphene_django.types import DjangoObjectTypeOptions
+from graphene_django.utils import maybe_queryset
 from graphene_django_cud.mutations import (
     DjangoPatchMutation,
     DjangoDeleteMutation,
@@ -10,23 +18,44 @@ from graphene_django_cud.mutations import (
     DjangoBatchDeleteMutation,
     DjangoFilterDeleteMutation,
 )
+from graphene_django_cud.mutations.batch_create import DjangoBatchCreateMutationOptions
+from graphene_django_cud.mutations.batch_delete import DjangoBatchDeleteMutationOptions
 from graphene_django_cud.mutations.create import DjangoCreateMutation
 from graphene_django_cud.mutations.delete import DjangoDeleteMutationOptions
+from graphene_django_cud.mutations.filter_delete import (
+    DjangoFilterDeleteMutationOptions,
+)
 from graphene_django_cud.mutations.patch import DjangoPatchMutationOptions
 from graphene_django_cud.mutations.update import (
     DjangoUpdateMutationOptions,
     DjangoUpdateMutation,
 )
-from graphql import GraphQLError
+from graphql import GraphQLError, ResolveInfo
+from graphql_relay import to_global_id
 
+from django_scoped_permissions.compiler import (
+    CompiledScopedPermissionGuard,
+    get_permission_cache,
+)
 from django_scoped_permissions.guards import ScopedPermissionGuard
 from django_scoped_permissions.models import (
     ScopedModelMixin,
     ScopedPermissionHolderMixin,
+    can_be_accessed_by_many,
+    get_cached_granting_scopes,
+)
+from django_scoped_permissions.querysets import (
+    PERMISSION_CHECK_CHUNK_SIZE,
+    chunks,
+    filter_in_batches,
+    get_scope_patterns,
+    scoped_permission_filter,
 )
 from django_scoped_permissions.util import (
     create_resolver_from_method,
     create_resolver_from_scopes,
+    get_field_permission_loader,
+    has_field_permission,
 )
 
 
@@ -34,9 +63,37 @@ class ScopedDjangoNodeOptions(DjangoObjectTypeOptions):
     allow_anonymous = False  # type: bool
     node_permissions = None  # type: Tuple[str]
     field_permissions = None  # type: Mapping[str, Union[bool, Tuple[str]]]
+    # Field name to compiled guard, or to a method for method permissions
+    field_permission_guards = None  # type: Mapping[str, object]
+    field_permissions_in_middleware = False  # type: bool
+    batch_field_permissions = False  # type: bool
     verb = "read"  # type: str
 
 
+def _compile_field_permissions(
+    field_permissions: Mapping,
+) -> Dict[str, Union[CompiledScopedPermissionGuard, Callable]]:
+    """
+    Compile the field permissions of a ScopedDjangoNode into a map of field name to compiled guard. Methods
+    are kept as-is.
+    """
+    guards = {}
+
+    for field, permissions in field_permissions.items():
+        if callable(permissions):
+            guards[field] = permissions
+        elif isinstance(permissions, (tuple, list, ScopedPermissionGuard)):
+            guards[field] = ScopedPermissionGuard(permissions).compile()
+        elif isinstance(permissions, str):
+            guards[field] = ScopedPermissionGuard([permissions]).compile()
+        else:
+            raise ValueError(
+                f"Invalid field type {type(permissions)} given to ScopedDjangoNode for field {field}"
+            )
+
+    return guards
+
+
 class ScopedDjangoNode(DjangoObjectType):
     class Meta:
         abstract = True
@@ -48,6 +105,8 @@ class ScopedDjangoNode(DjangoObjectType):
         field_permissions=None,
         allow_anonymous=False,
         verb="read",
+        field_permissions_in_middleware=False,
+        batch_field_permissions=False,
         _meta=None,
         **options,
     ):
@@ -63,71 +122,52 @@ class ScopedDjangoNode(DjangoObjectType):
         # Great, the class is set up. Now let's add permission guards.
         field_permissions = field_permissions or {}
 
-        permission_guard = ScopedPermissionGuard(node_permissions)
+        permission_guard = ScopedPermissionGuard(node_permissions).compile()
         _meta.permission_guard = permission_guard
 
+        _meta.field_permission_guards = _compile_field_permissions(field_permissions)
+        _meta.field_permissions_in_middleware = field_permissions_in_middleware
+        _meta.batch_field_permissions = batch_field_permissions
+
         super().__init_subclass_with_meta__(
             _meta=_meta, interfaces=interfaces, **options
         )
 
-        for field, permissions in field_permissions.items():
-            if callable(permissions):
-                if hasattr(cls, f"resolve_{field}"):
-                    continue
-
+        for field, guard in _meta.field_permission_guards.items():
+            # Fields are guarded by the ScopedPermissionGraphQLMiddleware instead
+            if field_permissions_in_middleware:
+                resolver = getattr(cls, f"resolve_{field}", None)
                 setattr(
                     cls,
                     f"resolve_{field}",
-                    create_resolver_from_method(field, permissions),
+                    _require_field_permission_middleware(field, resolver),
                 )
-            elif isinstance(permissions, tuple) or isinstance(permissions, list):
-                if hasattr(cls, f"resolve_{field}"):
-                    continue
+                continue
 
-                setattr(
-                    cls,
-                    f"resolve_{field}",
-                    create_resolver_from_scopes(field, permissions),
-                )
-            elif isinstance(permissions, str):
-                if hasattr(cls, f"resolve_{field}"):
-                    continue
+            if hasattr(cls, f"resolve_{field}"):
+                continue
 
-                setattr(
-                    cls,
-                    f"resolve_{field}",
-                    create_resolver_from_scopes(field, [permissions]),
-                )
-            elif isinstance(permissions, ScopedPermissionGuard):
-                if hasattr(cls, f"resolve_{field}"):
-                    continue
-
-                setattr(
-                    cls,
-                    f"resolve_{field}",
-                    create_resolver_from_scopes(field, permissions),
+            if isinstance(guard, CompiledScopedPermissionGuard):
+                resolver = create_resolver_from_scopes(
+                    field, guard, batched=batch_field_permissions
                 )
             else:
-                raise ValueError(
-                    f"Invalid field type {type(permissions)} given to ScopedDjangoNode for field {field}"
-                )
+                resolver = create_resolver_from_method(field, guard)
+
+            setattr(cls, f"resolve_{field}", resolver)
 
     @classmethod
-    def get_node(cls, info, id):
+    def _get_user(cls, info):
         user = info.context.user
         if not cls._meta.allow_anonymous and not isinstance(
             user, ScopedPermissionHolderMixin
         ):
             raise GraphQLError("You are not permitted to view this.")
 
-        granting_permissions = (
-            user.get_granting_scopes() if hasattr(user, "get_granting_scopes") else []
-        )
-
-        Model = cls._meta.model
-        queryset = Model.objects.all()
-        obj = cls.get_queryset(queryset, info).get(pk=id)
+        return user
 
+    @classmethod
+    def _get_permission_context(cls, info, user, obj) -> dict:
         context = {
             "user": user,
             "context": info.context,
@@ -139,10 +179,25 @@ class ScopedDjangoNode(DjangoObjectType):
             context["base_scopes"] = obj.get_base_scopes()
             context["required_scopes"] = obj.get_required_scopes()
 
+        return context
+
+    @classmethod
+    def get_node(cls, info, id):
+        user = cls._get_user(info)
+
+        granting_permissions = get_cached_granting_scopes(user)
+
+        Model = cls._meta.model
+        queryset = Model.objects.all()
+
+        obj = cls.get_queryset(queryset, info).get(pk=id)
+
+        context = cls._get_permission_context(info, user, obj)
+
         # If we have explicit permission, we check against the guard
         if cls._meta.node_permissions:
             if not cls._meta.permission_guard.has_permission(
-                granting_permissions, context
+                granting_permissions, context, cache=get_permission_cache(info.context)
             ):
                 raise GraphQLError("You are not permitted to view this.")
         elif isinstance(obj, ScopedModelMixin):
@@ -152,7 +207,313 @@ class ScopedDjangoNode(DjangoObjectType):
             if not obj.can_be_accessed_by(user, cls._meta.verb):
                 raise GraphQLError("You are not permitted to view this.")
 
-        return super().get_node(info, id)
+        # The object has already been fetched and checked, so we return it as-is
+        return obj
+
+    @classmethod
+    def get_nodes(cls, info, ids: Iterable) -> List:
+        """
+        Batched variant of `get_node`, e.g. for a Relay `nodes(ids: [ID!]!)` field. The objects are fetched
+        in a single query and checked in one batch.
+
+        Returns the objects in the order of `ids`. Objects which do not exist, or which the user is not
+        permitted to view, are None.
+        """
+        user = cls._get_user(info)
+        ids = list(ids)
+
+        Model = cls._meta.model
+        queryset = maybe_queryset(cls.get_queryset(Model.objects.all(), info))
+        objects = list(queryset.filter(pk__in=ids))
+
+        permitted = {
+            str(obj.pk): obj
+            for obj, is_permitted in zip(
+                objects, cls._has_permission_many(info, user, objects)
+            )
+            if is_permitted
+        }
+
+        return [permitted.get(str(id)) for id in ids]
+
+    @classmethod
+    def get_permitted_queryset(cls, queryset, info):
+        """
+        Filter a queryset, or a list, of the model down to the objects `get_node` permits the user to view.
+
+        Without `node_permissions`, models declaring `scope_patterns` are filtered in the database. Otherwise,
+        querysets are checked in batches as they are fetched, see `filter_in_batches`: a page only checks the
+        rows up to its end, but counting the permitted rows, e.g. for a totalCount field, checks every row.
+        Lists are checked in memory.
+        """
+        user = cls._get_user(info)
+        queryset = maybe_queryset(queryset)
+        Model = cls._meta.model
+        is_queryset = isinstance(queryset, QuerySet)
+
+        if not cls._meta.node_permissions:
+            if not issubclass(Model, ScopedModelMixin):
+                return queryset
+
+            if not isinstance(user, ScopedPermissionHolderMixin):
+                return queryset.none() if is_queryset else []
+
+            if is_queryset and get_scope_patterns(Model) is not None:
+                return queryset.filter(
+                    Model.scoped_permission_filter(
+                        get_cached_granting_scopes(user),
+                        cls._meta.verb,
+                    )
+                )
+
+        if is_queryset:
+            return filter_in_batches(
+                queryset, lambda objects: cls._has_permission_many(info, user, objects)
+            )
+
+        permitted = []
+        for chunk in chunks(queryset, PERMISSION_CHECK_CHUNK_SIZE):
+            permitted.extend(
+                obj
+                for obj, is_permitted in zip(
+                    chunk, cls._has_permission_many(info, user, chunk)
+                )
+                if is_permitted
+            )
+
+        return permitted
+
+    @classmethod
+    def _has_permission_many(cls, info, user, objects: List) -> List[bool]:
+        if not objects:
+            return []
+
+        if cls._meta.node_permissions:
+            granting_permissions = get_cached_granting_scopes(user)
+
+            return cls._meta.permission_guard.has_permission_many(
+                granting_permissions,
+                [cls._get_permission_context(info, user, obj) for obj in objects],
+                cache=get_permission_cache(info.context),
+            )
+
+        if not issubclass(cls._meta.model, ScopedModelMixin):
+            return [True] * len(objects)
+
+        if not isinstance(user, ScopedPermissionHolderMixin):
+            return [False] * len(objects)
+
+        return can_be_accessed_by_many(objects, user, cls._meta.verb)
+
+
+class ScopedDjangoConnectionField(DjangoConnectionField):
+    """
+    A DjangoConnectionField of a ScopedDjangoNode, which only includes the nodes the user is permitted to
+    view, see `ScopedDjangoNode.get_permitted_queryset`. As the permitted nodes are filtered in the
+    queryset, the `length` of the connection, used for e.g. a totalCount field, counts only permitted nodes.
+    """
+
+    @classmethod
+    def resolve_queryset(cls, connection, queryset, info, args):
+        queryset = super().resolve_queryset(connection, queryset, info, args)
+        node = connection._meta.node
+
+        if not issubclass(node, ScopedDjangoNode):
+            return queryset
+
+        return node.get_permitted_queryset(queryset, info)
+
+
+class _FieldPermissionCheckedInfo(ResolveInfo):
+    """
+    The ResolveInfo passed on by ScopedPermissionGraphQLMiddleware to the resolvers of the fields it has
+    checked.
+    """
+
+    __slots__ = ()
+
+
+def _mark_field_permission_checked(info: ResolveInfo) -> ResolveInfo:
+    checked_info = _FieldPermissionCheckedInfo.__new__(_FieldPermissionCheckedInfo)
+    for slot in ResolveInfo.__slots__:
+        setattr(checked_info, slot, getattr(info, slot))
+
+    return checked_info
+
+
+def _require_field_permission_middleware(field_name: str, resolver=None):
+    """
+    Wrap the resolver of a field of a node with `field_permissions_in_middleware`, so that the field fails
+    closed: it is only resolved after the ScopedPermissionGraphQLMiddleware has checked its permissions.
+    Fields without a custom resolver resolve to the attribute of the object.
+    """
+
+    def checked_resolver(root, info, **args):
+        if not isinstance(info, _FieldPermissionCheckedInfo):
+            raise ImproperlyConfigured(
+                f"The field permissions of {field_name} are checked by "
+                "ScopedPermissionGraphQLMiddleware, which is not installed."
+            )
+
+        if resolver is None:
+            return getattr(root, field_name, None)
+
+        return resolver(root, info, **args)
+
+    return checked_resolver
+
+
+class ScopedPermissionGraphQLMiddleware:
+    """
+    Graphene middleware enforcing the field permissions of every ScopedDjangoNode with
+    `field_permissions_in_middleware` set, including fields with custom resolvers.
+
+    Every field of the schema is mapped to its compiled guard, or to None if it is unguarded, so that
+    unguarded fields cost a single dict lookup. The map is built up front if the schema is given, and
+    otherwise one type at a time as types are first resolved. Guards of nodes with `batch_field_permissions`
+    set are evaluated in batches per request, see FieldPermissionLoader.
+
+    Use as `schema.execute(..., middleware=[ScopedPermissionGraphQLMiddleware(schema)])`, or in the
+    MIDDLEWARE setting of graphene-django.
+    """
+
+    def __init__(self, schema=None):
+        # (GraphQL type, field name) -> (attribute name, guard, batched)
+        self._field_guards = {}
+
+        if schema is not None:
+            auto_camelcase = getattr(schema, "auto_camelcase", True)
+            for graphql_type in schema.get_type_map().values():
+                self._add_type(graphql_type, auto_camelcase)
+
+    def _add_type(self, graphql_type, auto_camelcase: bool):
+        fields = getattr(graphql_type, "fields", None)
+        if not fields:
+            return
+
+        guards = {}
+        graphene_type = getattr(graphql_type, "graphene_type", None)
+
+        if (
+            isinstance(graphene_type, type)
+            and issubclass(graphene_type, ScopedDjangoNode)
+            and graphene_type._meta.field_permissions_in_middleware
+        ):
+            batched = graphene_type._meta.batch_field_permissions
+            for name, guard in graphene_type._meta.field_permission_guards.items():
+                field = graphene_type._meta.fields.get(name)
+                if field is not None and field.name:
+                    field_name = field.name
+                else:
+                    field_name = to_camel_case(name) if auto_camelcase else name
+
+                guards[field_name] = (name, guard, batched)
+
+        for field_name in fields:
+            self._field_guards[(graphql_type, field_name)] = guards.get(field_name)
+
+    def resolve(self, next, root, info, **args):
+        key = (info.parent_type, info.field_name)
+
+        try:
+            entry = self._field_guards[key]
+        except KeyError:
+            self._add_type(
+                info.parent_type, getattr(info.schema, "auto_camelcase", True)
+            )
+            entry = self._field_guards.setdefault(key, None)
+
+        if entry is None:
+            return next(root, info, **args)
+
+        name, guard, batched = entry
+        checked_info = _mark_field_permission_checked(info)
+
+        if not isinstance(guard, CompiledScopedPermissionGuard):
+            if not guard(root, info, **args):
+                raise GraphQLError("You are not permitted to view this.")
+
+            return next(root, checked_info, **args)
+
+        if not batched:
+            if not has_field_permission(guard, name, root, info):
+                raise GraphQLError("You are not permitted to view this.")
+
+            return next(root, checked_info, **args)
+
+        def resolve(has_permission):
+            if not has_permission:
+                raise GraphQLError("You are not permitted to view this.")
+
+            return next(root, checked_info, **args)
+
+        return (
+            get_field_permission_loader(info.context)
+            .load((guard, name, root))
+            .then(resolve)
+        )
+
+
+def _compile_permissions(permissions) -> Optional[CompiledScopedPermissionGuard]:
+    """
+    Compile the permissions of a mutation, as returned by `get_permissions`. Returns None if there are no
+    permissions to check.
+    """
+    if not hasattr(permissions, "__len__") or len(permissions) == 0:
+        return None
+
+    if isinstance(permissions, (list, tuple)) and all(
+        isinstance(permission, str) for permission in permissions
+    ):
+        return _compile_scopes(type(permissions), tuple(permissions))
+
+    return ScopedPermissionGuard(permissions).compile()
+
+
+@lru_cache(maxsize=1024)
+def _compile_scopes(permissions_type: type, scopes: Tuple[str]):
+    # The type is kept, as a list or tuple of two scopes is a scope and a verb
+    return ScopedPermissionGuard(permissions_type(scopes)).compile()
+
+
+def _overrides(cls, base, method_name: str) -> bool:
+    return getattr(getattr(cls, method_name), "__func__", None) is not getattr(
+        getattr(base, method_name), "__func__", None
+    )
+
+
+def _get_permission_guard(
+    cls, base, *args, method_name="get_permissions", attribute="_permission_guard"
+) -> Optional[CompiledScopedPermissionGuard]:
+    """
+    Get the compiled permission guard of a mutation. Mutations which do not override `get_permissions`
+    use the guard compiled when the class was created, while overrides are called on every mutation.
+    """
+    if not _overrides(cls, base, method_name):
+        return getattr(cls, attribute)
+
+    return _compile_permissions(getattr(cls, method_name)(*args))
+
+
+def _set_permission_guard(
+    cls,
+    base,
+    argument_count: int,
+    method_name="get_permissions",
+    attribute="_permission_guard",
+):
+    """
+    Compile the permission guard of a mutation class once, unless `get_permissions` is overridden.
+    The default implementations only depend on the Meta options of the class. The guard is stored
+    on the class, as the options are frozen once the class is created.
+    """
+    permission_guard = None
+    if not _overrides(cls, base, method_name):
+        permission_guard = _compile_permissions(
+            getattr(cls, method_name)(*[None] * argument_count)
+        )
+
+    setattr(cls, attribute, permission_guard)
 
 
 class ScopedDjangoCreateMutation(DjangoCreateMutation):
@@ -161,43 +522,160 @@ class ScopedDjangoCreateMutation(DjangoCreateMutation):
 
     @classmethod
     def check_permissions(cls, root, info, input) -> None:
-        permissions = cls.get_permissions(root, info, input) or []
+        permission_guard = _get_permission_guard(
+            cls, ScopedDjangoCreateMutation, root, info, input
+        )
+
+        if permission_guard is None:
+            return
 
         user = info.context.user
 
-        permission_guard = ScopedPermissionGuard(permissions)
         context = {"context": info.context, "input": input, "user": info.context.user}
 
-        granting_permissions = (
-            user.get_granting_scopes() if hasattr(user, "get_granting_scopes") else []
-        )
+        granting_permissions = get_cached_granting_scopes(user)
 
-        if not permission_guard.has_permission(granting_permissions, context=context):
+        if not permission_guard.has_permission(
+            granting_permissions,
+            context=context,
+            cache=get_permission_cache(info.context),
+        ):
             raise GraphQLError("You are not permitted to view this.")
 
+    @classmethod
+    def __init_subclass_with_meta__(cls, **options):
+        super().__init_subclass_with_meta__(**options)
+        _set_permission_guard(cls, ScopedDjangoCreateMutation, 3)
+
+
+def _authorize_items(
+    info,
+    permission_guard: CompiledScopedPermissionGuard,
+    granting_permissions,
+    items: list,
+    contexts: Iterable,
+    allow_partial_authorization: bool,
+) -> None:
+    """
+    Evaluate the item permissions of a batch mutation once per item, with a single preparation of the
+    granting scopes. If partial authorization is allowed, unauthorized items are removed from `items`
+    in place, and left out of the mutation. Otherwise any unauthorized item fails the whole mutation.
+    """
+    decisions = permission_guard.has_permission_many(
+        granting_permissions, contexts, cache=get_permission_cache(info.context)
+    )
+
+    _apply_item_decisions(items, decisions, allow_partial_authorization)
+
+
+def _apply_item_decisions(
+    items: list, decisions: List[bool], allow_partial_authorization: bool
+) -> None:
+    if all(decisions):
+        return
+
+    if not allow_partial_authorization:
+        raise GraphQLError("You are not permitted to view this.")
+
+    items[:] = [item for item, decision in zip(items, decisions) if decision]
+
+
+class ScopedDjangoBatchCreateMutationOptions(DjangoBatchCreateMutationOptions):
+    item_permissions = None  # type: Union[Iterable[str], ScopedPermissionGuard]
+    allow_partial_authorization = False  # type: bool
+
 
 class ScopedDjangoBatchCreateMutation(DjangoBatchCreateMutation):
+    """
+    Batch create mutation. The `permissions` are checked once against the whole input, while the
+    optional `item_permissions` are checked once per item, with the item as `input` in the context.
+
+    If `allow_partial_authorization` is set, items failing the `item_permissions` are skipped instead
+    of failing the mutation.
+    """
+
     class Meta:
         abstract = True
 
+    @classmethod
+    def get_item_permissions(
+        cls, root, info, input
+    ) -> Union[Iterable[str], ScopedPermissionGuard]:
+        return cls._meta.item_permissions
+
     @classmethod
     def check_permissions(cls, root, info, input) -> None:
-        permissions = cls.get_permissions(root, info, input) or []
+        permission_guard = _get_permission_guard(
+            cls, ScopedDjangoBatchCreateMutation, root, info, input
+        )
+        item_permission_guard = _get_permission_guard(
+            cls,
+            ScopedDjangoBatchCreateMutation,
+            root,
+            info,
+            input,
+            method_name="get_item_permissions",
+            attribute="_item_permission_guard",
+        )
 
-        if not hasattr(permissions, "__len__") or len(permissions) == 0:
+        if permission_guard is None and item_permission_guard is None:
             return
 
         user = info.context.user
 
-        permission_guard = ScopedPermissionGuard(permissions)
-        context = {"context": info.context, "input": input, "user": info.context.user}
+        granting_permissions = get_cached_granting_scopes(user)
 
-        granting_permissions = (
-            user.get_granting_scopes() if hasattr(user, "get_granting_scopes") else []
-        )
+        if permission_guard is not None:
+            context = {
+                "context": info.context,
+                "input": input,
+                "user": info.context.user,
+            }
 
-        if not permission_guard.has_permission(granting_permissions, context=context):
-            raise GraphQLError("You are not permitted to view this.")
+            if not permission_guard.has_permission(
+                granting_permissions,
+                context=context,
+                cache=get_permission_cache(info.context),
+            ):
+                raise GraphQLError("You are not permitted to view this.")
+
+        if item_permission_guard is not None:
+            _authorize_items(
+                info,
+                item_permission_guard,
+                granting_permissions,
+                input,
+                (
+                    {"context": info.context, "input": item, "user": info.context.user}
+                    for item in input
+                ),
+                cls._meta.allow_partial_authorization,
+            )
+
+    @classmethod
+    def __init_subclass_with_meta__(
+        cls,
+        _meta=None,
+        item_permissions=None,
+        allow_partial_authorization=False,
+        **options,
+    ):
+        if _meta is None:
+            _meta = ScopedDjangoBatchCreateMutationOptions(cls)
+
+        _meta.item_permissions = item_permissions
+        _meta.allow_partial_authorization = allow_partial_authorization
+
+        super().__init_subclass_with_meta__(_meta=_meta, **options)
+
+        _set_permission_guard(cls, ScopedDjangoBatchCreateMutation, 3)
+        _set_permission_guard(
+            cls,
+            ScopedDjangoBatchCreateMutation,
+            3,
+            method_name="get_item_permissions",
+            attribute="_item_permission_guard",
+        )
 
 
 class ScopedDjangoPatchMutationOptions(DjangoPatchMutationOptions):
@@ -226,30 +704,33 @@ class ScopedDjangoPatchMutation(DjangoPatchMutation):
 
     @classmethod
     def check_permissions(cls, root, info, input, id, obj) -> None:
-        permissions = cls.get_permissions(root, info, input, id, obj) or []
+        permission_guard = _get_permission_guard(
+            cls, ScopedDjangoPatchMutation, root, info, input, id, obj
+        )
 
-        if not hasattr(permissions, "__len__") or len(permissions) == 0:
+        if permission_guard is None:
             return
 
         user = info.context.user
 
-        permission_guard = ScopedPermissionGuard(permissions)
         context = {}
 
         if isinstance(obj, ScopedModelMixin):
             context["base_scopes"] = obj.get_base_scopes()
             context["required_scopes"] = obj.get_required_scopes()
 
-        granting_permissions = (
-            user.get_granting_scopes() if hasattr(user, "get_granting_scopes") else []
-        )
+        granting_permissions = get_cached_granting_scopes(user)
 
         context["context"] = info.context
         context["input"] = input
         context["id"] = id
         context["obj"] = obj
 
-        if not permission_guard.has_permission(granting_permissions, context=context):
+        if not permission_guard.has_permission(
+            granting_permissions,
+            context=context,
+            cache=get_permission_cache(info.context),
+        ):
             raise GraphQLError("You are not permitted to view this.")
 
     @classmethod
@@ -259,7 +740,9 @@ class ScopedDjangoPatchMutation(DjangoPatchMutation):
 
         _meta.verb = verb
 
-        return super().__init_subclass_with_meta__(_meta=_meta, **options)
+        super().__init_subclass_with_meta__(_meta=_meta, **options)
+
+        _set_permission_guard(cls, ScopedDjangoPatchMutation, 5)
 
 
 class ScopedDjangoUpdateMutationOptions(DjangoUpdateMutationOptions):
@@ -288,30 +771,33 @@ class ScopedDjangoUpdateMutation(DjangoUpdateMutation):
 
     @classmethod
     def check_permissions(cls, root, info, input, id, obj) -> None:
-        permissions = cls.get_permissions(root, info, input, id, obj) or []
+        permission_guard = _get_permission_guard(
+            cls, ScopedDjangoUpdateMutation, root, info, input, id, obj
+        )
 
-        if not hasattr(permissions, "__len__") or len(permissions) == 0:
+        if permission_guard is None:
             return
 
         user = info.context.user
 
-        permission_guard = ScopedPermissionGuard(permissions)
         context = {}
 
         if isinstance(obj, ScopedModelMixin):
             context["base_scopes"] = obj.get_base_scopes()
             context["required_scopes"] = obj.get_required_scopes()
 
-        granting_permissions = (
-            user.get_granting_scopes() if hasattr(user, "get_granting_scopes") else []
-        )
+        granting_permissions = get_cached_granting_scopes(user)
 
         context["context"] = info.context
         context["input"] = input
         context["id"] = id
         context["obj"] = obj
 
-        if not permission_guard.has_permission(granting_permissions, context=context):
+        if not permission_guard.has_permission(
+            granting_permissions,
+            context=context,
+            cache=get_permission_cache(info.context),
+        ):
             raise GraphQLError("You are not permitted to view this.")
 
     @classmethod
@@ -321,7 +807,9 @@ class ScopedDjangoUpdateMutation(DjangoUpdateMutation):
 
         _meta.verb = verb
 
-        return super().__init_subclass_with_meta__(_meta=_meta, **options)
+        super().__init_subclass_with_meta__(_meta=_meta, **options)
+
+        _set_permission_guard(cls, ScopedDjangoUpdateMutation, 5)
 
 
 class ScopedDjangoDeleteMutationOptions(DjangoDeleteMutationOptions):
@@ -349,29 +837,32 @@ class ScopedDjangoDeleteMutation(DjangoDeleteMutation):
 
     @classmethod
     def check_permissions(cls, root, info, id, obj) -> None:
-        permissions = cls.get_permissions(root, info, id, obj) or []
+        permission_guard = _get_permission_guard(
+            cls, ScopedDjangoDeleteMutation, root, info, id, obj
+        )
 
-        if not hasattr(permissions, "__len__") or len(permissions) == 0:
+        if permission_guard is None:
             return
 
         user = info.context.user
 
-        permission_guard = ScopedPermissionGuard(permissions)
         context = {}
 
         if isinstance(obj, ScopedModelMixin):
             context["base_scopes"] = obj.get_base_scopes()
             context["required_scopes"] = obj.get_required_scopes()
 
-        granting_permissions = (
-            user.get_granting_scopes() if hasattr(user, "get_granting_scopes") else []
-        )
+        granting_permissions = get_cached_granting_scopes(user)
 
         context["context"] = info.context
         context["id"] = id
         context["obj"] = obj
 
-        if not permission_guard.has_permission(granting_permissions, context=context):
+        if not permission_guard.has_permission(
+            granting_permissions,
+            context=context,
+            cache=get_permission_cache(info.context),
+        ):
             raise GraphQLError("You are not permitted to view this.")
 
     @classmethod
@@ -381,52 +872,303 @@ class ScopedDjangoDeleteMutation(DjangoDeleteMutation):
 
         _meta.verb = verb
 
-        return super().__init_subclass_with_meta__(_meta=_meta, **options)
+        super().__init_subclass_with_meta__(_meta=_meta, **options)
+
+        _set_permission_guard(cls, ScopedDjangoDeleteMutation, 4)
+
+
+class ScopedDjangoBatchDeleteMutationOptions(DjangoBatchDeleteMutationOptions):
+    item_permissions = None  # type: Union[Iterable[str], ScopedPermissionGuard]
+    check_object_permissions = False  # type: bool
+    verb = "delete"  # type: str
+    allow_partial_authorization = False  # type: bool
 
 
 class ScopedDjangoBatchDeleteMutation(DjangoBatchDeleteMutation):
+    """
+    Batch delete mutation. The `permissions` are checked once against all ids, while the optional
+    `item_permissions` are checked once per id, with the id as `id` in the context.
+
+    If `check_object_permissions` is set, the objects behind the ids are fetched in a single query, and
+    every object must be accessible by the user with the `verb`, see `ScopedModelMixin.can_be_accessed_by`.
+
+    If `allow_partial_authorization` is set, ids failing the `item_permissions` or the object permissions
+    are skipped instead of failing the mutation.
+    """
+
     class Meta:
         abstract = True
 
+    @classmethod
+    def get_item_permissions(
+        cls, root, info, input
+    ) -> Union[Iterable[str], ScopedPermissionGuard]:
+        return cls._meta.item_permissions
+
     @classmethod
     def check_permissions(cls, root, info, input) -> None:
-        permissions = cls.get_permissions(root, info, input) or []
+        permission_guard = _get_permission_guard(
+            cls, ScopedDjangoBatchDeleteMutation, root, info, input
+        )
+        item_permission_guard = _get_permission_guard(
+            cls,
+            ScopedDjangoBatchDeleteMutation,
+            root,
+            info,
+            input,
+            method_name="get_item_permissions",
+            attribute="_item_permission_guard",
+        )
 
-        if not hasattr(permissions, "__len__") or len(permissions) == 0:
+        if (
+            permission_guard is None
+            and item_permission_guard is None
+            and not cls._meta.check_object_permissions
+        ):
             return
 
         user = info.context.user
 
-        permission_guard = ScopedPermissionGuard(permissions)
-        context = {"context": info.context, "input": input, "user": info.context.user}
+        granting_permissions = get_cached_granting_scopes(user)
+
+        if permission_guard is not None:
+            context = {
+                "context": info.context,
+                "input": input,
+                "user": info.context.user,
+            }
+
+            if not permission_guard.has_permission(
+                granting_permissions,
+                context=context,
+                cache=get_permission_cache(info.context),
+            ):
+                raise GraphQLError("You are not permitted to view this.")
 
-        granting_permissions = (
-            user.get_granting_scopes() if hasattr(user, "get_granting_scopes") else []
+        if item_permission_guard is not None:
+            _authorize_items(
+                info,
+                item_permission_guard,
+                granting_permissions,
+                input,
+                (
+                    {
+                        "context": info.context,
+                        "input": input,
+                        "id": id,
+                        "user": info.context.user,
+                    }
+                    for id in input
+                ),
+                cls._meta.allow_partial_authorization,
+            )
+
+        if cls._meta.check_object_permissions:
+            cls._authorize_objects(root, info, user, granting_permissions, input)
+
+    @classmethod
+    def _authorize_objects(
+        cls, root, info, user, granting_permissions, input: list
+    ) -> None:
+        ids = cls.resolve_ids(input)
+        objects = {
+            str(pk): obj
+            for pk, obj in cls.get_queryset(root, info, ids).in_bulk(ids).items()
+        }
+
+        # Ids without objects are left to the mutation, which reports them as missed
+        found = [
+            (id, objects[str(pk)]) for id, pk in zip(input, ids) if str(pk) in objects
+        ]
+
+        if isinstance(user, ScopedPermissionHolderMixin):
+            decisions = can_be_accessed_by_many(
+                [obj for _, obj in found],
+                user,
+                cls._meta.verb,
+                granting_scopes=granting_permissions,
+            )
+        else:
+            decisions = [False] * len(found)
+
+        denied = {id for (id, _), decision in zip(found, decisions) if not decision}
+        _apply_item_decisions(
+            input,
+            [id not in denied for id in input],
+            cls._meta.allow_partial_authorization,
         )
 
-        if not permission_guard.has_permission(granting_permissions, context=context):
-            raise GraphQLError("You are not permitted to view this.")
+    @classmethod
+    def __init_subclass_with_meta__(
+        cls,
+        _meta=None,
+        item_permissions=None,
+        check_object_permissions=False,
+        verb="delete",
+        allow_partial_authorization=False,
+        **options,
+    ):
+        if _meta is None:
+            _meta = ScopedDjangoBatchDeleteMutationOptions(cls)
+
+        _meta.item_permissions = item_permissions
+        _meta.check_object_permissions = check_object_permissions
+        _meta.verb = verb
+        _meta.allow_partial_authorization = allow_partial_authorization
+
+        super().__init_subclass_with_meta__(_meta=_meta, **options)
+
+        _set_permission_guard(cls, ScopedDjangoBatchDeleteMutation, 3)
+        _set_permission_guard(
+            cls,
+            ScopedDjangoBatchDeleteMutation,
+            3,
+            method_name="get_item_permissions",
+            attribute="_item_permission_guard",
+        )
+
+
+class ScopedDjangoFilterDeleteMutationOptions(DjangoFilterDeleteMutationOptions):
+    filter_by_permissions = False  # type: bool
+    verb = "delete"  # type: str
 
 
 class ScopedDjangoFilterDeleteMutation(DjangoFilterDeleteMutation):
+    """
+    Filter delete mutation. The `permissions` are checked once for the whole filter.
+
+    If `filter_by_permissions` is set, the rows matched by the filter are additionally restricted to the
+    rows the user can access with the `verb`, by a filter on the scope patterns of the model, see
+    `ScopedModelMixin.scoped_permission_filter`. The deletion is then a single statement touching only
+    permitted rows, and the number of rows excluded by permissions is returned as `excludedCount`, which
+    is null otherwise. `before_save` receives the permitted rows only.
+    """
+
     class Meta:
         abstract = True
 
+    excluded_count = graphene.Int()
+
     @classmethod
     def check_permissions(cls, root, info, input) -> None:
-        permissions = cls.get_permissions(root, info, input) or []
+        permission_guard = _get_permission_guard(
+            cls, ScopedDjangoFilterDeleteMutation, root, info, input
+        )
 
-        if not hasattr(permissions, "__len__") or len(permissions) == 0:
+        if permission_guard is None:
             return
 
         user = info.context.user
 
-        permission_guard = ScopedPermissionGuard(permissions)
         context = {"context": info.context, "input": input, "user": info.context.user}
 
-        granting_permissions = (
-            user.get_granting_scopes() if hasattr(user, "get_granting_scopes") else []
-        )
+        granting_permissions = get_cached_granting_scopes(user)
 
-        if not permission_guard.has_permission(granting_permissions, context=context):
+        if not permission_guard.has_permission(
+            granting_permissions,
+            context=context,
+            cache=get_permission_cache(info.context),
+        ):
             raise GraphQLError("You are not permitted to view this.")
+
+    @classmethod
+    def get_filter_values(cls, info, input) -> dict:
+        """
+        Convert the input into filter arguments, like DjangoFilterDeleteMutation.mutate does.
+        """
+        Model = cls._meta.model
+        filter_values = {}
+
+        for name, value in super(type(input), input).items():
+            field_name, *lookups = name.split("__", 1)
+
+            try:
+                field = Model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                field = None
+
+            new_value = value
+
+            handle_func = getattr(cls, "handle_" + name, None)
+            if handle_func is not None:
+                new_value = handle_func(value, name, info)
+
+            if new_value == value and value is not None:
+                if type(field) in (models.ForeignKey, models.OneToOneField):
+                    name = getattr(field, "db_column", None) or name + "_id"
+                    new_value = cls.resolve_id(value)
+                elif type(field) in (
+                    models.ManyToManyField,
+                    models.ManyToManyRel,
+                    models.ManyToOneRel,
+                ) or lookups == ["in"]:
+                    new_value = cls.resolve_ids(value)
+
+            filter_values[name] = new_value
+
+        return filter_values
+
+    @classmethod
+    def mutate(cls, root, info, input):
+        if not cls._meta.filter_by_permissions:
+            return super().mutate(root, info, input)
+
+        updated_input = cls.before_mutate(root, info, input)
+        if updated_input:
+            input = updated_input
+
+        if cls._meta.login_required and not info.context.user.is_authenticated:
+            raise GraphQLError("Must be logged in to access this mutation.")
+
+        cls.check_permissions(root, info, input)
+
+        Model = cls._meta.model
+        user = info.context.user
+        granting_permissions = get_cached_granting_scopes(user)
+
+        filter_qs = cls.get_queryset(root, info, input).filter(
+            **cls.get_filter_values(info, input)
+        )
+        total_count = filter_qs.count()
+        filter_qs = filter_qs.filter(
+            scoped_permission_filter(Model, granting_permissions, cls._meta.verb)
+        )
+        excluded_count = total_count - filter_qs.count()
+
+        # Unlike DjangoFilterDeleteMutation, an empty queryset returned by `before_save` is respected
+        updated_qs = cls.before_save(root, info, filter_qs)
+        if updated_qs is not None:
+            filter_qs = updated_qs
+
+        type_name = get_global_registry().get_type_for_model(Model).__name__
+        ids = [
+            to_global_id(type_name, pk) for pk in filter_qs.values_list("pk", flat=True)
+        ]
+        deletion_count, _ = filter_qs.delete()
+
+        cls.after_mutate(root, info, input, deletion_count, ids)
+
+        return cls(
+            deletion_count=deletion_count,
+            deleted_ids=ids,
+            excluded_count=excluded_count,
+        )
+
+    @classmethod
+    def __init_subclass_with_meta__(
+        cls, _meta=None, filter_by_permissions=False, verb="delete", **options
+    ):
+        if _meta is None:
+            _meta = ScopedDjangoFilterDeleteMutationOptions(cls)
+
+        model = options.get("model")
+        if filter_by_permissions and get_scope_patterns(model) is None:
+            raise ImproperlyConfigured(
+                f"{cls.__name__} filters by permissions, but {model.__name__} does not declare scope_patterns"
+            )
+
+        _meta.filter_by_permissions = filter_by_permissions
+        _meta.verb = verb
+
+        super().__init_subclass_with_meta__(_meta=_meta, **options)
+        _set_permission_guard(cls, ScopedDjangoFilterDeleteMutation, 3)
@@ -1,7 +1,11 @@
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Iterable
 
-from django_scoped_permissions.core import scopes_grant_permissions
-from django_scoped_permissions.util import expand_scopes_from_context
+from django_scoped_permissions.core import scopes_grant_permissions, GrantingScopeSet
+from django_scoped_permissions.util import (
+    expand_scopes_from_context,
+    expand_scope_templates,
+    get_scope_template,
+)
 
 
 class ScopedPermissionRequirement:
@@ -13,13 +17,36 @@ class ScopedPermissionRequirement:
     def __init__(self, scope: str, verb: Optional[str] = None):
         self.scope = scope
         self.verb = verb
+        # Parsed once, as the scope of a requirement never changes
+        self.template = get_scope_template(scope)
+
+
+def prepare_granting_scopes(
+    granting_scopes: Union[List[str], str, GrantingScopeSet], context=None
+) -> GrantingScopeSet:
+    """
+    Prepare granting scopes for evaluation against a context. The scopes are converted to a
+    GrantingScopeSet, and expanded from the context if and only if any of them contains a
+    context variable.
+
+    Preparing an already prepared set without context variables is a no-op, which means that
+    nested nodes do not repeat the work done at the root of an evaluation.
+    """
+    granting_scopes = GrantingScopeSet.coerce(granting_scopes)
+
+    if not granting_scopes.is_templated:
+        return granting_scopes
+
+    return GrantingScopeSet(
+        expand_scopes_from_context(granting_scopes.scopes, context or {})
+    )
 
 
 def _evaluate_value(value, granting_scopes: List[str], context=None):
     if not context:
         context = {}
 
-    granting_scopes = expand_scopes_from_context(granting_scopes, context)
+    granting_scopes = prepare_granting_scopes(granting_scopes, context)
 
     if isinstance(value, SPRBinOp) or isinstance(value, SPRUnOp):
         return value.has_permission(granting_scopes, context)
@@ -30,7 +57,7 @@ def _evaluate_value(value, granting_scopes: List[str], context=None):
         required_scopes = expand_scopes_from_context(value, context)
         return scopes_grant_permissions(required_scopes, granting_scopes)
     elif isinstance(value, ScopedPermissionRequirement):
-        required_scopes = expand_scopes_from_context([value.scope], context)
+        required_scopes = expand_scope_templates([value.template], context)
         return scopes_grant_permissions(required_scopes, granting_scopes, value.verb)
     elif isinstance(value, bool):
         return value
@@ -63,16 +90,20 @@ class SPRBinOp:
 
 class SPRAnd(SPRBinOp):
     def has_permission(self, granting_scopes: List[str], context=None):
-        return self.lhs_has_permission(granting_scopes) & self.rhs_has_permission(
-            granting_scopes
+        # Short-circuits, the right-hand side is not evaluated if the left-hand side fails.
+        return bool(
+            self.lhs_has_permission(granting_scopes, context)
+            and self.rhs_has_permission(granting_scopes, context)
         )
 
 
 class SPROr(SPRBinOp):
     def has_permission(self, granting_scopes: List[str], context=None):
-        return self.lhs_has_permission(
-            granting_scopes, context
-        ) | self.rhs_has_permission(granting_scopes, context)
+        # Short-circuits, the right-hand side is not evaluated if the left-hand side succeeds.
+        return bool(
+            self.lhs_has_permission(granting_scopes, context)
+            or self.rhs_has_permission(granting_scopes, context)
+        )
 
 
 class SPRXor(SPRBinOp):
@@ -103,6 +134,15 @@ class ScopedPermissionGuard:
         self.root = SPRUnOp(self.default)
         self.__overload_args_kwargs(*args, **kwargs)
 
+        if len(args) == 1 and not isinstance(args[0], (str, ScopedPermissionGuard)):
+            from django_scoped_permissions.compiler import (
+                CompiledScopedPermissionGuard,
+            )
+
+            # Wrapping a compiled guard reuses its compilation
+            if isinstance(args[0], CompiledScopedPermissionGuard):
+                self._compiled = args[0]
+
     def __overload_args_kwargs(self, *args, **kwargs):
         if "scope" in kwargs:
             scope = kwargs["scope"]
@@ -143,13 +183,67 @@ class ScopedPermissionGuard:
 
             return base
         else:
+            from django_scoped_permissions.compiler import (
+                CompiledScopedPermissionGuard,
+            )
+
+            if isinstance(arg, CompiledScopedPermissionGuard):
+                return arg.root
+
             return SPRUnOp(self.default)
 
-    def has_permission(self, granting_scopes: Union[List[str], str], context=None):
-        if isinstance(granting_scopes, str):
-            granting_scopes = [granting_scopes]
+    def has_permission(
+        self, granting_scopes: Union[List[str], str, GrantingScopeSet], context=None
+    ):
+        granting_scopes = prepare_granting_scopes(granting_scopes, context)
         return self.root.has_permission(granting_scopes, context)
 
+    async def has_permission_async(self, granting_scopes, context=None):
+        """
+        Async variant of `has_permission`. See `CompiledScopedPermissionGuard.has_permission_async`.
+        """
+        return await self.compile().has_permission_async(granting_scopes, context)
+
+    def has_permission_many(
+        self,
+        granting_scopes: Union[List[str], str, GrantingScopeSet],
+        contexts: Iterable,
+    ) -> List[bool]:
+        """
+        Check the granting scopes against the guard once per context, e.g. once per item of a
+        batch mutation. See `CompiledScopedPermissionGuard.has_permission_many`.
+        """
+        return self.compile().has_permission_many(granting_scopes, contexts)
+
+    def compile(
+        self, reorder: bool = False, collect_statistics: bool = False
+    ) -> "CompiledScopedPermissionGuard":
+        """
+        Compile the guard into a CompiledScopedPermissionGuard, which evaluates the same
+        permission logic without walking and dispatching on the tree of nodes.
+
+        :param reorder: Order the operands of AND and OR nodes by estimated cost, so cheap static checks
+                        run before checks which have to expand scopes from the context.
+        :param collect_statistics: Count evaluations and short-circuited subtrees in the `statistics`
+                                   attribute of the compiled guard.
+
+        Guards are typically built once and evaluated many times, so the result of compiling with
+        the default arguments is cached for as long as the root of the guard is unchanged.
+        """
+        from django_scoped_permissions.compiler import CompiledScopedPermissionGuard
+
+        if reorder or collect_statistics:
+            return CompiledScopedPermissionGuard(
+                self, reorder=reorder, collect_statistics=collect_statistics
+            )
+
+        compiled = getattr(self, "_compiled", None)
+        if compiled is None or compiled.root is not self.root:
+            compiled = CompiledScopedPermissionGuard(self)
+            self._compiled = compiled
+
+        return compiled
+
     def __and__(self, other):
         # Always create a new instance
         guard = ScopedPermissionGuard(self.root)
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 21:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_scoped_permissions', '0002_scopedpermissiongroup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scopedpermission',
+            index=models.Index(fields=['scope'], name='scopedperm_scope_like_idx', opclasses=('text_pattern_ops',)),
+        ),
+    ]
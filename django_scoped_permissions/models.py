@@ -1,15 +1,29 @@
-from typing import Optional
+from typing import Optional, List, Union, Iterable
 
+from asgiref.sync import sync_to_async
 from django.db import models
-from django.db.models import Value, F, Case, When
+from django.db.models import Value, F, Case, When, Q
 from django.db.models.functions import Concat
 
-from django_scoped_permissions.core import any_scope_matches, scopes_grant_permissions
+from django_scoped_permissions.core import (
+    GrantingScopeSet,
+    any_scope_matches,
+    scopes_grant_permissions,
+)
 
 
 class ScopedPermission(models.Model):
     class Meta:
         unique_together = (("scope", "exclude", "exact"),)
+        indexes = (
+            # Supports prefix lookups (`scope__startswith`) on PostgreSQL, where the
+            # default collation prevents LIKE-queries from using the unique index.
+            models.Index(
+                fields=("scope",),
+                name="scopedperm_scope_like_idx",
+                opclasses=("text_pattern_ops",),
+            ),
+        )
 
     scope = models.TextField(blank=False)
     exclude = models.BooleanField(
@@ -30,6 +44,19 @@ class ScopedPermission(models.Model):
         return prefix + self.scope
 
 
+def parsed_scope_annotation():
+    """
+    Create an annotation which renders a ScopedPermission as a scope string, i.e. with the
+    "-" and "=" prefixes of excluding and exact permissions applied.
+    """
+    return Concat(
+        Case(When(exclude=True, then=Value("-")), default=Value("")),
+        Case(When(exact=True, then=Value("=")), default=Value("")),
+        F("scope"),
+        output_field=models.TextField(),
+    )
+
+
 class ScopedPermissionGroup(models.Model):
     name = models.TextField()
     scoped_permissions = models.ManyToManyField(
@@ -40,10 +67,47 @@ class ScopedPermissionGroup(models.Model):
         return self.name
 
 
+GRANTING_SCOPES_CACHE_ATTRIBUTE = "_scoped_granting_scopes_cache"
+
+
+def get_cached_granting_scopes(holder) -> GrantingScopeSet:
+    """
+    Get the granting scopes of a holder, resolved once per holder object. The authentication backend, the
+    views and the GraphQL types and mutations share this cache, so the scopes of the user of a request are
+    resolved once. Objects without `get_granting_scopes`, e.g. anonymous users, have no granting scopes.
+
+    Like the `_perm_cache` of Django's ModelBackend, the cache lives as long as the holder object. Fetch the
+    holder anew, or call `clear_cached_granting_scopes`, after changing its permissions.
+    """
+    if not hasattr(holder, "get_granting_scopes"):
+        return GrantingScopeSet(())
+
+    granting_scopes = getattr(holder, GRANTING_SCOPES_CACHE_ATTRIBUTE, None)
+    if granting_scopes is None:
+        granting_scopes = GrantingScopeSet.coerce(holder.get_granting_scopes())
+        setattr(holder, GRANTING_SCOPES_CACHE_ATTRIBUTE, granting_scopes)
+
+    return granting_scopes
+
+
+def clear_cached_granting_scopes(holder) -> None:
+    """
+    Clear the granting scopes cached by `get_cached_granting_scopes`.
+    """
+    if hasattr(holder, GRANTING_SCOPES_CACHE_ATTRIBUTE):
+        delattr(holder, GRANTING_SCOPES_CACHE_ATTRIBUTE)
+
+
 class ScopedPermissionHolderMixin:
     def get_granting_scopes(self):
         return []
 
+    async def aget_granting_scopes(self) -> List[str]:
+        """
+        Async variant of `get_granting_scopes`. By default, `get_granting_scopes` is run in a thread.
+        """
+        return await sync_to_async(self.get_granting_scopes)()
+
     def has_scoped_permissions(self, *required_scopes):
         return self.has_any_scoped_permissions(*required_scopes)
 
@@ -81,35 +145,65 @@ class ScopedPermissionHolder(models.Model, ScopedPermissionHolderMixin):
         scopes = ScopedPermission.objects.filter(
             in_groups__in=self.scoped_permission_groups.all()
         )
-        scopes = scopes.annotate(
-            parsed_scope=Concat(
-                Case(When(exclude=True, then=Value("-")), default=Value("")),
-                Case(When(exact=True, then=Value("=")), default=Value("")),
-                F("scope"),
-                output_field=models.TextField(),
-            )
-        )
+        scopes = scopes.annotate(parsed_scope=parsed_scope_annotation())
 
         return list(scopes.values_list("parsed_scope", flat=True))
 
-    @property
-    def resolved_scopes(self):
+    def _resolved_scopes_queryset(self):
         scopes = self.scoped_permissions.all() | ScopedPermission.objects.filter(
             in_groups__in=self.scoped_permission_groups.all()
         )
-        scopes = scopes.annotate(
-            parsed_scope=Concat(
-                Case(When(exclude=True, then=Value("-")), default=Value("")),
-                Case(When(exact=True, then=Value("=")), default=Value("")),
-                F("scope"),
-                output_field=models.TextField(),
-            )
-        )
+        scopes = scopes.annotate(parsed_scope=parsed_scope_annotation())
 
-        resolved_scopes = list(scopes.values_list("parsed_scope", flat=True))
+        return scopes.values_list("parsed_scope", flat=True)
+
+    @property
+    def resolved_scopes(self):
+        resolved_scopes = list(self._resolved_scopes_queryset())
 
         return resolved_scopes
 
+    async def aresolved_scopes(self) -> List[str]:
+        """
+        Async variant of `resolved_scopes`. Uses the async ORM where available (Django 4.1+),
+        and otherwise resolves the scopes in a thread.
+        """
+        queryset = self._resolved_scopes_queryset()
+
+        if not hasattr(queryset, "__aiter__"):
+            return await sync_to_async(list)(queryset)
+
+        return [scope async for scope in queryset]
+
+    @classmethod
+    def held_scoped_permissions_filter(cls, pk) -> Q:
+        """
+        Create a filter on ScopedPermission matching every permission held by the holder with
+        the given primary key, either directly or through one of its groups.
+
+        This allows resolving the scopes of a holder without fetching the holder itself.
+        """
+        permissions_query_name = cls._meta.get_field(
+            "scoped_permissions"
+        ).related_query_name()
+        groups_query_name = cls._meta.get_field(
+            "scoped_permission_groups"
+        ).related_query_name()
+
+        return Q(**{permissions_query_name: pk}) | Q(
+            **{f"in_groups__{groups_query_name}": pk}
+        )
+
+    @classmethod
+    def holding_permissions_filter(cls, permissions) -> Q:
+        """
+        Create a filter matching every holder which holds any of the given ScopedPermissions, either
+        directly or through one of its groups.
+        """
+        return Q(scoped_permissions__in=permissions) | Q(
+            scoped_permission_groups__scoped_permissions__in=permissions
+        )
+
     def get_scopes(self):
         """
         DEPRECATED: Use `get_granting_scopes` instead
@@ -119,6 +213,19 @@ class ScopedPermissionHolder(models.Model, ScopedPermissionHolderMixin):
     def get_granting_scopes(self):
         return self.resolved_scopes
 
+    async def aget_granting_scopes(self) -> List[str]:
+        """
+        Async variant of `get_granting_scopes`. Holders which do not override `get_granting_scopes`
+        resolve their scopes with `aresolved_scopes`. Otherwise, the override is run in a thread.
+        """
+        if (
+            type(self).get_granting_scopes
+            is not ScopedPermissionHolder.get_granting_scopes
+        ):
+            return await super().aget_granting_scopes()
+
+        return await self.aresolved_scopes()
+
     def has_scoped_permissions(self, *required_scopes):
         return self.has_any_scoped_permissions(*required_scopes)
 
@@ -165,6 +272,7 @@ class ScopedPermissionHolder(models.Model, ScopedPermissionHolderMixin):
         )
 
         self.scoped_permissions.add(scope)
+        clear_cached_granting_scopes(self)
 
 
 # DEPRECATED: Use ScopedPermissionHolder
@@ -172,6 +280,12 @@ HasScopedPermissionMixin = ScopedPermissionHolder
 
 
 class ScopedModelMixin:
+    # The required scopes of the model as scope templates over its fields, e.g. ("pet:{id}",
+    # "user:{user_id}:pet:{id}"). When declared, permission checks of querysets are pushed down to the
+    # database, see `scoped_permission_filter`. Models overriding `get_required_scopes` are always checked
+    # in Python, as the patterns may no longer match their required scopes.
+    scope_patterns = None  # type: Optional[Iterable[str]]
+
     def get_base_scopes(self):
         """
         DEPRECATED: Use `get_required_scopes`
@@ -179,8 +293,31 @@ class ScopedModelMixin:
         return self.get_required_scopes()
 
     def get_required_scopes(self):
+        from django_scoped_permissions.querysets import get_scope_patterns
+
+        patterns = get_scope_patterns(type(self))
+        if patterns is not None:
+            return patterns.render(self)
+
         return []
 
+    @classmethod
+    def scoped_permission_filter(
+        cls,
+        granting_scopes: Union[Iterable[str], ScopedPermissionHolderMixin],
+        verb: Optional[str] = None,
+    ) -> Q:
+        """
+        Create a filter matching the objects of the model which can be accessed with the given granting
+        scopes, or by the given holder. The model must declare `scope_patterns`.
+        """
+        from django_scoped_permissions.querysets import scoped_permission_filter
+
+        if isinstance(granting_scopes, ScopedPermissionHolderMixin):
+            granting_scopes = granting_scopes.get_granting_scopes()
+
+        return scoped_permission_filter(cls, granting_scopes, verb)
+
     def can_be_accessed_by(
         self, holder: ScopedPermissionHolderMixin, verb: Optional[str] = None
     ):
@@ -198,6 +335,31 @@ class ScopedModelMixin:
         return self.can_be_accessed_by(user, verb)
 
 
+def can_be_accessed_by_many(
+    objects: Iterable[ScopedModelMixin],
+    holder: ScopedPermissionHolderMixin,
+    verb: Optional[str] = None,
+    granting_scopes: Optional[Iterable[str]] = None,
+) -> List[bool]:
+    """
+    Decide `obj.can_be_accessed_by(holder, verb)` for a number of objects, resolving the granting scopes of
+    the holder only once, unless they are given. Objects overriding `can_be_accessed_by` are asked one by one.
+    """
+    if granting_scopes is None:
+        granting_scopes = holder.get_granting_scopes()
+
+    granting_scopes = GrantingScopeSet.coerce(granting_scopes)
+
+    return [
+        (
+            granting_scopes.grants(obj.get_required_scopes(), verb)
+            if type(obj).can_be_accessed_by is ScopedModelMixin.can_be_accessed_by
+            else obj.can_be_accessed_by(holder, verb)
+        )
+        for obj in objects
+    ]
+
+
 class ScopedModel(models.Model, ScopedModelMixin):
     class Meta:
         abstract = True
@@ -0,0 +1,603 @@
+import itertools
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ImproperlyConfigured,
+    ValidationError,
+)
+from django.db import NotSupportedError
+from django.db.models import Q, QuerySet
+from django.db.models.query import ModelIterable
+
+from django_scoped_permissions.core import (
+    GrantingScopeSet,
+    expand_scopes_with_verb,
+    expand_scopes_with_verb_recursively,
+    strip_negation,
+)
+from django_scoped_permissions.util import expand_scope_templates, get_scope_template
+
+
+class _Field:
+    """
+    A part of a scope pattern which is rendered from a model field, e.g. "{user.id}".
+    """
+
+    __slots__ = ("lookup", "field")
+
+    def __init__(self, lookup: str, field):
+        self.lookup = lookup
+        self.field = field
+
+    def match(self, text: str) -> Optional[Tuple[Tuple[str, object], ...]]:
+        """
+        Get the condition under which the field renders as the given text, or None if it never does.
+        """
+        try:
+            value = self.field.to_python(text)
+        except (ValidationError, ValueError, TypeError):
+            return None
+
+        # E.g. "01" is a valid integer, but a field with the value 1 renders as "1"
+        if value is None or str(value) != text:
+            return None
+
+        return ((self.lookup, value),)
+
+
+def _resolve_field(model, path: str):
+    field = None
+
+    for name in path.split("."):
+        if field is not None:
+            if not field.is_relation:
+                raise FieldDoesNotExist(f"{field} is not a relation")
+            model = field.related_model
+
+        field = model._meta.get_field(name)
+
+    # Relations render as their primary key, e.g. {user} in place of {user.id}
+    while field.is_relation:
+        field = field.target_field
+
+    return field
+
+
+class ScopePatterns:
+    """
+    ScopePatterns are the required scopes of a model, declared as scope templates whose variables are
+    fields of the model, e.g. "company:{company_id}:invoice:{id}". Variables may follow relations, as in
+    "company:{project.company_id}:task:{id}".
+
+    As the required scopes of every row are known to the database, whether a set of granting scopes
+    grants access to a row can be expressed as a filter. See `filter`.
+    """
+
+    def __init__(self, model, patterns: Iterable[str]):
+        self.model = model
+        self.patterns = tuple(patterns)
+        self.templates = tuple(get_scope_template(pattern) for pattern in self.patterns)
+        self._parts = tuple(self._parse(pattern) for pattern in self.patterns)
+
+    def _parse(self, pattern: str) -> Tuple[Union[str, _Field], ...]:
+        parts = []
+
+        for part in pattern.split(":"):
+            template = get_scope_template(part)
+            if template.is_static:
+                parts.append(part)
+                continue
+
+            if template.scope != "{" + template.variables[0] + "}":
+                raise ImproperlyConfigured(
+                    f"Invalid scope pattern {pattern!r} of {self.model.__name__}: "
+                    f"variables must span a whole part of the scope"
+                )
+
+            variable = template.variables[0]
+            try:
+                field = _resolve_field(self.model, variable)
+            except FieldDoesNotExist as e:
+                raise ImproperlyConfigured(
+                    f"Invalid scope pattern {pattern!r} of {self.model.__name__}: {e}"
+                ) from e
+
+            parts.append(_Field(variable.replace(".", "__"), field))
+
+        return tuple(parts)
+
+    def render(self, obj) -> List[str]:
+        """
+        Render the required scopes of an instance of the model.
+        """
+        return list(expand_scope_templates(self.templates, obj))
+
+    def _required_parts(self, verb: Optional[str], recursive: bool):
+        if not verb:
+            return self._parts
+
+        verb_parts = tuple(verb.split(":"))
+
+        if not recursive:
+            return tuple(parts + verb_parts for parts in self._parts)
+
+        # Mirrors `expand_scopes_with_verb_recursively`
+        result = [verb_parts]
+        for parts in self._parts:
+            for index in range(len(parts)):
+                result.append(parts[: index + 1] + verb_parts)
+
+        return tuple(result)
+
+    @staticmethod
+    def _match(required_parts, granting_scope: str):
+        """
+        Get the conditions under which a required scope matches a granting scope, mirroring
+        `scope_matches`. The result is a list of alternative conjunctions of (lookup, value) pairs.
+        """
+        if not granting_scope:
+            return []
+
+        if granting_scope[0] == "=":
+            is_exact = True
+            granting_parts = granting_scope[1:].split(":")
+        else:
+            if granting_scope == "*":
+                return [()]
+            is_exact = False
+            granting_parts = granting_scope.split(":")
+
+        if len(granting_parts) > len(required_parts) or (
+            is_exact and len(granting_parts) != len(required_parts)
+        ):
+            return []
+
+        alternatives_per_part = []
+        for required_part, granting_part in zip(required_parts, granting_parts):
+            if not is_exact and granting_part == "*":
+                continue
+
+            if isinstance(required_part, _Field):
+                alternatives = [
+                    condition
+                    for condition in (
+                        required_part.match(granting_part),
+                        None if is_exact else required_part.match("*"),
+                    )
+                    if condition is not None
+                ]
+                if not alternatives:
+                    return []
+                alternatives_per_part.append(alternatives)
+            elif not (
+                required_part == granting_part
+                or (not is_exact and required_part == "*")
+            ):
+                return []
+
+        return [
+            tuple(itertools.chain.from_iterable(conditions))
+            for conditions in itertools.product(*alternatives_per_part)
+        ]
+
+    def _any_match(self, required_parts, granting_scopes) -> Union[bool, Q]:
+        conjunctions = set()
+
+        for granting_scope in granting_scopes:
+            granting_scope = strip_negation(granting_scope)
+            for parts in required_parts:
+                for conjunction in self._match(parts, granting_scope):
+                    if not conjunction:
+                        return True
+                    conjunctions.add(frozenset(conjunction))
+
+        if not conjunctions:
+            return False
+
+        # Single conditions on the same field are merged into one IN-lookup
+        single_values = {}
+        q = Q()
+        for conjunction in conjunctions:
+            if len(conjunction) == 1:
+                ((lookup, value),) = conjunction
+                single_values.setdefault(lookup, set()).add(value)
+            else:
+                q |= Q(*sorted(conjunction, key=str))
+
+        for lookup, values in sorted(single_values.items()):
+            if len(values) == 1:
+                q |= Q(**{lookup: next(iter(values))})
+            else:
+                q |= Q(**{f"{lookup}__in": sorted(values, key=str)})
+
+        return q
+
+    def filter(
+        self,
+        granting_scopes: Union[Iterable[str], GrantingScopeSet],
+        verb: Optional[str] = None,
+    ) -> Q:
+        """
+        Create a filter matching exactly the rows for which
+
+            scopes_grant_permissions(obj.get_required_scopes(), granting_scopes, verb)
+
+        holds, given that the required scopes are rendered from the patterns.
+        """
+        granting_scopes = GrantingScopeSet.coerce(granting_scopes)
+        base_parts = self._required_parts(verb, recursive=False)
+        parts = self._required_parts(verb, recursive=True)
+
+        # The four cases of `scopes_grant_permissions`, in order
+        excluded_exact = self._any_match(base_parts, granting_scopes.exclude_exact)
+        included_exact = self._any_match(base_parts, granting_scopes.include_exact)
+        excluded = self._any_match(parts, granting_scopes.exclude)
+        included = self._any_match(parts, granting_scopes.include)
+
+        return _and(
+            _not(excluded_exact), _or(included_exact, _and(_not(excluded), included))
+        )
+
+
+def _not(condition: Union[bool, Q]) -> Union[bool, Q]:
+    if isinstance(condition, bool):
+        return not condition
+    return ~condition
+
+
+def _and(left: Union[bool, Q], right: Union[bool, Q]) -> Union[bool, Q]:
+    if left is False or right is False:
+        return False
+    if left is True:
+        return right
+    if right is True:
+        return left
+    return left & right
+
+
+def _or(left: Union[bool, Q], right: Union[bool, Q]) -> Union[bool, Q]:
+    if left is True or right is True:
+        return True
+    if left is False:
+        return right
+    if right is False:
+        return left
+    return left | right
+
+
+@lru_cache(maxsize=None)
+def get_scope_patterns(model) -> Optional[ScopePatterns]:
+    """
+    Get the parsed ScopePatterns of a model, or None if the model does not declare `scope_patterns`, or
+    overrides `get_required_scopes` so that the patterns are not the source of its required scopes.
+    """
+    from django_scoped_permissions.models import ScopedModelMixin
+
+    patterns = getattr(model, "scope_patterns", None)
+    if not patterns:
+        return None
+
+    if (
+        getattr(model, "get_required_scopes", None)
+        is not ScopedModelMixin.get_required_scopes
+    ):
+        return None
+
+    return ScopePatterns(model, patterns)
+
+
+def scoped_permission_filter(
+    model,
+    granting_scopes: Union[Iterable[str], GrantingScopeSet],
+    verb: Optional[str] = None,
+) -> Q:
+    """
+    Create a filter on a model with scope patterns, matching the rows which the granting scopes grant
+    access to with the given verb. Raises a ValueError if the model does not declare scope patterns, or
+    overrides `get_required_scopes`, see `get_scope_patterns`.
+    """
+    patterns = get_scope_patterns(model)
+    if patterns is None:
+        raise ValueError(
+            f"{model.__name__} does not declare scope_patterns, or overrides get_required_scopes"
+        )
+
+    condition = patterns.filter(granting_scopes, verb)
+    if condition is True:
+        return Q()
+    if condition is False:
+        return Q(pk__in=[])
+    return condition
+
+
+PERMISSION_CHECK_CHUNK_SIZE = 500
+
+
+def chunks(iterable: Iterable, size: int) -> Iterable[List]:
+    """
+    Split an iterable into lists of at most `size` items.
+    """
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+class _PermissionCheckedQuerySetMixin:
+    """
+    Mixin of the querysets created by `filter_in_batches`. The rows of the underlying query are checked in
+    chunks as they are fetched, and slices are taken from the permitted rows, so that fetching a page stops
+    as soon as the page is full. Counting checks every row, but only keeps one chunk in memory.
+    """
+
+    _has_permission_many = None  # type: Optional[Callable[[List], List[bool]]]
+    _permitted_low = 0
+    _permitted_high = None  # type: Optional[int]
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._has_permission_many = self._has_permission_many
+        clone._permitted_low = self._permitted_low
+        clone._permitted_high = self._permitted_high
+        return clone
+
+    def _is_permitted_sliced(self) -> bool:
+        return self._permitted_low != 0 or self._permitted_high is not None
+
+    def _chain(self):
+        if self._is_permitted_sliced():
+            raise TypeError(
+                "Cannot change a permission checked queryset once a slice has been taken."
+            )
+
+        return super()._chain()
+
+    def _iter_permitted(self):
+        if self._iterable_class is not ModelIterable:
+            raise NotSupportedError(
+                "Permission checked querysets can only be fetched as model instances."
+            )
+
+        def permitted():
+            objects = super(_PermissionCheckedQuerySetMixin, self).iterator(
+                chunk_size=PERMISSION_CHECK_CHUNK_SIZE
+            )
+            for chunk in chunks(objects, PERMISSION_CHECK_CHUNK_SIZE):
+                for obj, is_permitted in zip(chunk, self._has_permission_many(chunk)):
+                    if is_permitted:
+                        yield obj
+
+        return itertools.islice(permitted(), self._permitted_low, self._permitted_high)
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            self._result_cache = list(self._iter_permitted())
+        if self._prefetch_related_lookups and not self._prefetch_done:
+            self._prefetch_related_objects()
+
+    def __getitem__(self, k):
+        if self._result_cache is not None or not isinstance(k, (int, slice)):
+            return super().__getitem__(k)
+
+        if isinstance(k, int):
+            if k < 0:
+                raise ValueError("Negative indexing is not supported.")
+
+            clone = self[k : k + 1]
+            clone._fetch_all()
+            return clone._result_cache[0]
+
+        if (k.start is not None and k.start < 0) or (k.stop is not None and k.stop < 0):
+            raise ValueError("Negative indexing is not supported.")
+
+        if k.step:
+            return list(self[k.start : k.stop])[:: k.step]
+
+        # Combines the slices like Query.set_limits
+        clone = self._clone()
+        if k.stop is not None:
+            if clone._permitted_high is not None:
+                clone._permitted_high = min(
+                    clone._permitted_high, clone._permitted_low + k.stop
+                )
+            else:
+                clone._permitted_high = clone._permitted_low + k.stop
+        if k.start is not None:
+            if clone._permitted_high is not None:
+                clone._permitted_low = min(
+                    clone._permitted_high, clone._permitted_low + k.start
+                )
+            else:
+                clone._permitted_low = clone._permitted_low + k.start
+
+        return clone
+
+    def iterator(self, chunk_size=None):
+        return iter(self._iter_permitted())
+
+    def count(self):
+        if self._result_cache is not None:
+            return len(self._result_cache)
+
+        return sum(1 for _ in self._iter_permitted())
+
+    def exists(self):
+        if self._result_cache is not None:
+            return bool(self._result_cache)
+
+        return next(iter(self._iter_permitted()), None) is not None
+
+    def _permitted_pk_chunks(self) -> List[List]:
+        # The primary keys are collected before any row is changed
+        pks = [obj.pk for obj in self._iter_permitted()]
+        return list(chunks(pks, PERMISSION_CHECK_CHUNK_SIZE))
+
+    def delete(self):
+        deleted = 0
+        deleted_per_model = {}
+
+        for pks in self._permitted_pk_chunks():
+            count, per_model = self.model._base_manager.filter(pk__in=pks).delete()
+            deleted += count
+            for label, model_count in per_model.items():
+                deleted_per_model[label] = deleted_per_model.get(label, 0) + model_count
+
+        return deleted, deleted_per_model
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        return sum(
+            self.model._base_manager.filter(pk__in=pks).update(**kwargs)
+            for pks in self._permitted_pk_chunks()
+        )
+
+    update.alters_data = True
+
+    def aggregate(self, *args, **kwargs):
+        raise NotSupportedError(
+            "Permission checked querysets cannot be aggregated in the database."
+        )
+
+
+@lru_cache(maxsize=None)
+def _permission_checked_queryset_class(queryset_class):
+    return type(
+        f"PermissionChecked{queryset_class.__name__}",
+        (_PermissionCheckedQuerySetMixin, queryset_class),
+        {},
+    )
+
+
+def filter_in_batches(
+    queryset: QuerySet, has_permission_many: Callable[[List], List[bool]]
+) -> QuerySet:
+    """
+    Filter a queryset on a permission check which can only be made in Python. `has_permission_many` takes a
+    list of objects and returns whether each of them is permitted.
+
+    No rows are fetched until the queryset is evaluated. The rows are then fetched and checked in chunks of
+    PERMISSION_CHECK_CHUNK_SIZE, and slices are taken from the permitted rows, so a page costs the rows
+    up to its end rather than the whole table. `count()` still checks every row, in chunks. Filtering and
+    ordering happen in the database before the check, while slices, `count()`, `exists()`, `update()` and
+    `delete()` only see the permitted rows. The queryset cannot be aggregated in the database, or fetched
+    as values.
+    """
+    clone = queryset._chain()
+    clone.__class__ = _permission_checked_queryset_class(type(queryset))
+    clone._has_permission_many = has_permission_many
+
+    return clone
+
+
+def filter_permitted(
+    queryset: QuerySet,
+    holder,
+    verb: Optional[str] = None,
+    granting_scopes: Optional[Union[Iterable[str], GrantingScopeSet]] = None,
+) -> QuerySet:
+    """
+    Filter a queryset down to the objects the holder can access with the given verb. Models with scope
+    patterns, see `get_scope_patterns`, are filtered in the database. Otherwise, the objects are checked in
+    batches with `can_be_accessed_by_many` as they are fetched, see `filter_in_batches`, which costs a check
+    of every row to count them. The granting scopes of the holder are resolved once, unless they are given.
+    """
+    from django_scoped_permissions.models import (
+        ScopedModelMixin,
+        ScopedPermissionHolderMixin,
+        can_be_accessed_by_many,
+    )
+
+    model = queryset.model
+    if not issubclass(model, ScopedModelMixin):
+        return queryset
+
+    if not isinstance(holder, ScopedPermissionHolderMixin):
+        return queryset.none()
+
+    if granting_scopes is None:
+        granting_scopes = holder.get_granting_scopes()
+    granting_scopes = GrantingScopeSet.coerce(granting_scopes)
+
+    if get_scope_patterns(model) is not None:
+        return queryset.filter(scoped_permission_filter(model, granting_scopes, verb))
+
+    return filter_in_batches(
+        queryset,
+        lambda objects: can_be_accessed_by_many(objects, holder, verb, granting_scopes),
+    )
+
+
+def _granting_scopes_filter(required_scopes: Iterable[str]) -> Q:
+    """
+    Create a filter on ScopedPermission.scope matching the non-exact granting scopes which match any of
+    the required scopes, see `scope_matches`. The matching scopes are the prefixes of a required scope, with
+    any of their parts replaced by "*". Required scopes with wildcards are matched with a regular expression.
+    """
+    scopes = set()
+    patterns = []
+
+    for required_scope in required_scopes:
+        parts = required_scope.split(":")
+
+        if "*" in parts:
+            pattern = ""
+            for part in reversed(parts):
+                part = "[^:]*" if part == "*" else f"(?:{re.escape(part)}|\\*)"
+                pattern = f"{part}(?::{pattern})?" if pattern else part
+            patterns.append(f"^{pattern}$")
+            continue
+
+        alternatives = [(part, "*") for part in parts]
+        for length in range(1, len(parts) + 1):
+            scopes.update(
+                ":".join(combination)
+                for combination in itertools.product(*alternatives[:length])
+            )
+
+    q = Q(scope__in=sorted(scopes))
+    for pattern in patterns:
+        q |= Q(scope__regex=pattern)
+
+    return q
+
+
+def scoped_permission_holders_filter(
+    holder_model, required_scopes: Iterable[str], verb: Optional[str] = None
+) -> Q:
+    """
+    Create a filter on a ScopedPermissionHolder model, matching the holders whose scoped permissions,
+    held directly or through groups, grant the required scopes with the given verb. This mirrors the four
+    cases of `scopes_grant_permissions` over `resolved_scopes`, in the database. Overrides of
+    `get_granting_scopes` are not taken into account.
+    """
+    from django_scoped_permissions.models import ScopedPermission
+
+    required_scopes = list(required_scopes)
+    if not required_scopes:
+        return Q()
+
+    exact_q = Q(scope__in=sorted(set(expand_scopes_with_verb(required_scopes, verb))))
+    non_exact_q = _granting_scopes_filter(
+        expand_scopes_with_verb_recursively(required_scopes, verb)
+    )
+
+    def holding(q: Q) -> Q:
+        permissions = ScopedPermission.objects.filter(q)
+        holders = holder_model._default_manager.filter(
+            holder_model.holding_permissions_filter(permissions)
+        )
+        return Q(pk__in=holders.values("pk"))
+
+    excluded_exact = holding(Q(exclude=True, exact=True) & exact_q)
+    included_exact = holding(Q(exclude=False, exact=True) & exact_q)
+    excluded = holding(Q(exclude=True, exact=False) & non_exact_q)
+    included = holding(Q(exclude=False, exact=False) & non_exact_q)
+
+    return ~excluded_exact & (included_exact | (~excluded & included))
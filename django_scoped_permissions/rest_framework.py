@@ -0,0 +1,122 @@
+from typing import Optional
+
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.permissions import BasePermission
+
+from django_scoped_permissions.compiler import (
+    CompiledScopedPermissionGuard,
+    get_permission_cache,
+)
+from django_scoped_permissions.models import (
+    ScopedModelMixin,
+    ScopedPermissionHolderMixin,
+    can_be_accessed_by_many,
+    get_cached_granting_scopes,
+)
+from django_scoped_permissions.querysets import filter_permitted
+from django_scoped_permissions.views import compile_permission_guard
+
+# The default verbs of the HTTP methods, unless a view sets `scoped_verb`
+VERBS_BY_METHOD = {
+    "GET": "read",
+    "HEAD": "read",
+    "OPTIONS": "read",
+    "POST": "create",
+    "PUT": "update",
+    "PATCH": "update",
+    "DELETE": "delete",
+}
+
+_GUARD_CACHE_ATTRIBUTE = "_scoped_compiled_permissions"
+
+
+def get_view_verb(request, view) -> Optional[str]:
+    """
+    Get the verb of a request to a view: the `scoped_verb` of the view if set, otherwise the verb of the
+    HTTP method, see VERBS_BY_METHOD.
+    """
+    verb = getattr(view, "scoped_verb", None)
+    if verb is not None:
+        return verb
+
+    return VERBS_BY_METHOD.get(request.method)
+
+
+def get_view_guard(view) -> Optional[CompiledScopedPermissionGuard]:
+    """
+    Get the compiled `scoped_permissions` of a view, compiled once per view class.
+    """
+    view_class = type(view)
+    permissions = getattr(view_class, "scoped_permissions", None)
+
+    cached = view_class.__dict__.get(_GUARD_CACHE_ATTRIBUTE)
+    if cached is not None and cached[0] is permissions:
+        return cached[1]
+
+    guard = compile_permission_guard(permissions)
+    setattr(view_class, _GUARD_CACHE_ATTRIBUTE, (permissions, guard))
+
+    return guard
+
+
+class HasScopedPermissions(BasePermission):
+    """
+    Permission class checking the `scoped_permissions` of a view, a scope or a ScopedPermissionGuard, against
+    the granting scopes of the user. The guard may reference `user`, `context`, `view` and the URL arguments
+    of the view as `kwargs`. Views without `scoped_permissions` only require a scoped permission holder.
+
+    Objects are checked with the verb of the request, see `get_view_verb`. The granting scopes of the user are
+    resolved once, see `get_cached_granting_scopes`.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not isinstance(user, ScopedPermissionHolderMixin):
+            return False
+
+        guard = get_view_guard(view)
+        if guard is None:
+            return True
+
+        return guard.has_permission(
+            get_cached_granting_scopes(request.user),
+            {
+                "context": request,
+                "user": user,
+                "view": view,
+                "kwargs": getattr(view, "kwargs", {}),
+            },
+            cache=get_permission_cache(request),
+        )
+
+    def has_object_permission(self, request, view, obj):
+        if not isinstance(obj, ScopedModelMixin):
+            return True
+
+        user = request.user
+        if not isinstance(user, ScopedPermissionHolderMixin):
+            return False
+
+        (decision,) = can_be_accessed_by_many(
+            [obj],
+            user,
+            get_view_verb(request, view),
+            granting_scopes=get_cached_granting_scopes(request.user),
+        )
+        return decision
+
+
+class ScopedPermissionFilterBackend(BaseFilterBackend):
+    """
+    Filter backend limiting querysets to the objects the user can access with the verb of the request, see
+    `get_view_verb`. Models declaring `scope_patterns` are filtered in the database, and other models in
+    batches, see `filter_permitted`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return filter_permitted(
+            queryset,
+            request.user,
+            get_view_verb(request, view),
+            granting_scopes=get_cached_granting_scopes(request.user),
+        )
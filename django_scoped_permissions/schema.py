@@ -1,8 +1,34 @@
 import graphene
 from graphene import Node
-from graphene_django import DjangoObjectType, DjangoConnectionField
+from graphene.relay import Connection, ConnectionField, PageInfo
+from graphene_django import DjangoObjectType
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+from graphql_relay import from_global_id
+from graphql_relay.utils import base64, unbase64
 
-from django_scoped_permissions.models import ScopedPermission
+from django_scoped_permissions.models import (
+    ScopedPermission,
+    ScopedPermissionGroup,
+    ScopedPermissionHolder,
+    parsed_scope_annotation,
+)
+
+CURSOR_PREFIX = "scopedpermission:"
+
+
+def pk_to_cursor(pk) -> str:
+    return base64(f"{CURSOR_PREFIX}{pk}")
+
+
+def cursor_to_pk(cursor: str) -> int:
+    try:
+        value = unbase64(cursor)
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError
+        return int(value[len(CURSOR_PREFIX) :])
+    except (ValueError, TypeError):
+        raise GraphQLError(f"Invalid cursor: {cursor}")
 
 
 class ScopedPermissionNode(DjangoObjectType):
@@ -15,9 +41,176 @@ class ScopedPermissionNode(DjangoObjectType):
         return ScopedPermission.objects.get(pk=id)
 
 
+class ScopedPermissionGroupNode(DjangoObjectType):
+    class Meta:
+        model = ScopedPermissionGroup
+        interfaces = (Node,)
+
+    @classmethod
+    def get_node(self, info, id):
+        return ScopedPermissionGroup.objects.get(pk=id)
+
+
+class ScopedPermissionConnection(Connection):
+    class Meta:
+        node = ScopedPermissionNode
+
+
+def keyset_paginate(queryset, first=None, last=None, before=None, after=None):
+    """
+    Paginate a queryset of scoped permissions into a ScopedPermissionConnection, ordered by primary key.
+
+    The cursors encode the primary key of their row, and pages seek past them with `pk__gt` and `pk__lt`
+    instead of an OFFSET, so deep pages are as cheap as the first. A single extra row is fetched to find
+    out whether there are more rows in the paging direction, and the other direction is checked with an
+    EXISTS query on the primary key. Pages hold at most RELAY_CONNECTION_MAX_LIMIT rows.
+    """
+    max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+    for name, value in (("first", first), ("last", last)):
+        if value is not None and value < 0:
+            raise GraphQLError(f"Argument '{name}' must be a non-negative integer")
+        if value is not None and max_limit is not None and value > max_limit:
+            raise GraphQLError(
+                f"Requesting {value} records exceeds the '{name}' limit of {max_limit} records"
+            )
+
+    if first is None and last is None:
+        first = max_limit
+
+    window = queryset
+    if after is not None:
+        window = window.filter(pk__gt=cursor_to_pk(after))
+    if before is not None:
+        window = window.filter(pk__lt=cursor_to_pk(before))
+
+    has_previous_page = has_next_page = False
+
+    if first is not None:
+        rows = list(window.order_by("pk")[: first + 1])
+        has_next_page = len(rows) > first
+        rows = rows[:first]
+        if last is not None and len(rows) > last:
+            rows = rows[len(rows) - last :]
+            has_previous_page = True
+    else:
+        rows = list(window.order_by("-pk")[: last + 1])
+        has_previous_page = len(rows) > last
+        rows = rows[:last][::-1]
+
+    if not has_previous_page and after is not None:
+        has_previous_page = queryset.filter(pk__lte=cursor_to_pk(after)).exists()
+    if not has_next_page and before is not None:
+        has_next_page = queryset.filter(pk__gte=cursor_to_pk(before)).exists()
+
+    edges = [
+        ScopedPermissionConnection.Edge(node=row, cursor=pk_to_cursor(row.pk))
+        for row in rows
+    ]
+
+    return ScopedPermissionConnection(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page,
+        ),
+    )
+
+
+def get_model_pk(info, global_id, base_model):
+    """
+    Resolve the relay id of an object of `base_model`, or a subclass of it, into its model and primary key.
+    The object itself is never fetched.
+    """
+    type_name, pk = from_global_id(global_id)
+    graphql_type = info.schema.get_type(type_name) if type_name else None
+    model = getattr(
+        getattr(getattr(graphql_type, "graphene_type", None), "_meta", None),
+        "model",
+        None,
+    )
+
+    if model is None or not issubclass(model, base_model):
+        raise GraphQLError(f"{global_id} is not a valid {base_model.__name__} id")
+
+    return model, pk
+
+
+def get_holder_filter(info, holder_id):
+    """
+    Resolve the relay id of a ScopedPermissionHolder into a filter on ScopedPermission.
+    The holder itself is never fetched.
+    """
+    holder_model, pk = get_model_pk(info, holder_id, ScopedPermissionHolder)
+
+    return holder_model.held_scoped_permissions_filter(pk)
+
+
 class ScopedPermissionQuery(graphene.ObjectType):
     scoped_permission = Node.Field(ScopedPermissionNode)
-    all_scoped_permissions = DjangoConnectionField(ScopedPermissionNode)
+    scoped_permission_group = Node.Field(ScopedPermissionGroupNode)
+    all_scoped_permissions = ConnectionField(
+        ScopedPermissionConnection,
+        prefix=graphene.String(),
+        exclude=graphene.Boolean(),
+        exact=graphene.Boolean(),
+        group=graphene.ID(),
+        holder=graphene.ID(),
+    )
+    resolved_scopes = graphene.List(
+        graphene.NonNull(graphene.String), holder=graphene.ID(required=True)
+    )
+
+    def resolve_all_scoped_permissions(
+        self,
+        info,
+        prefix=None,
+        exclude=None,
+        exact=None,
+        group=None,
+        holder=None,
+        first=None,
+        last=None,
+        before=None,
+        after=None,
+        **kwargs,
+    ):
+        """
+        Resolve scoped permissions, ordered by primary key, with keyset pagination, see `keyset_paginate`.
+        `group` and `holder` are relay ids.
+
+        All filters are served by indexes: `prefix` uses the scope pattern index, `exclude` and
+        `exact` the unique index, and `group` and `holder` the foreign keys of the m2m tables.
+        """
+        queryset = ScopedPermission.objects.all()
+
+        if prefix:
+            queryset = queryset.filter(scope__startswith=prefix)
+        if exclude is not None:
+            queryset = queryset.filter(exclude=exclude)
+        if exact is not None:
+            queryset = queryset.filter(exact=exact)
+        if group is not None:
+            _, group_pk = get_model_pk(info, group, ScopedPermissionGroup)
+            queryset = queryset.filter(in_groups=group_pk)
+        if holder is not None:
+            queryset = queryset.filter(get_holder_filter(info, holder)).distinct()
+
+        return keyset_paginate(
+            queryset, first=first, last=last, before=before, after=after
+        )
+
+    def resolve_resolved_scopes(self, info, holder):
+        """
+        Resolve all scopes held by a holder, directly or via groups, in a single query.
+        """
+        queryset = (
+            ScopedPermission.objects.filter(get_holder_filter(info, holder))
+            .annotate(parsed_scope=parsed_scope_annotation())
+            .order_by("parsed_scope")
+            .values_list("parsed_scope", flat=True)
+            .distinct()
+        )
 
-    def resolve_all_scoped_permissions(self, info, *args, **kwargs):
-        return ScopedPermission.objects.all()
+        return list(queryset)
@@ -1,6 +1,6 @@
 import factory
 
-from django_scoped_permissions.tests.models import User, Pet, Company
+from django_scoped_permissions.tests.models import User, Pet, Company, Vehicle
 
 
 class UserFactory(factory.DjangoModelFactory):
@@ -22,6 +22,14 @@ class PetFactory(factory.DjangoModelFactory):
     age = 10
 
 
+class VehicleFactory(factory.DjangoModelFactory):
+    class Meta:
+        model = Vehicle
+
+    user = factory.SubFactory(UserFactory)
+    name = "Vehicle"
+
+
 class CompanyFactory(factory.DjangoModelFactory):
     class Meta:
         model = Company
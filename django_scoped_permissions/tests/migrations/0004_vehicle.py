@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-18 22:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django_scoped_permissions.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tests", "0003_auto_20210202_0853"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Vehicle",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=128)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="vehicles",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            bases=(django_scoped_permissions.models.ScopedModelMixin, models.Model),
+        ),
+    ]
@@ -108,3 +108,17 @@ class Pet(ScopedModelMixin, models.Model):
 
     def __str__(self):
         return self.name
+
+
+class Vehicle(ScopedModelMixin, models.Model):
+    class Meta:
+        pass
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="vehicles")
+
+    scope_patterns = ("vehicle:{id}", "user:{user_id}:vehicle:{id}")
+
+    name = models.CharField(max_length=128)
+
+    def __str__(self):
+        return self.name
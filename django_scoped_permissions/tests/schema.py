@@ -10,7 +10,7 @@ from django_scoped_permissions.graphql import (
     ScopedDjangoUpdateMutation,
     ScopedDjangoDeleteMutation,
 )
-from django_scoped_permissions.tests.models import Pet, User
+from django_scoped_permissions.tests.models import Pet, User, Vehicle
 
 
 class PetNode(DjangoObjectType):
@@ -23,6 +23,12 @@ class PetNode(DjangoObjectType):
         return Pet.objects.get(pk=id)
 
 
+class VehicleNode(DjangoObjectType):
+    class Meta:
+        model = Vehicle
+        interfaces = (Node,)
+
+
 class UserNode(DjangoObjectType):
     class Meta:
         model = User
@@ -0,0 +1,112 @@
+from django.contrib.admin.sites import AdminSite
+from django.test import TestCase, RequestFactory
+from django.urls import ResolverMatch
+
+from django_scoped_permissions.admin import (
+    ScopedPermissionAdmin,
+    ScopedPermissionGroupAdmin,
+    EstimatedCountPaginator,
+)
+from django_scoped_permissions.models import ScopedPermission, ScopedPermissionGroup
+from django_scoped_permissions.tests.factories import UserFactory
+
+
+def admin_request(model, view="changelist"):
+    request = RequestFactory().get("/")
+    request.resolver_match = ResolverMatch(
+        lambda request: None,
+        (),
+        {},
+        url_name=f"{model._meta.app_label}_{model._meta.model_name}_{view}",
+    )
+
+    return request
+
+
+class TestScopedPermissionAdmin(TestCase):
+    def setUp(self):
+        self.admin = ScopedPermissionAdmin(ScopedPermission, AdminSite())
+        self.request = admin_request(ScopedPermission)
+
+    def test__get_queryset__annotates_group_and_holder_counts_in_one_query(self):
+        permission = ScopedPermission.objects.create(scope="scope1:scope2")
+        ScopedPermission.objects.create(scope="scope3")
+        group = ScopedPermissionGroup.objects.create(name="Group")
+        group.scoped_permissions.add(permission)
+
+        user_one = UserFactory.create()
+        user_two = UserFactory.create()
+        user_one.scoped_permissions.add(permission)
+        user_two.scoped_permissions.add(permission)
+
+        with self.assertNumQueries(1):
+            counts = {
+                obj.scope: (obj.group_count, obj.holder_count)
+                for obj in self.admin.get_queryset(self.request)
+            }
+
+        self.assertEqual((1, 2), counts["scope1:scope2"])
+        self.assertEqual((0, 0), counts["scope3"])
+        self.assertEqual("holder_count", self.admin.holder_count.admin_order_field)
+
+    def test__get_queryset__only_annotates_counts_in_the_changelist(self):
+        ScopedPermission.objects.create(scope="scope1")
+
+        for request in (
+            admin_request(ScopedPermission, "change"),
+            RequestFactory().get("/"),
+        ):
+            queryset = self.admin.get_queryset(request)
+            self.assertNotIn("group_count", queryset.query.annotations)
+            self.assertNotIn("holder_count", queryset.query.annotations)
+
+    def test__get_search_results__matches_scope_prefix_and_modifiers(self):
+        ScopedPermission.objects.create(scope="company:1:user")
+        ScopedPermission.objects.create(scope="company:1:user", exclude=True)
+        ScopedPermission.objects.create(scope="company:2")
+        ScopedPermission.objects.create(scope="user:company:1")
+
+        queryset = ScopedPermission.objects.all()
+
+        result, _ = self.admin.get_search_results(self.request, queryset, "company:1")
+        self.assertEqual(2, result.count())
+
+        result, _ = self.admin.get_search_results(self.request, queryset, "-company")
+        self.assertListEqual(["-company:1:user"], [str(obj) for obj in result])
+
+        result, _ = self.admin.get_search_results(self.request, queryset, "")
+        self.assertEqual(4, result.count())
+
+
+class TestScopedPermissionGroupAdmin(TestCase):
+    def test__get_queryset__annotates_member_and_holder_counts(self):
+        admin = ScopedPermissionGroupAdmin(ScopedPermissionGroup, AdminSite())
+        group = ScopedPermissionGroup.objects.create(name="Group")
+        group.scoped_permissions.add(
+            ScopedPermission.objects.create(scope="scope1"),
+            ScopedPermission.objects.create(scope="scope2"),
+        )
+        UserFactory.create().scoped_permission_groups.add(group)
+
+        obj = admin.get_queryset(admin_request(ScopedPermissionGroup)).get(pk=group.pk)
+
+        self.assertEqual(2, obj.member_count)
+        self.assertEqual(1, obj.holder_count)
+        self.assertEqual("holder_count", admin.holder_count.admin_order_field)
+        self.assertNotIn(
+            "holder_count",
+            admin.get_queryset(RequestFactory().get("/")).query.annotations,
+        )
+        self.assertIn("scoped_permissions", admin.autocomplete_fields)
+
+
+class TestEstimatedCountPaginator(TestCase):
+    def test__non_postgres_database__falls_back_to_exact_count(self):
+        ScopedPermission.objects.create(scope="scope1")
+        ScopedPermission.objects.create(scope="scope2")
+
+        paginator = EstimatedCountPaginator(
+            ScopedPermission.objects.order_by("pk"), per_page=1
+        )
+        self.assertEqual(2, paginator.count)
+        self.assertEqual(2, paginator.num_pages)
@@ -0,0 +1,253 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, override_settings
+
+from django_scoped_permissions.backends import ScopedAuthenticationBackend, get_verb
+from django_scoped_permissions.core import scopes_grant_permissions
+from django_scoped_permissions.models import ScopedPermission, ScopedPermissionGroup
+from django_scoped_permissions.tests.factories import PetFactory, UserFactory
+from django_scoped_permissions.tests.models import User
+
+
+class TestScopedAuthenticationBackend(TestCase):
+    backend_path = "django_scoped_permissions.backends.ScopedAuthenticationBackend"
+
+    def setUp(self):
+        self.backend = ScopedAuthenticationBackend()
+
+    def test__has_perm__caches_granting_scopes_and_decisions(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("invoice:read")
+        user.add_or_create_permission("-invoice:read:secret")
+
+        self.assertTrue(self.backend.has_perm(user, "invoice:read"))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.backend.has_perm(user, "invoice:read"))
+            self.assertTrue(self.backend.has_perm(user, "invoice:read:1"))
+            self.assertFalse(self.backend.has_perm(user, "invoice:read:secret"))
+            self.assertFalse(self.backend.has_perm(user, "invoice:update"))
+
+        # Changes are picked up once the cache is cleared
+        user.add_or_create_permission("invoice:update")
+        self.assertFalse(self.backend.has_perm(user, "invoice:update"))
+        self.backend.clear_cache(user)
+        self.assertTrue(self.backend.has_perm(user, "invoice:update"))
+
+    def test__has_perms__resolves_granting_scopes_once(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("invoice:read")
+        user.add_or_create_permission("user")
+
+        # One query per source of scopes of the test user
+        with self.assertNumQueries(2):
+            self.assertTrue(
+                self.backend.has_perms(user, ["invoice:read", "user:1", "user:2"])
+            )
+            self.assertFalse(self.backend.has_perms(user, ["invoice:read", "company"]))
+
+    def test__get_verb__parses_django_style_permissions(self):
+        pet = PetFactory.build()
+
+        self.assertEqual("change", get_verb("tests.change_pet", pet))
+        self.assertEqual("approve", get_verb("tests.approve", pet))
+        self.assertEqual("tests.view_pet", get_verb("tests.view_pet"))
+        self.assertEqual("invoices.view_pet", get_verb("invoices.view_pet", pet))
+        self.assertEqual("pet:read", get_verb("pet:read", pet))
+
+    def test__has_perm__with_object__uses_verbs_and_cached_granting_scopes(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("pet:view")
+        pet = PetFactory.create(user=user)
+        other_pet = PetFactory.create()
+
+        self.assertTrue(self.backend.has_perm(user, "tests.view_pet", pet))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.backend.has_perm(user, "view", other_pet))
+            self.assertTrue(self.backend.has_perm(user, "tests.change_pet", pet))
+            self.assertFalse(self.backend.has_perm(user, "tests.change_pet", other_pet))
+            self.assertFalse(self.backend.has_perm(user, "tests.delete_pet", other_pet))
+            self.assertTrue(
+                self.backend.has_perms(user, ["tests.view_pet", "delete"], pet)
+            )
+            self.assertFalse(
+                self.backend.has_perms(
+                    user, ["tests.view_pet", "tests.delete_pet"], other_pet
+                )
+            )
+
+    def test__has_module_perms__checks_for_any_permission_within_the_app(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("invoice:1:read")
+        user.add_or_create_permission("-company")
+
+        self.assertTrue(self.backend.has_module_perms(user, "invoice"))
+        self.assertFalse(self.backend.has_module_perms(user, "company"))
+        self.assertFalse(self.backend.has_module_perms(user, "pet"))
+
+        user.add_or_create_permission("*")
+        self.backend.clear_cache(user)
+        self.assertTrue(self.backend.has_module_perms(user, "pet"))
+
+    def test__has_module_perms__respects_excluding_scopes(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("invoice:1:read")
+        user.add_or_create_permission("=company:1")
+        user.add_or_create_permission("*:2")
+        user.add_or_create_permission("-invoice")
+        user.add_or_create_permission("-=company:1")
+        user.add_or_create_permission("-company:2")
+        user.add_or_create_permission("-pet:2")
+
+        self.assertFalse(self.backend.has_module_perms(user, "invoice"))
+        self.assertFalse(self.backend.has_module_perms(user, "company"))
+        self.assertFalse(self.backend.has_module_perms(user, "pet"))
+        self.assertTrue(self.backend.has_module_perms(user, "vehicle"))
+
+        user.add_or_create_permission("=invoice:2")
+        self.backend.clear_cache(user)
+        self.assertTrue(self.backend.has_module_perms(user, "invoice"))
+
+    def test__anonymous_users_and_superusers__are_answered_without_scopes(self):
+        superuser = UserFactory.create(is_superuser=True)
+
+        self.assertFalse(self.backend.has_perm(AnonymousUser(), "invoice"))
+        self.assertFalse(self.backend.has_perms(AnonymousUser(), ["invoice"]))
+        self.assertFalse(self.backend.has_module_perms(AnonymousUser(), "invoice"))
+        self.assertTrue(self.backend.has_perm(superuser, "invoice"))
+        self.assertTrue(self.backend.has_perms(superuser, ["invoice", "company"]))
+        self.assertTrue(self.backend.has_module_perms(superuser, "invoice"))
+
+    def test__inactive_users__have_no_permissions(self):
+        user = UserFactory.create(is_active=False)
+        user.add_or_create_permission("invoice")
+        superuser = UserFactory.create(is_active=False, is_superuser=True)
+        pet = PetFactory.create(user=user)
+
+        for user_obj in (user, superuser):
+            self.assertFalse(self.backend.has_perm(user_obj, "invoice"))
+            self.assertFalse(self.backend.has_perm(user_obj, "read", pet))
+            self.assertFalse(self.backend.has_perms(user_obj, ["invoice"]))
+            self.assertFalse(self.backend.has_module_perms(user_obj, "invoice"))
+            self.assertSetEqual(set(), self.backend.get_all_permissions(user_obj))
+
+    def test__with_perm__matches_resolved_scopes_in_the_database(self):
+        group = ScopedPermissionGroup.objects.create(name="Accountants")
+        users = []
+        for scopes in (
+            [],
+            ["invoice"],
+            ["invoice:1"],
+            ["invoice:1:read"],
+            ["=invoice:1"],
+            ["=invoice"],
+            ["*"],
+            ["*:1"],
+            ["invoice:*:read"],
+            ["invoice", "-invoice:1"],
+            ["invoice", "-=invoice:1", "company"],
+            ["=invoice:1", "-invoice"],
+            ["-=invoice:1", "=invoice:1"],
+        ):
+            user = UserFactory.create()
+            for scope in scopes:
+                user.add_or_create_permission(scope)
+            users.append(user)
+
+        # Permissions held through groups
+        group_user = UserFactory.create()
+        group_user.add_or_create_permission("company")
+        group_user.scoped_permission_groups.add(group)
+        group.scoped_permissions.add(
+            ScopedPermission.objects.get_or_create(
+                scope="invoice", exclude=False, exact=False
+            )[0],
+            ScopedPermission.objects.get_or_create(
+                scope="invoice:1", exclude=True, exact=False
+            )[0],
+        )
+        users.append(group_user)
+
+        for perm in (
+            "invoice",
+            "invoice:1",
+            "invoice:2",
+            "invoice:1:read",
+            "company",
+            "*:1",
+        ):
+            expected = {
+                user.id
+                for user in users
+                if scopes_grant_permissions([perm], user.resolved_scopes)
+            }
+
+            self.assertSetEqual(
+                expected,
+                set(self.backend.with_perm(perm).values_list("id", flat=True)),
+                perm,
+            )
+
+    def test__with_perm__ignores_overrides_of_get_granting_scopes(self):
+        # The test user is granted "user:<id>" by its override of get_granting_scopes only
+        user = UserFactory.create()
+        other_user = UserFactory.create()
+        other_user.add_or_create_permission(f"user:{user.id}")
+
+        self.assertTrue(self.backend.has_perm(user, f"user:{user.id}"))
+        self.assertSetEqual(
+            {other_user}, set(self.backend.with_perm(f"user:{user.id}"))
+        )
+
+    def test__with_perm__filters_superusers_inactive_users_and_objects(self):
+        superuser = UserFactory.create(is_superuser=True)
+        inactive_user = UserFactory.create(is_active=False)
+        inactive_user.add_or_create_permission("pet")
+        user = UserFactory.create()
+        user.add_or_create_permission("pet:read")
+        pet = PetFactory.create()
+
+        self.assertSetEqual({superuser}, set(self.backend.with_perm("pet")))
+        self.assertSetEqual(
+            {inactive_user}, set(self.backend.with_perm("pet", is_active=False))
+        )
+        self.assertSetEqual(
+            set(), set(self.backend.with_perm("pet", include_superusers=False))
+        )
+        self.assertSetEqual(
+            {superuser, user}, set(self.backend.with_perm("read", obj=pet))
+        )
+        self.assertSetEqual({superuser}, set(self.backend.with_perm("update", obj=pet)))
+        self.assertSetEqual(
+            {superuser, user},
+            set(User.objects.with_perm("read", obj=pet, backend=self.backend_path)),
+        )
+
+    def test__get_all_permissions__returns_cached_granting_scopes(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("invoice:read")
+        user.add_or_create_permission("-=company")
+
+        self.assertSetEqual(
+            {"invoice:read", "-=company", f"user:{user.id}"},
+            self.backend.get_all_permissions(user),
+        )
+
+        with self.assertNumQueries(0):
+            self.assertIn("invoice:read", self.backend.get_all_permissions(user))
+
+        self.assertSetEqual(set(), self.backend.get_all_permissions(AnonymousUser()))
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=[
+            "django_scoped_permissions.backends.ScopedAuthenticationBackend"
+        ]
+    )
+    def test__user_methods__use_the_backend(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("invoice:read")
+
+        self.assertTrue(user.has_perm("invoice:read"))
+        self.assertTrue(user.has_perms(["invoice:read", f"user:{user.id}"]))
+        self.assertTrue(user.has_module_perms("invoice"))
+        self.assertFalse(user.has_module_perms("company"))
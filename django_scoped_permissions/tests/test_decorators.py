@@ -1,10 +1,20 @@
 from addict import Dict
+from asgiref.sync import async_to_sync
+from django.contrib.auth import login
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
 from django.core.exceptions import PermissionDenied
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 
-from django_scoped_permissions.decorators import gql_has_scoped_permissions
+from django_scoped_permissions.decorators import (
+    gql_has_scoped_permissions,
+    function_has_scoped_permissions,
+)
 from django_scoped_permissions.guards import ScopedPermissionGuard
-from django_scoped_permissions.models import ScopedPermission
+from django_scoped_permissions.models import (
+    ScopedPermission,
+    clear_cached_granting_scopes,
+)
 from django_scoped_permissions.tests.factories import UserFactory, CompanyFactory
 
 
@@ -64,12 +74,14 @@ class TestGqlHasScopedPermissions(TestCase):
         user.scoped_permissions.all().delete()
         perm = ScopedPermission.objects.create(scope="scope2")
         user.scoped_permissions.add(perm)
+        clear_cached_granting_scopes(user)
         wrapper_method(None, info)
 
         with self.assertRaises(PermissionDenied):
             user.scoped_permissions.all().delete()
             perm = ScopedPermission.objects.create(scope="scope3")
             user.scoped_permissions.add(perm)
+            clear_cached_granting_scopes(user)
             wrapper_method(None, info)
 
     def test__with_guard__uses_guard(self):
@@ -103,6 +115,7 @@ class TestGqlHasScopedPermissions(TestCase):
         user.scoped_permissions.all().delete()
         perm = ScopedPermission.objects.create(scope="verb")
         user.scoped_permissions.add(perm)
+        clear_cached_granting_scopes(user)
         wrapper_method(None, info)
 
     def test__with_verb_and_scope__uses_verb_and_scope(self):
@@ -122,6 +135,7 @@ class TestGqlHasScopedPermissions(TestCase):
         user.scoped_permissions.all().delete()
         perm = ScopedPermission.objects.create(scope="verb")
         user.scoped_permissions.add(perm)
+        clear_cached_granting_scopes(user)
         wrapper_method(None, info)
 
     def test__complex_permission_guard_combination__uses_guard(self):
@@ -149,11 +163,13 @@ class TestGqlHasScopedPermissions(TestCase):
         user.scoped_permissions.all().delete()
         perm = ScopedPermission.objects.create(scope="scope2:scope3")
         user.scoped_permissions.add(perm)
+        clear_cached_granting_scopes(user)
         wrapper_method(None, info)
 
         user.scoped_permissions.all().delete()
         perm = ScopedPermission.objects.create(scope="scope4")
         user.scoped_permissions.add(perm)
+        clear_cached_granting_scopes(user)
         wrapper_method(None, info)
 
         with self.assertRaises(PermissionDenied):
@@ -161,6 +177,7 @@ class TestGqlHasScopedPermissions(TestCase):
             perm = ScopedPermission.objects.create(scope="scope1")
             perm = ScopedPermission.objects.create(scope="scope2:read")
             user.scoped_permissions.add(perm)
+            clear_cached_granting_scopes(user)
             wrapper_method(None, info)
 
         with self.assertRaises(PermissionDenied):
@@ -168,3 +185,90 @@ class TestGqlHasScopedPermissions(TestCase):
             user.add_or_create_permission("scope1")
             user.add_or_create_permission("read")
             wrapper_method(None, info)
+
+    def test__coroutine_function__is_wrapped_in_async_wrapper(self):
+        @gql_has_scoped_permissions("company:{context.company.id}:read")
+        async def wrapper_method(self, info):
+            return "result"
+
+        user = UserFactory.create()
+        company = CompanyFactory.create()
+        user.add_or_create_permission(f"company:{company.id}")
+
+        info = Dict()
+        info.context.user = user
+        info.context.company = company
+        self.assertEqual("result", async_to_sync(wrapper_method)(None, info))
+
+        info.context.company = CompanyFactory.create()
+        with self.assertRaises(PermissionDenied):
+            async_to_sync(wrapper_method)(None, info)
+
+
+class TestFunctionHasScopedPermissions(TestCase):
+    def create_request(self, user):
+        # A request with the lazy user of AuthenticationMiddleware, which queries the session when accessed
+        request = RequestFactory().get("/")
+        SessionMiddleware(lambda request: None).process_request(request)
+        login(request, user, backend="django.contrib.auth.backends.ModelBackend")
+        AuthenticationMiddleware(lambda request: None).process_request(request)
+
+        return request
+
+    def test__coroutine_function__is_wrapped_in_async_wrapper(self):
+        @function_has_scoped_permissions("scope1")
+        async def view(request):
+            return "response"
+
+        user = UserFactory.create()
+        request = Dict(user=user)
+
+        with self.assertRaises(PermissionDenied):
+            async_to_sync(view)(request)
+
+        user.add_or_create_permission("scope1")
+        self.assertEqual("response", async_to_sync(view)(Dict(user=user)))
+
+    def test__granting_scopes__are_resolved_once_per_user(self):
+        @function_has_scoped_permissions("scope1")
+        def view(request):
+            return "response"
+
+        @function_has_scoped_permissions("scope1")
+        async def async_view(request):
+            return "response"
+
+        user = UserFactory.create()
+        user.add_or_create_permission("scope1")
+        request = Dict(user=user)
+        self.assertEqual("response", view(request))
+
+        with self.assertNumQueries(0):
+            self.assertEqual("response", view(request))
+            self.assertEqual("response", async_to_sync(async_view)(request))
+
+    def test__coroutine_function__resolves_lazy_user_outside_event_loop(self):
+        @function_has_scoped_permissions("scope1")
+        async def view(request):
+            return "response"
+
+        @gql_has_scoped_permissions("scope1")
+        async def resolver(cls, info):
+            return "result"
+
+        user = UserFactory.create()
+        user.add_or_create_permission("scope1")
+
+        self.assertEqual("response", async_to_sync(view)(self.create_request(user)))
+        self.assertEqual(
+            "result",
+            async_to_sync(resolver)(None, Dict(context=self.create_request(user))),
+        )
+
+        # Requests without auser resolve the lazy user in a thread
+        request = self.create_request(user)
+        del request.auser
+        self.assertEqual("response", async_to_sync(view)(request))
+
+        with self.assertRaises(PermissionDenied):
+            async_to_sync(view)(self.create_request(UserFactory.create()))
@@ -0,0 +1,102 @@
+from django.test import TestCase
+
+from django_scoped_permissions.expressions import (
+    GuardExpressionError,
+    compile_guard,
+    parse_guard,
+)
+from django_scoped_permissions.guards import ScopedPermissionGuard
+
+
+class TestGuardExpressions(TestCase):
+    def test__scope__parses_into_requirement(self):
+        guard = parse_guard("scope1:scope2")
+
+        self.assertTrue(guard.has_permission("scope1"))
+        self.assertFalse(guard.has_permission("scope2"))
+
+    def test__scope_with_verb__parses_into_requirement_with_verb(self):
+        guard = parse_guard("company:{input.company}@update")
+        context = {"input": {"company": 1}}
+
+        self.assertTrue(guard.has_permission("company:1:update", context))
+        self.assertTrue(guard.has_permission("update", context))
+        self.assertFalse(guard.has_permission("company:1:create", context))
+
+    def test__operators__evaluate_like_guard_operators(self):
+        scope1 = ScopedPermissionGuard("scope1")
+        scope2 = ScopedPermissionGuard("scope2")
+        scope3 = ScopedPermissionGuard("scope3")
+
+        for expression, guard in (
+            ("scope1 & scope2", scope1 & scope2),
+            ("scope1 | scope2", scope1 | scope2),
+            ("scope1 ^ scope2", scope1 ^ scope2),
+            ("!scope1", ~scope1),
+            ("~scope1 & scope2", ~scope1 & scope2),
+            ("scope1 | scope2 & scope3", scope1 | (scope2 & scope3)),
+            ("(scope1 | scope2) & scope3", (scope1 | scope2) & scope3),
+            ("scope1 ^ scope2 & scope3", scope1 ^ (scope2 & scope3)),
+            ("!!scope1", ~~scope1),
+        ):
+            parsed = parse_guard(expression)
+
+            for granting_scopes in (
+                [],
+                ["scope1"],
+                ["scope2"],
+                ["scope1", "scope2"],
+                ["scope2", "scope3"],
+                ["scope1", "scope2", "scope3"],
+            ):
+                self.assertEqual(
+                    guard.has_permission(granting_scopes),
+                    parsed.has_permission(granting_scopes),
+                    (expression, granting_scopes),
+                )
+
+    def test__constants__parse_into_constants(self):
+        self.assertTrue(parse_guard("true").has_permission([]))
+        self.assertFalse(parse_guard("false").has_permission(["scope1"]))
+        self.assertTrue(parse_guard("false | scope1").has_permission(["scope1"]))
+
+    def test__complex_expression__evaluates_correctly(self):
+        guard = parse_guard(
+            "(company:{input.company}:create | user:create) & !-=user:1"
+        )
+        context = {"input": {"company": 1}}
+
+        self.assertTrue(guard.has_permission(["company:1"], context))
+        self.assertTrue(guard.has_permission(["user:create"], context))
+        self.assertFalse(guard.has_permission(["company:2"], context))
+
+    def test__context_variables__may_contain_operator_characters(self):
+        guard = parse_guard("company:{input.company (id)} & user")
+        context = {"input": {"company (id)": 1}}
+
+        self.assertTrue(guard.has_permission(["company:1", "user"], context))
+        self.assertFalse(guard.has_permission(["company:2", "user"], context))
+
+    def test__invalid_expressions__raise_errors(self):
+        for expression in (
+            "",
+            "scope1 &",
+            "(scope1 | scope2",
+            "scope1 scope2",
+            "scope1 | )",
+            "company:{input",
+            "scope1@",
+            "@update",
+        ):
+            with self.assertRaises(GuardExpressionError, msg=expression):
+                parse_guard(expression)
+
+    def test__compile_guard__is_cached_per_expression(self):
+        compiled = compile_guard("scope1 | scope2@read")
+
+        self.assertIs(compiled, compile_guard("scope1 | scope2@read"))
+        self.assertTrue(compiled.has_permission(["scope2:read"]))
+        self.assertFalse(compiled.has_permission(["scope3"]))
+
+        # Wrapping the compiled guard reuses the compilation
+        self.assertIs(compiled, ScopedPermissionGuard(compiled).compile())
@@ -1,18 +1,36 @@
+from unittest import mock
+
 import graphene
 from addict import Dict
+from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase
 from graphene import Node, Schema
+from graphql import GraphQLError
 from graphql_relay import to_global_id
+from graphql_relay.connection.arrayconnection import offset_to_cursor
 
+from django_scoped_permissions import querysets
+from django_scoped_permissions.compiler import CompiledScopedPermissionGuard
 from django_scoped_permissions.graphql import (
     ScopedDjangoNode,
+    ScopedDjangoConnectionField,
     ScopedDjangoCreateMutation,
+    ScopedDjangoBatchCreateMutation,
     ScopedDjangoUpdateMutation,
     ScopedDjangoPatchMutation,
+    ScopedDjangoDeleteMutation,
+    ScopedDjangoBatchDeleteMutation,
+    ScopedDjangoFilterDeleteMutation,
+    ScopedPermissionGraphQLMiddleware,
 )
 from django_scoped_permissions.guards import ScopedPermissionGuard
-from django_scoped_permissions.tests.factories import UserFactory
-from django_scoped_permissions.tests.models import User
+from django_scoped_permissions.models import clear_cached_granting_scopes
+from django_scoped_permissions.tests.factories import (
+    PetFactory,
+    UserFactory,
+    VehicleFactory,
+)
+from django_scoped_permissions.tests.models import Pet, User, Vehicle
 
 
 class TestScopedDjangoNode(TestCase):
@@ -161,6 +179,237 @@ class TestScopedDjangoNode(TestCase):
         self.assertIsNotNone(result.errors)
 
 
+class TestScopedDjangoNodeFetching(TestCase):
+    def test__get_node__fetches_the_object_once(self):
+        class ScopedPetNode(ScopedDjangoNode):
+            class Meta:
+                model = Pet
+
+        user = UserFactory.create()
+        pet = PetFactory.create(user=user)
+        info = Dict(context=Dict(user=user))
+
+        with mock.patch.object(
+            ScopedPetNode, "get_queryset", side_effect=lambda queryset, info: queryset
+        ) as get_queryset:
+            self.assertEqual(pet, ScopedPetNode.get_node(info, pet.id))
+
+        self.assertEqual(1, get_queryset.call_count)
+
+        with self.assertRaises(Pet.DoesNotExist):
+            ScopedPetNode.get_node(info, pet.id + 100)
+
+        with self.assertRaises(GraphQLError):
+            ScopedPetNode.get_node(info, PetFactory.create().id)
+
+    def test__get_nodes__fetches_and_checks_objects_in_one_batch(self):
+        class ScopedVehicleNode(ScopedDjangoNode):
+            class Meta:
+                model = Vehicle
+                node_permissions = ScopedPermissionGuard(
+                    scope="{required_scopes}", verb="read"
+                )
+
+        user = UserFactory.create()
+        vehicle = VehicleFactory.create(user=user)
+        other_vehicle = VehicleFactory.create()
+        another_vehicle = VehicleFactory.create(user=user)
+        info = Dict(context=Dict(user=user))
+        ids = [another_vehicle.id, other_vehicle.id, str(vehicle.id), vehicle.id + 100]
+
+        with mock.patch.object(
+            CompiledScopedPermissionGuard,
+            "has_permission_many",
+            autospec=True,
+            side_effect=CompiledScopedPermissionGuard.has_permission_many,
+        ) as has_permission_many:
+            with self.assertNumQueries(3):
+                # Two queries resolve the scopes of the user, one fetches the vehicles
+                nodes = ScopedVehicleNode.get_nodes(info, ids)
+
+        self.assertEqual(1, has_permission_many.call_count)
+        self.assertEqual([another_vehicle, None, vehicle, None], nodes)
+
+
+class CountableConnection(graphene.relay.Connection):
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int()
+
+    def resolve_total_count(root, info):
+        return root.length
+
+
+class TestScopedDjangoConnectionField(TestCase):
+    query = """
+        query Pets($first: Int){
+            pets(first: $first){
+                totalCount
+                edges {
+                    node {
+                        name
+                    }
+                }
+            }
+        }
+    """
+
+    vehicle_query = """
+        query Vehicles($first: Int){
+            vehicles(first: $first){
+                totalCount
+                edges {
+                    node {
+                        name
+                    }
+                }
+            }
+        }
+    """
+
+    def test__models_with_scope_patterns__are_filtered_in_the_database(self):
+        class ScopedVehicleNode(ScopedDjangoNode):
+            class Meta:
+                model = Vehicle
+                connection_class = CountableConnection
+
+        class Query(graphene.ObjectType):
+            vehicles = ScopedDjangoConnectionField(ScopedVehicleNode)
+
+        user = UserFactory.create()
+        VehicleFactory.create(user=user, name="Mons")
+        VehicleFactory.create(user=user, name="Pus")
+        VehicleFactory.create(name="Fido")
+
+        schema = Schema(query=Query)
+
+        # The permissions are checked without rendering the required scopes of any vehicle
+        with mock.patch.object(
+            Vehicle, "get_required_scopes", side_effect=AssertionError
+        ):
+            result = schema.execute(
+                self.vehicle_query, variables={"first": 1}, context=Dict(user=user)
+            )
+
+        self.assertIsNone(result.errors)
+        data = Dict(result.data)
+        self.assertEqual(2, data.vehicles.totalCount)
+        self.assertEqual(["Mons"], [edge.node.name for edge in data.vehicles.edges])
+
+    def test__node_permissions__are_checked_in_batches(self):
+        class ScopedPetNode(ScopedDjangoNode):
+            class Meta:
+                model = Pet
+                connection_class = CountableConnection
+                node_permissions = ScopedPermissionGuard(
+                    scope="{required_scopes}", verb="read"
+                )
+
+        class Query(graphene.ObjectType):
+            pets = ScopedDjangoConnectionField(ScopedPetNode)
+
+        user = UserFactory.create()
+        PetFactory.create(user=user, name="Mons")
+        PetFactory.create(name="Fido")
+        PetFactory.create(user=user, name="Pus")
+
+        schema = Schema(query=Query)
+
+        with mock.patch.object(
+            CompiledScopedPermissionGuard,
+            "has_permission_many",
+            autospec=True,
+            side_effect=CompiledScopedPermissionGuard.has_permission_many,
+        ) as has_permission_many:
+            result = schema.execute(self.query, context=Dict(user=user))
+
+        self.assertIsNone(result.errors)
+        # One batch to count the pets, and one to fetch the page
+        self.assertEqual(2, has_permission_many.call_count)
+        data = Dict(result.data)
+        self.assertEqual(2, data.pets.totalCount)
+        self.assertEqual(["Mons", "Pus"], [edge.node.name for edge in data.pets.edges])
+
+    def test__node_permissions__only_fetch_pages_up_to_their_end(self):
+        class ScopedPetNode(ScopedDjangoNode):
+            class Meta:
+                model = Pet
+                connection_class = CountableConnection
+                node_permissions = ScopedPermissionGuard(
+                    scope="{required_scopes}", verb="read"
+                )
+
+        class Query(graphene.ObjectType):
+            pets = ScopedDjangoConnectionField(ScopedPetNode)
+
+        user = UserFactory.create()
+        for i in range(6):
+            PetFactory.create(user=user, name=f"Pet {i}")
+            PetFactory.create()
+
+        schema = Schema(query=Query)
+        query = """
+            query Pets($first: Int, $after: String){
+                pets(first: $first, after: $after){
+                    totalCount
+                    edges {
+                        node {
+                            name
+                        }
+                    }
+                }
+            }
+        """
+
+        checked = []
+
+        def has_permission_many(guard, granting_scopes, contexts, **kwargs):
+            checked.extend(contexts)
+            return original_has_permission_many(
+                guard, granting_scopes, contexts, **kwargs
+            )
+
+        original_has_permission_many = CompiledScopedPermissionGuard.has_permission_many
+
+        with mock.patch.object(
+            querysets, "PERMISSION_CHECK_CHUNK_SIZE", 2
+        ), mock.patch.object(
+            CompiledScopedPermissionGuard,
+            "has_permission_many",
+            autospec=True,
+            side_effect=has_permission_many,
+        ):
+            result = schema.execute(
+                query,
+                variables={"first": 2, "after": offset_to_cursor(1)},
+                context=Dict(user=user),
+            )
+
+        self.assertIsNone(result.errors)
+        data = Dict(result.data)
+        self.assertEqual(6, data.pets.totalCount)
+        self.assertEqual(
+            ["Pet 2", "Pet 3"], [edge.node.name for edge in data.pets.edges]
+        )
+        # Every pet is checked for the count, but only the first eight for the page
+        self.assertEqual(12 + 8, len(checked))
+
+    def test__anonymous_users__are_not_permitted(self):
+        class ScopedPetNode(ScopedDjangoNode):
+            class Meta:
+                model = Pet
+                connection_class = CountableConnection
+
+        class Query(graphene.ObjectType):
+            pets = ScopedDjangoConnectionField(ScopedPetNode)
+
+        PetFactory.create()
+
+        result = Schema(query=Query).execute(self.query, context=Dict(user=None))
+        self.assertIsNotNone(result.errors)
+
+
 class TestScopedCreateMutation(TestCase):
     def test__permissions_set__respects_permissions(
         self,
@@ -653,3 +902,534 @@ class TestFieldPermissions(TestCase):
             context=Dict(user=user_two),
         )
         self.assertIsNotNone(result.errors)
+
+    def test__field_permissions__are_resolved_synchronously_by_default(self):
+        class UserNode(ScopedDjangoNode):
+            class Meta:
+                model = User
+                field_permissions = {"first_name": "user:first-name:read"}
+
+        user = UserFactory.create(first_name="Tormod")
+        user.add_or_create_permission("user:first-name:read")
+        info = Dict(context=Dict(user=user))
+
+        self.assertEqual("Tormod", UserNode.resolve_first_name(user, info))
+
+        with self.assertRaises(GraphQLError):
+            UserNode.resolve_first_name(user, Dict(context=Dict(user=UserFactory())))
+
+    def test__field_permissions_of_lists__are_checked_in_one_batch_if_batched(self):
+        class UserNode(ScopedDjangoNode):
+            class Meta:
+                model = User
+                batch_field_permissions = True
+                field_permissions = {
+                    "first_name": "user:first-name:read",
+                    "last_name": ScopedPermissionGuard("{field_scopes}", "read"),
+                }
+
+        class Query(graphene.ObjectType):
+            users = graphene.List(UserNode)
+
+            def resolve_users(self, info):
+                return User.objects.order_by("id")
+
+        users = UserFactory.create_batch(5)
+        user = users[0]
+        user.add_or_create_permission("user:first-name:read")
+        user.add_or_create_permission(f"user:{user.id}")
+
+        schema = Schema(query=Query)
+        query = """
+            query {
+                users {
+                    firstName
+                    lastName
+                }
+            }
+        """
+
+        with mock.patch.object(
+            User,
+            "get_granting_scopes",
+            autospec=True,
+            side_effect=User.get_granting_scopes,
+        ) as get_granting_scopes, mock.patch.object(
+            CompiledScopedPermissionGuard,
+            "has_permission_many",
+            autospec=True,
+            side_effect=CompiledScopedPermissionGuard.has_permission_many,
+        ) as has_permission_many:
+            result = schema.execute(query, context=Dict(user=user))
+
+        get_granting_scopes.assert_called_once()
+        # One call per guard
+        self.assertEqual(2, has_permission_many.call_count)
+
+        # Only the last name of the user itself is permitted. The field is non-null, so the other
+        # users are nulled.
+        self.assertDictEqual(
+            {"firstName": user.first_name, "lastName": user.last_name},
+            result.data["users"][0],
+        )
+        self.assertListEqual([None] * 4, result.data["users"][1:])
+        self.assertEqual(4, len(result.errors))
+
+
+class TestScopedPermissionGraphQLMiddleware(TestCase):
+    query = """
+        query User($id: ID!){
+            user(id: $id){
+                id
+                firstName
+                email
+            }
+        }
+    """
+
+    def create_schema(self):
+        # This registers the UserNode type
+        # noinspection PyUnresolvedReferences
+        class UserNode(ScopedDjangoNode):
+            class Meta:
+                model = User
+                field_permissions = {
+                    "first_name": "user:first-name:read",
+                    "email": lambda user, info: info.context.user == user,
+                }
+                field_permissions_in_middleware = True
+
+            def resolve_first_name(self, info):
+                return self.first_name.upper()
+
+        class Query(graphene.ObjectType):
+            user = Node.Field(UserNode)
+
+        return Schema(query=Query)
+
+    def test__middleware__guards_fields_with_custom_resolvers(self):
+        schema = self.create_schema()
+        user = UserFactory.create(first_name="Tormod", last_name="Haugland")
+        user_two = UserFactory.create()
+        user_two.add_or_create_permission("user:read")
+
+        for middleware in (
+            ScopedPermissionGraphQLMiddleware(schema),
+            ScopedPermissionGraphQLMiddleware(),
+        ):
+            result = schema.execute(
+                self.query,
+                variables={"id": to_global_id("UserNode", user.id)},
+                context=Dict(user=user_two),
+                middleware=[middleware],
+            )
+            # The non-null fields null the user
+            self.assertIsNone(result.data["user"])
+            self.assertSetEqual(
+                {"You are not permitted to view this."},
+                {error.message for error in result.errors},
+            )
+
+            user.add_or_create_permission("user:first-name:read")
+            result = schema.execute(
+                self.query,
+                variables={"id": to_global_id("UserNode", user.id)},
+                context=Dict(user=user),
+                middleware=[middleware],
+            )
+            self.assertIsNone(result.errors)
+            data = Dict(result.data)
+            self.assertEqual("TORMOD", data.user.firstName)
+            self.assertEqual(user.email, data.user.email)
+
+            user.scoped_permissions.clear()
+
+    def test__fields__fail_closed_without_middleware(self):
+        schema = self.create_schema()
+        user = UserFactory.create(first_name="Tormod")
+        user.add_or_create_permission("user:first-name:read")
+
+        result = schema.execute(
+            self.query,
+            variables={"id": to_global_id("UserNode", user.id)},
+            context=Dict(user=user),
+        )
+
+        self.assertIsNone(result.data["user"])
+        self.assertIn(
+            "ScopedPermissionGraphQLMiddleware, which is not installed",
+            result.errors[0].message,
+        )
+
+
+class TestScopedBatchCreateMutation(TestCase):
+    mutation = """
+        mutation BatchCreateUser(
+            $input: [BatchCreateUserInput]! 
+        ){
+            batchCreateUser(input: $input){
+                users{
+                    id
+                    username
+                }
+            }
+        }
+    """
+
+    def create_schema(self, allow_partial=False, check_items=True):
+        # This registers the UserNode type
+        # noinspection PyUnresolvedReferences
+        from .schema import UserNode
+
+        class BatchCreateUserMutation(ScopedDjangoBatchCreateMutation):
+            class Meta:
+                model = User
+                exclude_fields = ("password",)
+                item_permissions = (
+                    ScopedPermissionGuard(
+                        scope="username:{input.username}", verb="create"
+                    )
+                    if check_items
+                    else None
+                )
+                allow_partial_authorization = allow_partial
+                return_field_name = "users"
+
+        class Mutations(graphene.ObjectType):
+            batch_create_user = BatchCreateUserMutation.Field()
+
+        return Schema(mutation=Mutations)
+
+    def execute(self, schema, user):
+        return schema.execute(
+            self.mutation,
+            variables={
+                "input": [
+                    {
+                        "username": username,
+                        "firstName": "Tormod",
+                        "lastName": "Haugland",
+                        "email": f"{username}@ursolutions.no",
+                    }
+                    for username in ("tormod", "tormodsen", "haugland")
+                ]
+            },
+            context=Dict(user=user),
+        )
+
+    def test__item_permissions__are_checked_per_item(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("username:tormod:create")
+        user.add_or_create_permission("username:haugland:create")
+
+        result = self.execute(self.create_schema(), user)
+
+        self.assertEqual(
+            "You are not permitted to view this.", result.errors[0].message
+        )
+        self.assertFalse(User.objects.filter(username="tormod").exists())
+
+        user.add_or_create_permission("username:tormodsen:create")
+        result = self.execute(self.create_schema(), user)
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(3, len(result.data["batchCreateUser"]["users"]))
+
+    def test__allow_partial_authorization__skips_unauthorized_items(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("username:tormod:create")
+        user.add_or_create_permission("username:haugland:create")
+
+        result = self.execute(self.create_schema(allow_partial=True), user)
+
+        self.assertIsNone(result.errors)
+        self.assertListEqual(
+            ["tormod", "haugland"],
+            [user["username"] for user in result.data["batchCreateUser"]["users"]],
+        )
+        self.assertFalse(User.objects.filter(username="tormodsen").exists())
+
+    def test__no_permissions__creates_all_items(self):
+        result = self.execute(
+            self.create_schema(check_items=False), UserFactory.create()
+        )
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(3, len(result.data["batchCreateUser"]["users"]))
+
+
+class TestScopedBatchDeleteMutation(TestCase):
+    mutation = """
+        mutation BatchDeletePets($ids: [ID]!){
+            batchDeletePets(ids: $ids){
+                deletionCount
+                deletedIds
+                missedIds
+            }
+        }
+    """
+
+    def create_schema(self, allow_partial=False):
+        # This registers the PetNode type
+        # noinspection PyUnresolvedReferences
+        from .schema import PetNode
+
+        class BatchDeletePetsMutation(ScopedDjangoBatchDeleteMutation):
+            class Meta:
+                model = Pet
+                check_object_permissions = True
+                allow_partial_authorization = allow_partial
+
+        class Mutations(graphene.ObjectType):
+            batch_delete_pets = BatchDeletePetsMutation.Field()
+
+        return Schema(mutation=Mutations)
+
+    def test__object_permissions__are_checked_in_one_query(self):
+        user = UserFactory.create()
+        pets = [PetFactory.create(user=user), PetFactory.create(user=user)]
+        other_pet = PetFactory.create()
+        ids = [to_global_id("PetNode", pet.id) for pet in pets]
+        schema = self.create_schema()
+
+        result = schema.execute(
+            self.mutation,
+            variables={"ids": ids + [to_global_id("PetNode", other_pet.id)]},
+            context=Dict(user=user),
+        )
+
+        self.assertEqual(
+            "You are not permitted to view this.", result.errors[0].message
+        )
+        self.assertEqual(3, Pet.objects.count())
+
+        # Missing objects are left to the mutation
+        missing_id = to_global_id("PetNode", other_pet.id + 100)
+
+        # The granting scopes are resolved once for all objects
+        clear_cached_granting_scopes(user)
+        with mock.patch.object(
+            User,
+            "get_granting_scopes",
+            autospec=True,
+            side_effect=User.get_granting_scopes,
+        ) as get_granting_scopes:
+            result = schema.execute(
+                self.mutation,
+                variables={"ids": ids + [missing_id]},
+                context=Dict(user=user),
+            )
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(1, get_granting_scopes.call_count)
+        self.assertEqual(2, result.data["batchDeletePets"]["deletionCount"])
+        self.assertListEqual([missing_id], result.data["batchDeletePets"]["missedIds"])
+        self.assertListEqual([other_pet], list(Pet.objects.all()))
+
+    def test__allow_partial_authorization__skips_unauthorized_objects(self):
+        user = UserFactory.create()
+        pet = PetFactory.create(user=user)
+        other_pet = PetFactory.create()
+
+        result = self.create_schema(allow_partial=True).execute(
+            self.mutation,
+            variables={
+                "ids": [
+                    to_global_id("PetNode", other_pet.id),
+                    to_global_id("PetNode", pet.id),
+                ]
+            },
+            context=Dict(user=user),
+        )
+
+        self.assertIsNone(result.errors)
+        self.assertListEqual(
+            [to_global_id("PetNode", pet.id)],
+            result.data["batchDeletePets"]["deletedIds"],
+        )
+        self.assertListEqual([other_pet], list(Pet.objects.all()))
+
+
+class TestScopedFilterDeleteMutation(TestCase):
+    mutation = """
+        mutation FilterDeleteVehicles($input: BatchDeleteVehicleInput!){
+            filterDeleteVehicles(input: $input){
+                deletionCount
+                excludedCount
+            }
+        }
+    """
+
+    def create_schema(self):
+        # This registers the VehicleNode type
+        # noinspection PyUnresolvedReferences
+        from .schema import VehicleNode
+
+        class FilterDeleteVehiclesMutation(ScopedDjangoFilterDeleteMutation):
+            class Meta:
+                model = Vehicle
+                filter_fields = ("name",)
+                filter_by_permissions = True
+
+        class Mutations(graphene.ObjectType):
+            filter_delete_vehicles = FilterDeleteVehiclesMutation.Field()
+
+        return Schema(mutation=Mutations)
+
+    def test__filter_by_permissions__deletes_only_permitted_rows(self):
+        user = UserFactory.create()
+        VehicleFactory.create(user=user, name="Mons")
+        VehicleFactory.create(user=user, name="Mons")
+        VehicleFactory.create(user=user, name="Pus")
+        other_vehicle = VehicleFactory.create(name="Mons")
+
+        result = self.create_schema().execute(
+            self.mutation,
+            variables={"input": {"name": "Mons"}},
+            context=Dict(user=user),
+        )
+
+        self.assertIsNone(result.errors)
+        data = Dict(result.data)
+        self.assertEqual(2, data.filterDeleteVehicles.deletionCount)
+        self.assertEqual(1, data.filterDeleteVehicles.excludedCount)
+        self.assertListEqual(
+            [other_vehicle.id],
+            list(Vehicle.objects.filter(name="Mons").values_list("id", flat=True)),
+        )
+        self.assertTrue(Vehicle.objects.filter(name="Pus").exists())
+
+    def test__filter_by_permissions__deletes_nothing_without_permitted_rows(self):
+        user = UserFactory.create()
+        VehicleFactory.create_batch(2, name="Mons")
+
+        result = self.create_schema().execute(
+            self.mutation,
+            variables={"input": {"name": "Mons"}},
+            context=Dict(user=user),
+        )
+
+        self.assertIsNone(result.errors)
+        data = Dict(result.data)
+        self.assertEqual(0, data.filterDeleteVehicles.deletionCount)
+        self.assertEqual(2, data.filterDeleteVehicles.excludedCount)
+        self.assertEqual(2, Vehicle.objects.filter(name="Mons").count())
+
+    def test__filter_by_permissions__requires_scope_patterns(self):
+        # This registers the UserNode type
+        # noinspection PyUnresolvedReferences
+        from .schema import UserNode
+
+        with self.assertRaises(ImproperlyConfigured):
+
+            class FilterDeleteUsersMutation(ScopedDjangoFilterDeleteMutation):
+                class Meta:
+                    model = User
+                    filter_fields = ("username",)
+                    filter_by_permissions = True
+
+
+class TestMutationPermissionGuards(TestCase):
+    mutation = """
+        mutation CreateUser(
+            $input: CreateUserInput! 
+        ){
+            createUser(input: $input){
+                user{
+                    id
+                }
+            }
+        }
+    """
+    variables = {
+        "input": {
+            "username": "tormod",
+            "firstName": "Tormod",
+            "lastName": "Haugland",
+            "email": "tormod.haugland@gmail.com",
+        }
+    }
+
+    def test__static_permissions__are_compiled_once_per_class(self):
+        # This registers the UserNode type
+        # noinspection PyUnresolvedReferences
+        from .schema import UserNode
+
+        class CreateUserMutation(ScopedDjangoCreateMutation):
+            class Meta:
+                model = User
+                exclude_fields = ("password",)
+                permissions = ("user:create",)
+
+        class Mutations(graphene.ObjectType):
+            create_user = CreateUserMutation.Field()
+
+        self.assertIsInstance(
+            CreateUserMutation._permission_guard, CompiledScopedPermissionGuard
+        )
+
+        user = UserFactory.create()
+        schema = Schema(mutation=Mutations)
+
+        with mock.patch(
+            "django_scoped_permissions.graphql.ScopedPermissionGuard"
+        ) as guard_class:
+            result = schema.execute(
+                self.mutation, variables=self.variables, context=Dict(user=user)
+            )
+
+        self.assertIsNotNone(result.errors)
+        guard_class.assert_not_called()
+
+    def test__default_permissions__are_compiled_with_the_verb_of_the_class(self):
+        class DeleteUserMutation(ScopedDjangoDeleteMutation):
+            class Meta:
+                model = User
+                verb = "remove"
+
+        user = UserFactory.create()
+        self.assertTrue(
+            DeleteUserMutation._permission_guard.has_permission(
+                [f"user:{user.id}:remove"],
+                {"required_scopes": user.get_required_scopes()},
+            )
+        )
+        self.assertFalse(
+            DeleteUserMutation._permission_guard.has_permission(
+                [f"user:{user.id}:delete"],
+                {"required_scopes": user.get_required_scopes()},
+            )
+        )
+
+    def test__overridden_get_permissions__is_called_per_mutation(self):
+        # This registers the UserNode type
+        # noinspection PyUnresolvedReferences
+        from .schema import UserNode
+
+        calls = []
+
+        class CreateUserMutation(ScopedDjangoCreateMutation):
+            class Meta:
+                model = User
+                exclude_fields = ("password",)
+
+            @classmethod
+            def get_permissions(cls, root, info, input):
+                calls.append(input.username)
+                return [f"user:{input.username}:create"]
+
+        class Mutations(graphene.ObjectType):
+            create_user = CreateUserMutation.Field()
+
+        self.assertIsNone(CreateUserMutation._permission_guard)
+
+        user = UserFactory.create()
+        user.add_or_create_permission("user:tormod:create")
+        schema = Schema(mutation=Mutations)
+
+        result = schema.execute(
+            self.mutation, variables=self.variables, context=Dict(user=user)
+        )
+
+        self.assertIsNone(result.errors)
+        self.assertListEqual(["tormod"], calls)
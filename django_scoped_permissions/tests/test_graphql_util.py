@@ -1,14 +1,29 @@
+import itertools
+from collections import namedtuple
+
+import graphene
 from django.test import TestCase
 
-from django_scoped_permissions.util import expand_scopes, expand_scopes_from_context
+from django_scoped_permissions.models import ScopedPermission
+from django_scoped_permissions.util import (
+    ContextAccessor,
+    ContextValues,
+    ScopeTemplate,
+    expand_scopes,
+    expand_scopes_from_context,
+    get_context_accessor,
+    get_scope_template,
+    iter_expand_scopes,
+    iter_expand_scopes_from_context,
+)
 
 
 class TestExpandScopes(TestCase):
     def test__no_expansions__return_scopes(self):
         scopes = ["some:scope", "another:scope"]
 
-        self.assertListEqual(scopes, list(expand_scopes(scopes)))
-        self.assertListEqual(scopes, list(expand_scopes(scopes, {})))
+        self.assertListEqual(scopes, expand_scopes(scopes))
+        self.assertListEqual(scopes, expand_scopes(scopes, {}))
 
     def test__single_expansion_array__returns_interpolated_expansion(self):
         scopes = ["some:{scope}", "another:scope"]
@@ -25,6 +40,44 @@ class TestExpandScopes(TestCase):
             sorted(["another:scope", "some:epic", "some:epic2"]),
         )
 
+    def test__scopes__are_only_expanded_over_their_own_variables(self):
+        scopes = ["some:{scope}", "another:{other}", "static:scope"]
+
+        self.assertListEqual(
+            sorted(
+                expand_scopes(
+                    scopes, {"scope": ["epic", "epic2"], "other": [str(i) for i in range(3)]}
+                )
+            ),
+            sorted(
+                [
+                    "another:0",
+                    "another:1",
+                    "another:2",
+                    "some:epic",
+                    "some:epic2",
+                    "static:scope",
+                ]
+            ),
+        )
+
+        # A variable without values only removes the scopes referencing it
+        self.assertListEqual(
+            sorted(expand_scopes(scopes, {"scope": [], "other": ["1"]})),
+            ["another:1", "static:scope"],
+        )
+
+    def test__expansion__is_lazy(self):
+        def scopes():
+            yield "some:{scope}"
+            raise AssertionError("Expanded past the first scope")
+
+        expanded = iter_expand_scopes(scopes(), {"scope": ["0", "1", "2"]})
+
+        self.assertListEqual(
+            ["some:0", "some:1", "some:2"], list(itertools.islice(expanded, 3))
+        )
+
 
 class TestExpandScopesFromContext(TestCase):
     def test__expand_with_various_objects__succeeds(self):
@@ -78,3 +131,129 @@ class TestExpandScopesFromContext(TestCase):
                 ["some:2", "some:3", "some:result-1", "some:result-2", "some:Hi there"]
             ),
         )
+
+
+class TestScopeTemplate(TestCase):
+    def test__parse__splits_literals_and_variables(self):
+        template = ScopeTemplate("company:{input.company}:user:{user.id}:{input.company}")
+
+        self.assertFalse(template.is_static)
+        self.assertTupleEqual(("input.company", "user.id"), template.variables)
+        self.assertEqual("company:1:user:2:1", template.render(["1", "2"]))
+
+    def test__static_scope__expands_to_itself(self):
+        template = ScopeTemplate("company:1:user")
+
+        self.assertTrue(template.is_static)
+        self.assertListEqual(["company:1:user"], list(template.expand({})))
+
+    def test__expand__yields_one_scope_per_value(self):
+        template = ScopeTemplate("company:{company}:user:{user.id}")
+
+        self.assertListEqual(
+            ["company:1:user:3", "company:2:user:3"],
+            list(template.expand({"company": [1, 2], "user": {"id": 3}})),
+        )
+
+    def test__get_scope_template__is_cached(self):
+        self.assertIs(
+            get_scope_template("company:{company}"),
+            get_scope_template("company:{company}"),
+        )
+
+
+class TestContextAccessor(TestCase):
+    def test__dictionaries__are_accessed_by_key(self):
+        accessor = ContextAccessor("input.facility.id")
+
+        self.assertEqual(3, accessor({"input": {"facility": {"id": 3}}}))
+        self.assertIsNone(accessor({"input": {}}))
+        self.assertIsNone(accessor({}))
+
+    def test__dictionaries__do_not_expose_attributes(self):
+        self.assertIsNone(ContextAccessor("input.items")({"input": {}}))
+
+    def test__sequences__are_accessed_by_index(self):
+        context = {"input": {"facilities": [1, 2]}}
+
+        self.assertEqual(2, ContextAccessor("input.facilities.1")(context))
+        self.assertEqual(2, ContextAccessor("input.facilities[1]")(context))
+        self.assertIsNone(ContextAccessor("input.facilities.2")(context))
+
+    def test__objects__are_accessed_by_attribute(self):
+        Point = namedtuple("Point", ["x", "y"])
+
+        class SomeClass:
+            def __init__(self):
+                self.point = Point(1, 2)
+
+        self.assertEqual(2, ContextAccessor("object.point.y")({"object": SomeClass()}))
+        self.assertIsNone(ContextAccessor("object.missing")({"object": SomeClass()}))
+
+    def test__model_instances__are_accessed_by_attribute(self):
+        permission = ScopedPermission(scope="company:1", exact=True)
+
+        self.assertEqual("company:1", ContextAccessor("object.scope")({"object": permission}))
+        self.assertTrue(ContextAccessor("object.exact")({"object": permission}))
+
+    def test__graphene_input_objects__are_accessed_by_key(self):
+        class FacilityInput(graphene.InputObjectType):
+            facility = graphene.ID()
+            name = graphene.String()
+
+        input = FacilityInput._meta.container({"facility": "3"})
+
+        self.assertEqual("3", ContextAccessor("input.facility")({"input": input}))
+        self.assertIsNone(ContextAccessor("input.name")({"input": input}))
+
+    def test__getters__are_specialized_per_type(self):
+        accessor = ContextAccessor("value.id")
+
+        class SomeClass:
+            id = 2
+
+        self.assertEqual(1, accessor({"value": {"id": 1}}))
+        self.assertEqual(2, accessor({"value": SomeClass()}))
+        self.assertEqual(3, accessor({"value": {"id": 3}}))
+
+    def test__get_context_accessor__is_cached(self):
+        self.assertIs(get_context_accessor("input.id"), get_context_accessor("input.id"))
+
+
+class TestContextValues(TestCase):
+    def test__variables__are_resolved_once_per_evaluation(self):
+        class Input:
+            accesses = 0
+
+            @property
+            def facility(self):
+                Input.accesses += 1
+                return 3
+
+        scopes = [
+            "facility:{input.facility}:create",
+            "facility:{input.facility}:update",
+            "company:1:facility:{input.facility}",
+        ]
+
+        self.assertListEqual(
+            ["facility:3:create", "facility:3:update", "company:1:facility:3"],
+            expand_scopes_from_context(scopes, {"input": Input()}),
+        )
+        self.assertEqual(1, Input.accesses)
+
+    def test__iter_expand_scopes_from_context__is_lazy(self):
+        def scopes():
+            yield "some:{ids}"
+            raise AssertionError("Expanded past the first scope")
+
+        expanded = iter_expand_scopes_from_context(scopes(), {"ids": [1, 2]})
+
+        self.assertListEqual(["some:1", "some:2"], list(itertools.islice(expanded, 2)))
+
+    def test__coerce__reuses_values(self):
+        values = ContextValues({"id": 1})
+
+        self.assertIs(values, ContextValues.coerce(values))
+        self.assertEqual(1, values.get("id"))
+        self.assertListEqual(["1"], values.get_strings("id"))
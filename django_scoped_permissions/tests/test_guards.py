@@ -1,6 +1,27 @@
+from unittest import mock
+
+from addict import Dict
+from asgiref.sync import async_to_sync
 from django.test import TestCase
 
-from django_scoped_permissions.guards import ScopedPermissionGuard
+from django_scoped_permissions import guards
+from django_scoped_permissions.compiler import PermissionCache, get_permission_cache
+from django_scoped_permissions.core import GrantingScopeSet
+from django_scoped_permissions.guards import ScopedPermissionGuard, SPRUnOp
+
+
+class RecordingNode(SPRUnOp):
+    """
+    A scope node recording its value in `evaluated` whenever it is evaluated.
+    """
+
+    def __init__(self, value, evaluated):
+        super().__init__(value)
+        self.evaluated = evaluated
+
+    def has_permission(self, granting_scopes, context=None):
+        self.evaluated.append(self.value)
+        return super().has_permission(granting_scopes, context)
 
 
 class TestScopedPermissionGuard(TestCase):
@@ -117,3 +138,386 @@ class TestScopedPermissionGuard(TestCase):
         self.assertTrue(guard.has_permission("something"))
         self.assertTrue(guard.has_permission("something:else"))
         self.assertTrue(guard.has_permission("anything?"))
+
+    def test__and_operator__short_circuits_and_propagates_context(self):
+        evaluated = []
+
+        guard = ScopedPermissionGuard(
+            RecordingNode("scope1:{var}", evaluated)
+        ) & ScopedPermissionGuard(RecordingNode("scope2:{var}", evaluated))
+
+        self.assertTrue(
+            guard.has_permission(["scope1:a", "scope2:a"], context={"var": "a"})
+        )
+        self.assertListEqual(["scope1:{var}", "scope2:{var}"], evaluated)
+
+        evaluated.clear()
+        self.assertFalse(guard.has_permission(["scope2:a"], context={"var": "a"}))
+        self.assertListEqual(["scope1:{var}"], evaluated)
+
+    def test__or_operator__short_circuits(self):
+        evaluated = []
+
+        guard = ScopedPermissionGuard(
+            RecordingNode("scope1", evaluated)
+        ) | ScopedPermissionGuard(RecordingNode("scope2", evaluated))
+
+        self.assertTrue(guard.has_permission("scope1"))
+        self.assertListEqual(["scope1"], evaluated)
+
+    def test__granting_scopes_with_variables__are_expanded_once_per_evaluation(self):
+        guard = (
+            ScopedPermissionGuard("scope1") | ScopedPermissionGuard("scope2")
+        ) & ~ScopedPermissionGuard("scope3")
+
+        with mock.patch.object(
+            guards,
+            "expand_scopes_from_context",
+            wraps=guards.expand_scopes_from_context,
+        ) as expand:
+            self.assertTrue(guard.has_permission(["scope{var}"], context={"var": 2}))
+            granting_expansions = [
+                call for call in expand.call_args_list if "scope{var}" in call[0][0]
+            ]
+            self.assertEqual(1, len(granting_expansions))
+
+    def test__granting_scopes_without_variables__are_never_expanded(self):
+        guard = (
+            ScopedPermissionGuard("scope1") | ScopedPermissionGuard("scope2")
+        ) & ~ScopedPermissionGuard("scope3")
+
+        for evaluate in (guard.has_permission, guard.compile().has_permission):
+            with mock.patch.object(
+                guards,
+                "expand_scopes_from_context",
+                wraps=guards.expand_scopes_from_context,
+            ) as expand:
+                self.assertTrue(evaluate(["scope2", "unused"], context={"var": 2}))
+                self.assertTrue(evaluate(GrantingScopeSet(["scope2", "unused"])))
+                granting_expansions = [
+                    call for call in expand.call_args_list if "unused" in call[0][0]
+                ]
+                self.assertEqual(0, len(granting_expansions))
+
+
+class TestCompiledScopedPermissionGuard(TestCase):
+    def test__compiled_guard__evaluates_like_guard(self):
+        guards = [
+            ScopedPermissionGuard("scope1:scope2"),
+            ScopedPermissionGuard("scope1:scope2", "scope3:scope4"),
+            ScopedPermissionGuard(scope="scope1:scope2", verb="read"),
+            ScopedPermissionGuard(scope="scope1", verb="read")
+            | ~ScopedPermissionGuard("scope2"),
+            ScopedPermissionGuard(scope="scope1", verb="read")
+            ^ ScopedPermissionGuard("scope3"),
+            ScopedPermissionGuard([]),
+            ScopedPermissionGuard([], default=False),
+        ]
+        granting_scope_sets = [
+            [],
+            ["scope1"],
+            ["scope1:read", "scope3"],
+            ["scope1:scope2", "-scope1:scope2:read"],
+            ["=scope1:scope2", "scope2"],
+            ["scope3", "-=scope1:read"],
+        ]
+
+        for guard in guards:
+            compiled = guard.compile()
+            for granting_scopes in granting_scope_sets:
+                self.assertEqual(
+                    guard.has_permission(granting_scopes),
+                    compiled.has_permission(granting_scopes),
+                )
+
+    def test__compiled_guard_with_context__is_expanded_and_checked(self):
+        guard = ScopedPermissionGuard("scope1:{var}", "static:scope").compile()
+
+        self.assertTrue(guard.has_permission("scope1", context={}))
+        self.assertTrue(guard.has_permission("static", context={}))
+        self.assertTrue(
+            guard.has_permission("scope1:scope2", context={"var": "scope2"})
+        )
+        self.assertFalse(
+            guard.has_permission("scope1:scope4", context={"var": ["scope2", "scope3"]})
+        )
+
+    def test__compiled_and_operator__short_circuits(self):
+        evaluated = []
+
+        guard = ScopedPermissionGuard(
+            RecordingNode("scope1", evaluated)
+        ) & ScopedPermissionGuard(RecordingNode("scope2", evaluated))
+        compiled = guard.compile()
+
+        self.assertFalse(compiled.has_permission("scope2"))
+        self.assertListEqual(["scope1"], evaluated)
+
+    def test__compile__is_cached_until_guard_changes(self):
+        guard = ScopedPermissionGuard("scope1")
+
+        self.assertIs(guard.compile(), guard.compile())
+
+        compiled = guard.compile()
+        guard.root = SPRUnOp(False)
+        self.assertIsNot(compiled, guard.compile())
+        self.assertFalse(guard.compile().has_permission("scope1"))
+
+    def test__compiled_guard__can_be_wrapped_in_guard(self):
+        compiled = ScopedPermissionGuard("scope1").compile()
+        guard = ScopedPermissionGuard(compiled)
+
+        self.assertTrue(guard.has_permission("scope1"))
+        self.assertFalse(guard.has_permission("scope2"))
+
+    def test__compile_with_reorder__evaluates_cheap_operands_first(self):
+        evaluated = []
+
+        guard = ScopedPermissionGuard(
+            RecordingNode("company:{input.company}", evaluated)
+        ) & ScopedPermissionGuard("user:create")
+
+        compiled = guard.compile()
+        reordered = guard.compile(reorder=True)
+        context = {"input": {"company": 1}}
+
+        self.assertFalse(compiled.has_permission("company:1", context))
+        self.assertListEqual(["company:{input.company}"], evaluated)
+
+        evaluated.clear()
+        self.assertFalse(reordered.has_permission("company:1", context))
+        self.assertListEqual([], evaluated)
+
+        self.assertTrue(reordered.has_permission(["company:1", "user:create"], context))
+
+    def test__compile_with_statistics__counts_skipped_subtrees(self):
+        # Different verbs, so the scopes of the OR are not merged
+        guard = (
+            ScopedPermissionGuard(scope="scope1", verb="read")
+            | ScopedPermissionGuard(scope="scope2", verb="update")
+        ) & ScopedPermissionGuard("scope3")
+        compiled = guard.compile(collect_statistics=True)
+
+        self.assertTrue(compiled.has_permission(["scope1:read", "scope3"]))
+        self.assertEqual(1, compiled.statistics.skipped_subtrees)
+
+        self.assertFalse(compiled.has_permission(["scope4"]))
+        self.assertEqual(2, compiled.statistics.skipped_subtrees)
+        self.assertEqual(2, compiled.statistics.evaluations)
+
+        compiled.statistics.reset()
+        self.assertEqual(0, compiled.statistics.skipped_subtrees)
+
+    def test__referenced_variables__lists_context_variables_of_templated_scopes(self):
+        guard = ScopedPermissionGuard(
+            "company:{input.company}", ("{required_scopes}", "update"), "user"
+        ).compile()
+
+        self.assertSetEqual(
+            {"input.company", "required_scopes"}, guard.referenced_variables
+        )
+
+        class CustomNode(SPRUnOp):
+            pass
+
+        self.assertIsNone(
+            ScopedPermissionGuard(CustomNode("scope1")).compile().referenced_variables
+        )
+
+    def test__has_permission_with_cache__memoizes_on_referenced_variables(self):
+        guard = ScopedPermissionGuard("company:{input.company}").compile()
+        cache = PermissionCache()
+
+        self.assertTrue(
+            guard.has_permission(
+                "company:1", {"input": {"company": 1}, "other": 1}, cache=cache
+            )
+        )
+        self.assertTrue(
+            guard.has_permission(
+                "company:1", {"input": {"company": 1}, "other": 2}, cache=cache
+            )
+        )
+        self.assertEqual(1, len(cache))
+
+        self.assertFalse(
+            guard.has_permission("company:1", {"input": {"company": 2}}, cache=cache)
+        )
+        self.assertFalse(
+            guard.has_permission("company:2", {"input": {"company": 1}}, cache=cache)
+        )
+        self.assertEqual(3, len(cache))
+
+        # Repeated evaluations are served from the cache
+        key = next(iter(cache))
+        cache[key] = "cached"
+        self.assertEqual(
+            "cached",
+            guard.has_permission("company:1", {"input": {"company": 1}}, cache=cache),
+        )
+
+    def test__has_permission_with_cache__skips_unhashable_values(self):
+        guard = ScopedPermissionGuard("company:{input}").compile()
+        cache = PermissionCache()
+
+        self.assertFalse(
+            guard.has_permission("company:1", {"input": {"company": 1}}, cache=cache)
+        )
+        self.assertEqual(0, len(cache))
+
+    def test__get_permission_cache__is_created_once_per_request(self):
+        request = Dict()
+
+        cache = get_permission_cache(request)
+        self.assertIsInstance(cache, PermissionCache)
+        self.assertIs(cache, get_permission_cache(request))
+        self.assertIsNot(cache, get_permission_cache(Dict()))
+        self.assertIsNone(get_permission_cache(None))
+
+    def test__has_permission_many__returns_one_decision_per_context(self):
+        guard = ScopedPermissionGuard(
+            ScopedPermissionGuard(scope="company:{input.company}", verb="create")
+            | ScopedPermissionGuard("admin")
+        )
+        contexts = [{"input": {"company": company}} for company in (1, 2, 1, 3)]
+
+        self.assertListEqual(
+            [True, False, True, False],
+            guard.has_permission_many(["company:1:create"], contexts),
+        )
+        self.assertListEqual(
+            [True, True, True, True], guard.has_permission_many(["admin"], contexts)
+        )
+        self.assertListEqual([], guard.has_permission_many(["admin"], []))
+
+    def test__has_permission_many__evaluates_identical_contexts_once(self):
+        guard = ScopedPermissionGuard("company:{input.company}").compile(
+            collect_statistics=True
+        )
+        contexts = [{"input": {"company": company}} for company in (1, 2, 1, 1)]
+
+        with mock.patch.object(
+            GrantingScopeSet,
+            "grants",
+            autospec=True,
+            side_effect=GrantingScopeSet.grants,
+        ) as grants:
+            self.assertListEqual(
+                [True, False, True, True],
+                guard.has_permission_many("company:1", contexts),
+            )
+
+        self.assertEqual(2, grants.call_count)
+        self.assertEqual(4, guard.statistics.evaluations)
+
+    def test__has_permission_many__deduplicates_identical_scope_sets(self):
+        # The referenced variables differ, but the leaf expands to the same scopes
+        guard = ScopedPermissionGuard("company:{input.companies}").compile()
+        contexts = [{"input": {"companies": [1, 2]}}, {"input": {"companies": [2, 1]}}]
+
+        with mock.patch.object(
+            GrantingScopeSet,
+            "grants",
+            autospec=True,
+            side_effect=GrantingScopeSet.grants,
+        ) as grants:
+            self.assertListEqual(
+                [True, True], guard.has_permission_many("company:2", contexts)
+            )
+
+        self.assertEqual(1, grants.call_count)
+
+    def test__has_permission_many__with_templated_granting_scopes(self):
+        guard = ScopedPermissionGuard("company:1").compile()
+        contexts = [{"company": 1}, {"company": 2}]
+
+        self.assertListEqual(
+            [True, False], guard.has_permission_many("company:{company}", contexts)
+        )
+
+    def test__compile__folds_constants(self):
+        true_guard = ScopedPermissionGuard(SPRUnOp(True))
+        false_guard = ScopedPermissionGuard(SPRUnOp(False))
+
+        compiled = (true_guard | ScopedPermissionGuard("scope1")).compile()
+        self.assertEqual(1, compiled.node_count)
+        self.assertTrue(compiled.has_permission([]))
+
+        compiled = (~true_guard & ScopedPermissionGuard("scope1")).compile()
+        self.assertEqual(1, compiled.node_count)
+        self.assertFalse(compiled.has_permission("scope1"))
+
+        compiled = (true_guard ^ false_guard).compile()
+        self.assertEqual(1, compiled.node_count)
+        self.assertTrue(compiled.has_permission([]))
+
+        compiled = (true_guard & ScopedPermissionGuard("scope1")).compile()
+        self.assertEqual(1, compiled.node_count)
+        self.assertTrue(compiled.has_permission("scope1"))
+        self.assertFalse(compiled.has_permission("scope2"))
+
+    def test__compile__flattens_chains_and_merges_static_scopes(self):
+        guard = ScopedPermissionGuard("scope1", "scope2", "scope3", "{scope}")
+        compiled = guard.compile()
+
+        # An OR of the merged static scopes and the templated scope
+        self.assertEqual(3, compiled.node_count)
+
+        with mock.patch.object(
+            GrantingScopeSet,
+            "grants",
+            autospec=True,
+            side_effect=GrantingScopeSet.grants,
+        ) as grants:
+            self.assertTrue(compiled.has_permission("scope3", {"scope": "scope4"}))
+
+        grants.assert_called_once()
+        self.assertTrue(compiled.has_permission("scope4", {"scope": "scope4"}))
+        self.assertFalse(compiled.has_permission("scope5", {"scope": "scope4"}))
+
+    def test__merged_scopes__respect_exclusions_like_the_guard(self):
+        guard = ScopedPermissionGuard("company:1", "company:2") | ScopedPermissionGuard(
+            scope="company:3", verb="read"
+        )
+        compiled = guard.compile()
+
+        for granting_scopes in (
+            ["company", "-company:1"],
+            ["company:2", "-company:1"],
+            ["company", "-=company:1", "-company:2"],
+            ["-company:1", "-company:2", "company:3:read"],
+            ["company:1"],
+        ):
+            self.assertEqual(
+                guard.has_permission(granting_scopes),
+                compiled.has_permission(granting_scopes),
+                granting_scopes,
+            )
+
+    def test__has_permission_async__accepts_awaitable_granting_scopes(self):
+        guard = ScopedPermissionGuard("company:{input.company}")
+
+        async def get_granting_scopes():
+            return ["company:1"]
+
+        async def check(company):
+            return await guard.has_permission_async(
+                get_granting_scopes(), {"input": {"company": company}}
+            )
+
+        self.assertTrue(async_to_sync(check)(1))
+        self.assertFalse(async_to_sync(check)(2))
+
+    def test__has_permission_async__evaluates_custom_nodes_in_a_thread(self):
+        class CustomNode(SPRUnOp):
+            pass
+
+        compiled = ScopedPermissionGuard(CustomNode("scope1")).compile()
+
+        with mock.patch(
+            "django_scoped_permissions.compiler.sync_to_async",
+            side_effect=lambda func: mock.AsyncMock(side_effect=func),
+        ) as sync_to_async:
+            self.assertTrue(async_to_sync(compiled.has_permission_async)(["scope1"]))
+
+        sync_to_async.assert_called_once()
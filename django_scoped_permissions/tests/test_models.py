@@ -1,8 +1,9 @@
+from asgiref.sync import async_to_sync
 from django.test import TestCase
 
 from django_scoped_permissions.models import ScopedPermission, ScopedPermissionGroup
-from django_scoped_permissions.tests.factories import UserFactory
-from django_scoped_permissions.tests.models import User
+from django_scoped_permissions.tests.factories import UserFactory, CompanyFactory
+from django_scoped_permissions.tests.models import User, UserType
 
 
 class TestHasScopedPermissionMixin(TestCase):
@@ -111,3 +112,26 @@ class TestHasScopedPermissionMixin(TestCase):
         permission = ScopedPermission.objects.filter(scope="scope1:scope2").first()
         self.assertIsNotNone(permission)
 
+    def test_aget_granting_scopes__resolves_scopes_like_get_granting_scopes(self):
+        user_type = UserType.objects.create(name="Type", company=CompanyFactory.create())
+        user_type.add_or_create_permission("scope1:scope2")
+        user_type.add_or_create_permission("-=scope3")
+
+        group = ScopedPermissionGroup.objects.create(name="Group")
+        group.scoped_permissions.add(ScopedPermission.objects.create(scope="scope4"))
+        user_type.scoped_permission_groups.add(group)
+
+        self.assertListEqual(
+            sorted(user_type.get_granting_scopes()),
+            sorted(async_to_sync(user_type.aget_granting_scopes)()),
+        )
+        self.assertEqual(3, len(user_type.get_granting_scopes()))
+
+    def test_aget_granting_scopes__uses_overridden_get_granting_scopes(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("scope1")
+
+        self.assertListEqual(
+            ["scope1", f"user:{user.id}"],
+            async_to_sync(user.aget_granting_scopes)(),
+        )
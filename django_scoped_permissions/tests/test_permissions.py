@@ -2,7 +2,7 @@ from addict import Dict
 from django.core.exceptions import PermissionDenied
 from django.test import TestCase
 
-from django_scoped_permissions.core import scopes_grant_permissions
+from django_scoped_permissions.core import scopes_grant_permissions, GrantingScopeSet
 from django_scoped_permissions.tests.factories import UserFactory
 
 from django_scoped_permissions.decorators import (
@@ -66,6 +66,56 @@ class TestScopesGrantPermission(TestCase):
         self.assertEqual(scopes_grant_permissions(required_scopes, scopes), True)
 
 
+class TestGrantingScopeSet(TestCase):
+    def test__grants__is_equivalent_to_scopes_grant_permissions(self):
+        granting_scopes = [
+            "scope1",
+            "-scope1:scope2",
+            "=scope3:read",
+            "-=scope4:read",
+            "scope4",
+        ]
+        granting_scope_set = GrantingScopeSet(granting_scopes)
+
+        for required_scopes, verb in (
+            ([], None),
+            (["scope1:scope3"], None),
+            (["scope1:scope2"], None),
+            (["scope3"], "read"),
+            (["scope3:scope5"], "read"),
+            (["scope4"], "read"),
+            (["scope4"], "update"),
+        ):
+            self.assertEqual(
+                scopes_grant_permissions(required_scopes, granting_scopes, verb),
+                granting_scope_set.grants(required_scopes, verb),
+            )
+            self.assertEqual(
+                scopes_grant_permissions(required_scopes, granting_scopes, verb),
+                scopes_grant_permissions(required_scopes, granting_scope_set, verb),
+            )
+
+    def test__grants_without_exclusions__stops_at_first_granted_scope(self):
+        def required_scopes():
+            yield "scope2"
+            yield "scope1:scope3"
+            raise AssertionError("Iterated past the first granted scope")
+
+        self.assertTrue(GrantingScopeSet(["scope1"]).grants(required_scopes()))
+        self.assertTrue(GrantingScopeSet(["scope1"]).grants(iter([])))
+        self.assertFalse(GrantingScopeSet(["scope1"]).grants(iter(["scope2"])))
+
+    def test__grants_with_exclusions__checks_all_scopes(self):
+        granting_scope_set = GrantingScopeSet(["scope1", "-scope2"])
+
+        self.assertFalse(granting_scope_set.grants(iter(["scope1", "scope2"])))
+        self.assertTrue(granting_scope_set.grants(iter(["scope1", "scope3"])))
+
+    def test__is_templated__is_true_only_for_scopes_with_variables(self):
+        self.assertFalse(GrantingScopeSet(["scope1", "-scope2"]).is_templated)
+        self.assertTrue(GrantingScopeSet(["scope1", "company:{company}"]).is_templated)
+
+
 class TestHasScopedPermissionsMixin(TestCase):
     def get_scopes__no_scopes__returns_empty_array(self):
         user = UserFactory.create()
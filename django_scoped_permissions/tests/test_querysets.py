@@ -0,0 +1,213 @@
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import NotSupportedError
+from django.test import TestCase
+
+from django_scoped_permissions import querysets
+
+from django_scoped_permissions.core import scopes_grant_permissions
+from django_scoped_permissions.querysets import (
+    ScopePatterns,
+    filter_in_batches,
+    filter_permitted,
+    get_scope_patterns,
+    scoped_permission_filter,
+)
+from django_scoped_permissions.tests.factories import (
+    CompanyFactory,
+    PetFactory,
+    UserFactory,
+    VehicleFactory,
+)
+from django_scoped_permissions.tests.models import Pet, UserType, Vehicle
+
+
+class TestScopePatterns(TestCase):
+    def test__required_scopes__are_rendered_from_patterns(self):
+        vehicle = VehicleFactory.create()
+
+        self.assertEqual(
+            [f"vehicle:{vehicle.id}", f"user:{vehicle.user.id}:vehicle:{vehicle.id}"],
+            vehicle.get_required_scopes(),
+        )
+
+    def test__filter__matches_scopes_grant_permissions(self):
+        user = UserFactory.create()
+        other_user = UserFactory.create()
+        vehicles = [
+            VehicleFactory.create(user=user),
+            VehicleFactory.create(user=user),
+            VehicleFactory.create(user=other_user),
+        ]
+        vehicle = vehicles[0]
+
+        for granting_scopes in (
+            [],
+            ["*"],
+            ["vehicle"],
+            [f"vehicle:{vehicle.id}"],
+            [f"vehicle:{vehicle.id}:read"],
+            [f"=vehicle:{vehicle.id}:read"],
+            [f"=vehicle:{vehicle.id}"],
+            [f"user:{user.id}"],
+            [f"user:{user.id}:vehicle:read"],
+            [f"user:*:vehicle:{vehicle.id}"],
+            ["user:*:vehicle:read"],
+            [f"user:0{user.id}"],
+            ["user:abc"],
+            ["read"],
+            ["update"],
+            [f"user:{user.id}", f"-vehicle:{vehicle.id}"],
+            [f"user:{user.id}", f"-vehicle:{vehicle.id}:read"],
+            [
+                f"user:{user.id}",
+                f"-=vehicle:{vehicle.id}:read",
+                f"=vehicle:{vehicle.id}:read",
+            ],
+            [
+                f"user:{user.id}",
+                f"-user:{user.id}:vehicle:{vehicle.id}",
+                f"=vehicle:{vehicle.id}:read",
+            ],
+            [f"user:{user.id}", f"-=user:{user.id}:vehicle:{vehicle.id}"],
+            ["read", f"-user:{other_user.id}"],
+            ["-*", "vehicle"],
+        ):
+            for verb in (None, "read", "update"):
+                expected = {
+                    obj.id
+                    for obj in vehicles
+                    if scopes_grant_permissions(
+                        obj.get_required_scopes(), granting_scopes, verb
+                    )
+                }
+                filtered = set(
+                    Vehicle.objects.filter(
+                        scoped_permission_filter(Vehicle, granting_scopes, verb)
+                    ).values_list("id", flat=True)
+                )
+
+                self.assertEqual(expected, filtered, (granting_scopes, verb))
+
+    def test__holder__is_accepted_in_place_of_granting_scopes(self):
+        user = UserFactory.create()
+        vehicle = VehicleFactory.create(user=user)
+        VehicleFactory.create()
+
+        self.assertEqual(
+            [vehicle],
+            list(
+                Vehicle.objects.filter(Vehicle.scoped_permission_filter(user, "read"))
+            ),
+        )
+
+    def test__invalid_patterns__raise_errors(self):
+        for patterns in (("usertype:{missing}",), ("usertype:x{id}",)):
+            with self.assertRaises(ImproperlyConfigured, msg=patterns):
+                ScopePatterns(UserType, patterns)
+
+        with self.assertRaises(ValueError):
+            scoped_permission_filter(UserType, ["usertype"])
+
+    def test__overridden_required_scopes__disable_patterns(self):
+        class PatternPet(Pet):
+            class Meta:
+                proxy = True
+
+            scope_patterns = ("pet:{id}",)
+
+        pet = PetFactory.create()
+
+        self.assertIsNone(get_scope_patterns(PatternPet))
+        self.assertEqual(
+            [f"pet:{pet.id}", f"user:{pet.user.id}:pet:{pet.id}"],
+            PatternPet.objects.get(id=pet.id).get_required_scopes(),
+        )
+        with self.assertRaises(ValueError):
+            scoped_permission_filter(PatternPet, ["pet"])
+
+    def test__patterns__may_follow_relations(self):
+        company = CompanyFactory.create()
+        user_type = UserType.objects.create(name="Admin", company=company)
+        UserType.objects.create(name="Admin", company=CompanyFactory.create())
+        patterns = ScopePatterns(UserType, ("company:{company.id}:usertype:{id}",))
+
+        self.assertEqual(
+            [user_type],
+            list(UserType.objects.filter(patterns.filter([f"company:{company.id}"]))),
+        )
+
+
+@mock.patch.object(querysets, "PERMISSION_CHECK_CHUNK_SIZE", 2)
+class TestFilterInBatches(TestCase):
+    def setUp(self):
+        user = UserFactory.create()
+        self.pets = [PetFactory.create(user=user, age=i) for i in range(10)]
+        self.checked = []
+
+    def has_permission_many(self, objects):
+        self.checked.extend(objects)
+        return [obj.age % 2 == 0 for obj in objects]
+
+    def filter_in_batches(self):
+        return filter_in_batches(Pet.objects.order_by("id"), self.has_permission_many)
+
+    def test__slices__check_rows_up_to_the_end_of_the_slice(self):
+        queryset = self.filter_in_batches()
+
+        self.assertNotIn(" IN ", str(queryset.query))
+        self.assertListEqual([self.pets[2], self.pets[4]], list(queryset[1:3]))
+        self.assertEqual(6, len(self.checked))
+
+        self.assertEqual(self.pets[4], queryset[2])
+        self.assertListEqual([self.pets[4]], list(queryset[1:][1:2]))
+        self.assertListEqual([self.pets[2], self.pets[6]], queryset[1:4:2])
+        self.assertListEqual([], list(queryset[5:]))
+        with self.assertRaises(IndexError):
+            queryset[5]
+
+    def test__count_and_exists__only_see_permitted_rows(self):
+        queryset = self.filter_in_batches()
+
+        self.assertEqual(5, queryset.count())
+        self.assertEqual(10, len(self.checked))
+        self.assertEqual(3, queryset[2:].count())
+        self.assertEqual(2, queryset.filter(age__lt=4).count())
+
+        self.assertTrue(queryset.exists())
+        self.assertFalse(queryset.filter(age=1).exists())
+        self.assertEqual(5, len(queryset))
+
+    def test__update_and_delete__only_change_permitted_rows(self):
+        queryset = self.filter_in_batches()
+
+        self.assertEqual(5, queryset.update(name="Permitted"))
+        self.assertEqual(5, Pet.objects.filter(name="Permitted").count())
+
+        deleted, _ = self.filter_in_batches().delete()
+        self.assertEqual(5, deleted)
+        self.assertListEqual(
+            [pet.id for pet in self.pets[1::2]],
+            list(Pet.objects.order_by("id").values_list("id", flat=True)),
+        )
+
+    def test__unsupported_operations__raise_errors(self):
+        queryset = self.filter_in_batches()
+
+        with self.assertRaises(TypeError):
+            queryset[1:].filter(age=2)
+        with self.assertRaises(NotSupportedError):
+            list(queryset.values("id"))
+        with self.assertRaises(NotSupportedError):
+            queryset.aggregate()
+
+    def test__filter_permitted__checks_models_without_patterns_in_batches(self):
+        user = UserFactory.create()
+        own_pets = PetFactory.create_batch(3, user=user)
+
+        queryset = filter_permitted(Pet.objects.order_by("id"), user, "read")
+
+        self.assertNotIn(" IN ", str(queryset.query))
+        self.assertEqual(3, queryset.count())
+        self.assertListEqual(own_pets[1:], list(queryset[1:]))
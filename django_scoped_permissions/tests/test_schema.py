@@ -0,0 +1,229 @@
+import graphene
+from addict import Dict
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from graphene import Schema
+from graphene_django.registry import get_global_registry
+from graphql_relay import to_global_id
+
+from django_scoped_permissions.models import ScopedPermission, ScopedPermissionGroup
+from django_scoped_permissions.schema import ScopedPermissionQuery, pk_to_cursor
+from django_scoped_permissions.tests.factories import UserFactory
+from django_scoped_permissions.tests.models import User
+
+
+class TestScopedPermissionQuery(TestCase):
+    def setUp(self):
+        # This registers a UserNode type if no other test has done so already
+        # noinspection PyUnresolvedReferences
+        from .schema import UserNode
+
+        class Query(ScopedPermissionQuery, graphene.ObjectType):
+            pass
+
+        self.schema = Schema(
+            query=Query, types=[get_global_registry().get_type_for_model(User)]
+        )
+
+    def execute(self, query, **variables):
+        result = self.schema.execute(query, variables=variables, context=Dict())
+        self.assertIsNone(result.errors)
+        return Dict(result.data)
+
+    def test__all_scoped_permissions__filters_by_prefix_and_modifiers(self):
+        ScopedPermission.objects.create(scope="company:1:user")
+        ScopedPermission.objects.create(scope="company:1:user", exclude=True)
+        ScopedPermission.objects.create(scope="company:2")
+        ScopedPermission.objects.create(scope="user:company:1")
+
+        query = """
+            query Permissions($prefix: String, $exclude: Boolean){
+                allScopedPermissions(prefix: $prefix, exclude: $exclude){
+                    edges { node { scope exclude } }
+                }
+            }
+        """
+
+        data = self.execute(query, prefix="company:1")
+        self.assertEqual(2, len(data.allScopedPermissions.edges))
+
+        data = self.execute(query, prefix="company:1", exclude=False)
+        self.assertEqual(1, len(data.allScopedPermissions.edges))
+        self.assertFalse(data.allScopedPermissions.edges[0].node.exclude)
+
+    def test__all_scoped_permissions__filters_by_group_and_holder(self):
+        direct = ScopedPermission.objects.create(scope="scope1")
+        via_group = ScopedPermission.objects.create(scope="scope2")
+        ScopedPermission.objects.create(scope="scope3")
+
+        group = ScopedPermissionGroup.objects.create(name="Group")
+        group.scoped_permissions.add(via_group)
+
+        user = UserFactory.create()
+        user.scoped_permissions.add(direct, via_group)
+        user.scoped_permission_groups.add(group)
+
+        query = """
+            query Permissions($group: ID, $holder: ID){
+                allScopedPermissions(group: $group, holder: $holder){
+                    edges { node { scope } }
+                }
+            }
+        """
+
+        data = self.execute(
+            query, group=to_global_id("ScopedPermissionGroupNode", group.pk)
+        )
+        self.assertListEqual(
+            ["scope2"], [edge.node.scope for edge in data.allScopedPermissions.edges]
+        )
+
+        data = self.execute(query, holder=to_global_id("UserNode", user.pk))
+        self.assertListEqual(
+            ["scope1", "scope2"],
+            [edge.node.scope for edge in data.allScopedPermissions.edges],
+        )
+
+    def test__all_scoped_permissions__paginates_with_cursors(self):
+        for i in range(5):
+            ScopedPermission.objects.create(scope=f"scope{i}")
+
+        query = """
+            query Permissions($after: String){
+                allScopedPermissions(first: 2, after: $after){
+                    edges { node { scope } }
+                    pageInfo { endCursor hasNextPage }
+                }
+            }
+        """
+
+        scopes = []
+        after = None
+        while True:
+            data = self.execute(query, after=after)
+            scopes.extend(edge.node.scope for edge in data.allScopedPermissions.edges)
+            if not data.allScopedPermissions.pageInfo.hasNextPage:
+                break
+            after = data.allScopedPermissions.pageInfo.endCursor
+
+        self.assertListEqual([f"scope{i}" for i in range(5)], scopes)
+
+    def test__all_scoped_permissions__paginates_backwards(self):
+        for i in range(5):
+            ScopedPermission.objects.create(scope=f"scope{i}")
+
+        query = """
+            query Permissions($first: Int, $last: Int, $before: String, $after: String){
+                allScopedPermissions(
+                    first: $first, last: $last, before: $before, after: $after
+                ){
+                    edges { cursor node { scope } }
+                    pageInfo { hasPreviousPage hasNextPage }
+                }
+            }
+        """
+
+        data = self.execute(query, last=2)
+        permissions = data.allScopedPermissions
+        self.assertListEqual(
+            ["scope3", "scope4"], [edge.node.scope for edge in permissions.edges]
+        )
+        self.assertTrue(permissions.pageInfo.hasPreviousPage)
+        self.assertFalse(permissions.pageInfo.hasNextPage)
+
+        data = self.execute(query, last=2, before=permissions.edges[0].cursor)
+        permissions = data.allScopedPermissions
+        self.assertListEqual(
+            ["scope1", "scope2"], [edge.node.scope for edge in permissions.edges]
+        )
+        self.assertTrue(permissions.pageInfo.hasPreviousPage)
+        self.assertTrue(permissions.pageInfo.hasNextPage)
+
+        data = self.execute(query, last=2, before=permissions.edges[0].cursor)
+        permissions = data.allScopedPermissions
+        self.assertListEqual(
+            ["scope0"], [edge.node.scope for edge in permissions.edges]
+        )
+        self.assertFalse(permissions.pageInfo.hasPreviousPage)
+        self.assertTrue(permissions.pageInfo.hasNextPage)
+
+        # The first three after scope0, of which the last two
+        data = self.execute(query, first=3, last=2, after=permissions.edges[0].cursor)
+        permissions = data.allScopedPermissions
+        self.assertListEqual(
+            ["scope2", "scope3"], [edge.node.scope for edge in permissions.edges]
+        )
+        self.assertTrue(permissions.pageInfo.hasPreviousPage)
+        self.assertTrue(permissions.pageInfo.hasNextPage)
+
+    def test__all_scoped_permissions__seeks_deep_pages_on_the_primary_key(self):
+        ScopedPermission.objects.bulk_create(
+            ScopedPermission(scope=f"scope{i}") for i in range(300)
+        )
+        pks = list(ScopedPermission.objects.order_by("pk").values_list("pk", flat=True))
+
+        query = """
+            query Permissions($after: String){
+                allScopedPermissions(first: 2, after: $after){
+                    edges { node { scope } }
+                    pageInfo { hasPreviousPage hasNextPage }
+                }
+            }
+        """
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.execute(query, after=pk_to_cursor(pks[249]))
+
+        self.assertListEqual(
+            ["scope250", "scope251"],
+            [edge.node.scope for edge in data.allScopedPermissions.edges],
+        )
+        self.assertTrue(data.allScopedPermissions.pageInfo.hasPreviousPage)
+        self.assertTrue(data.allScopedPermissions.pageInfo.hasNextPage)
+
+        page_query = queries.captured_queries[0]["sql"]
+        self.assertIn("LIMIT 3", page_query)
+        self.assertNotIn("OFFSET", page_query)
+
+        result = self.schema.execute(
+            query, variables={"after": "invalid"}, context=Dict()
+        )
+        self.assertIsNotNone(result.errors)
+
+    def test__all_scoped_permissions__rejects_ids_of_other_types(self):
+        group = ScopedPermissionGroup.objects.create(name="Group")
+
+        result = self.schema.execute(
+            """
+            query Permissions($holder: ID){
+                allScopedPermissions(holder: $holder){
+                    edges { node { scope } }
+                }
+            }
+            """,
+            variables={"holder": to_global_id("ScopedPermissionGroupNode", group.pk)},
+            context=Dict(),
+        )
+
+        self.assertIsNotNone(result.errors)
+
+    def test__resolved_scopes__returns_direct_and_group_scopes(self):
+        group = ScopedPermissionGroup.objects.create(name="Group")
+        group.scoped_permissions.add(
+            ScopedPermission.objects.create(scope="scope1", exclude=True, exact=True)
+        )
+        user = UserFactory.create()
+        user.add_or_create_permission("scope2")
+        user.scoped_permission_groups.add(group)
+
+        query = """
+            query ResolvedScopes($holder: ID!){
+                resolvedScopes(holder: $holder)
+            }
+        """
+
+        with self.assertNumQueries(1):
+            data = self.execute(query, holder=to_global_id("UserNode", user.pk))
+
+        self.assertListEqual(["-=scope1", "scope2"], data.resolvedScopes)
@@ -0,0 +1,189 @@
+import itertools
+from datetime import timedelta
+
+import jwt
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from django_scoped_permissions.core import scopes_grant_permissions
+from django_scoped_permissions.decorators import function_has_scoped_permissions
+from django_scoped_permissions.models import get_cached_granting_scopes
+from django_scoped_permissions.tests.factories import UserFactory
+from django_scoped_permissions.tokens import (
+    ScopeTokenError,
+    ScopeTokenMiddleware,
+    ScopeTokenUser,
+    create_scope_token,
+    decode_scopes,
+    encode_scopes,
+    get_token_key,
+    minimize_scopes,
+    read_scope_token,
+)
+
+
+@override_settings(SECRET_KEY="scope-token-secret")
+class TestScopeTokens(TestCase):
+    def test__minimize_scopes__removes_redundant_scopes(self):
+        self.assertListEqual(
+            ["-=company:1", "=company:1:invoice", "-company:2", "company", "user:1"],
+            minimize_scopes(
+                [
+                    "company",
+                    "company:1",
+                    "company:1",
+                    "-=company:1",
+                    "=company:1:invoice",
+                    "-company:2",
+                    "-company:2:invoice",
+                    "user:1",
+                    "user:1:read",
+                ]
+            ),
+        )
+        self.assertListEqual(["*"], minimize_scopes(["user:*:read", "*", "company"]))
+        self.assertListEqual(
+            ["-company:1", "user:{context.user.id}"],
+            minimize_scopes(
+                ["company:1:invoice", "-company:1", "user:{context.user.id}"]
+            ),
+        )
+
+    def test__minimize_scopes__preserves_permissions(self):
+        scopes = [
+            "company",
+            "company:1",
+            "company:*:invoice",
+            "-company:1:invoice",
+            "-company:*:invoice:read",
+            "=company:2",
+            "-=company:2:invoice",
+            "user:1:read",
+            "*:1",
+        ]
+        required_scopes = [
+            ["company"],
+            ["company:1"],
+            ["company:2"],
+            ["company:1:invoice"],
+            ["company:2:invoice"],
+            ["company:3:invoice:read"],
+            ["company:*"],
+            ["user:1"],
+            ["user:2"],
+        ]
+
+        for length in range(len(scopes) + 1):
+            for granting_scopes in itertools.combinations(scopes, length):
+                minimized = minimize_scopes(granting_scopes)
+                for required, verb in itertools.product(
+                    required_scopes, (None, "read", "update")
+                ):
+                    self.assertEqual(
+                        scopes_grant_permissions(required, granting_scopes, verb),
+                        scopes_grant_permissions(required, minimized, verb),
+                        (granting_scopes, required, verb),
+                    )
+
+    def test__encode_scopes__compresses_large_sets(self):
+        scopes = [f"company:1:project:{i}:task:read" for i in range(50)] + [
+            "-=company:1:project:3",
+            "=user:1",
+        ]
+
+        claim = encode_scopes(scopes)
+        self.assertIn("p", claim)
+        self.assertListEqual(scopes, decode_scopes(claim))
+
+        # Small sets are listed as they are
+        self.assertDictEqual({"l": ["company:1"]}, encode_scopes(["company:1"]))
+        self.assertListEqual(["company:1"], decode_scopes({"l": ["company:1"]}))
+
+    def test__encode_scopes__encodes_vocabulary_as_bitset(self):
+        vocabulary = [f"feature:{i}" for i in range(20)]
+        scopes = ["feature:0", "feature:13", "company:1:invoice"]
+
+        claim = encode_scopes(scopes, vocabulary)
+        self.assertIn("b", claim)
+        self.assertListEqual(
+            ["feature:0", "feature:13", "company:1:invoice"],
+            decode_scopes(claim, vocabulary),
+        )
+
+        with self.assertRaises(ScopeTokenError):
+            decode_scopes(claim, vocabulary[:-1])
+        with self.assertRaises(ScopeTokenError):
+            decode_scopes({"p": [], "s": "0"})
+
+    def test__create_scope_token__carries_minimized_scopes_of_holder(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("company:1")
+        user.add_or_create_permission("company:1:invoice")
+
+        token = create_scope_token(user)
+
+        with self.assertNumQueries(0):
+            token_user = read_scope_token(token)
+
+            self.assertIsInstance(token_user, ScopeTokenUser)
+            self.assertEqual(str(user.id), token_user.pk)
+            self.assertSetEqual(
+                {"company:1", f"user:{user.id}"},
+                set(token_user.get_granting_scopes()),
+            )
+            self.assertTrue(token_user.has_scoped_permissions("company:1:invoice:read"))
+            self.assertFalse(token_user.has_scoped_permissions("company:2"))
+
+    def test__read_scope_token__rejects_invalid_tokens(self):
+        token = create_scope_token(["company:1"])
+
+        with self.assertRaises(ScopeTokenError):
+            read_scope_token(token, key="another-secret")
+        with self.assertRaises(ScopeTokenError):
+            read_scope_token(
+                create_scope_token(["company:1"], expires_in=timedelta(-1))
+            )
+        with self.assertRaises(ScopeTokenError):
+            read_scope_token(token[:-2])
+
+        # Tokens without a scopes claim are not scope tokens
+        with self.assertRaises(ScopeTokenError):
+            read_scope_token(jwt.encode({"sub": "1"}, get_token_key()))
+
+    def test__token_key__is_not_the_secret_key(self):
+        token = create_scope_token(["company:1"])
+
+        self.assertNotEqual("scope-token-secret", get_token_key())
+        with self.assertRaises(ScopeTokenError):
+            read_scope_token(token, key="scope-token-secret")
+
+        with override_settings(SCOPED_PERMISSIONS_TOKEN_KEY="token-key"):
+            self.assertEqual("token-key", get_token_key())
+            token = create_scope_token(["company:1"])
+
+        self.assertTrue(
+            read_scope_token(token, key="token-key").has_scoped_permissions("company:1")
+        )
+
+    def test__middleware__authorizes_without_database_queries(self):
+        @function_has_scoped_permissions("company:1:invoice")
+        def view(request):
+            self.assertTrue(
+                get_cached_granting_scopes(request.user).grants(["company:1"])
+            )
+            return HttpResponse("OK")
+
+        middleware = ScopeTokenMiddleware(view)
+        factory = RequestFactory()
+        token = create_scope_token(["company:1"], sub="1")
+
+        with self.assertNumQueries(0):
+            request = factory.get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(b"OK", middleware(request).content)
+            self.assertEqual("1", request.user.pk)
+
+        # Requests with invalid tokens are left unauthenticated
+        request = factory.get("/", HTTP_AUTHORIZATION="Bearer invalid")
+        with self.assertRaises(PermissionDenied):
+            middleware(request)
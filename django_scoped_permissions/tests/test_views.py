@@ -0,0 +1,173 @@
+from unittest import skipIf
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, TestCase
+from django.views import View
+from django.views.generic import DetailView, ListView
+
+from django_scoped_permissions.backends import ScopedAuthenticationBackend
+from django_scoped_permissions.guards import ScopedPermissionGuard
+from django_scoped_permissions.models import get_cached_granting_scopes
+from django_scoped_permissions.tests.factories import PetFactory, UserFactory
+from django_scoped_permissions.tests.models import Pet, User
+from django_scoped_permissions.views import ScopedPermissionRequiredMixin
+
+try:
+    import rest_framework
+except ImportError:
+    rest_framework = None
+
+
+class InvoiceView(ScopedPermissionRequiredMixin, View):
+    permission_required = ScopedPermissionGuard(
+        scope="company:{kwargs.company_id}:invoice", verb="read"
+    )
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse("OK")
+
+
+class PetListView(ScopedPermissionRequiredMixin, ListView):
+    model = Pet
+    object_verb = "read"
+
+    def render_to_response(self, context, **response_kwargs):
+        return HttpResponse(
+            ",".join(str(pet.id) for pet in context["object_list"].order_by("id"))
+        )
+
+
+class UserDetailView(ScopedPermissionRequiredMixin, DetailView):
+    model = User
+    object_verb = "update"
+
+    def render_to_response(self, context, **response_kwargs):
+        return HttpResponse(str(self.object.id))
+
+
+class TestScopedPermissionRequiredMixin(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, view, user, **kwargs):
+        request = self.factory.get("/")
+        request.user = user
+
+        return view.as_view()(request, **kwargs)
+
+    def test__permission_required__is_checked_with_url_arguments(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("company:1:invoice")
+
+        self.assertEqual(b"OK", self.get(InvoiceView, user, company_id=1).content)
+
+        with self.assertRaises(PermissionDenied):
+            self.get(InvoiceView, user, company_id=2)
+
+        with self.assertRaises(PermissionDenied):
+            self.get(InvoiceView, AnonymousUser(), company_id=1)
+
+    def test__object_verb__filters_list_views(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("pet:read")
+        pets = PetFactory.create_batch(3)
+        other_user = UserFactory.create()
+        own_pet = PetFactory.create(user=other_user)
+
+        self.assertEqual(
+            ",".join(str(pet.id) for pet in pets + [own_pet]),
+            self.get(PetListView, user).content.decode(),
+        )
+        self.assertEqual(
+            str(own_pet.id), self.get(PetListView, other_user).content.decode()
+        )
+        self.assertEqual(b"", self.get(PetListView, AnonymousUser()).content)
+
+    def test__object_verb__denies_detail_views_without_access(self):
+        user = UserFactory.create()
+        other_user = UserFactory.create()
+
+        # Users can update themselves through their "user:<id>" scope
+        self.assertEqual(
+            str(user.id), self.get(UserDetailView, user, pk=user.id).content.decode()
+        )
+
+        with self.assertRaises(Http404):
+            self.get(UserDetailView, user, pk=other_user.id)
+
+        user.add_or_create_permission(f"user:{other_user.id}:update")
+        self.assertEqual(
+            str(other_user.id),
+            self.get(UserDetailView, user, pk=other_user.id).content.decode(),
+        )
+
+    def test__granting_scopes__are_shared_with_the_authentication_backend(self):
+        user = UserFactory.create()
+        user.add_or_create_permission("pet:read")
+        pet = PetFactory.create()
+
+        self.assertEqual(str(pet.id), self.get(PetListView, user).content.decode())
+
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                get_cached_granting_scopes(user).grants([f"pet:{pet.id}"], "read")
+            )
+            self.assertTrue(ScopedAuthenticationBackend().has_perm(user, "read", pet))
+
+        # Adding permissions clears the cache
+        user.add_or_create_permission("pet:update")
+        self.assertTrue(get_cached_granting_scopes(user).grants(["pet"], "update"))
+
+
+@skipIf(rest_framework is None, "Django REST framework is not installed")
+class TestRestFramework(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test__has_scoped_permissions__checks_view_and_object_permissions(self):
+        from django_scoped_permissions.rest_framework import HasScopedPermissions
+
+        class PetViewSet:
+            scoped_permissions = "pet:read"
+            kwargs = {}
+
+        user = UserFactory.create()
+        user.add_or_create_permission("pet:read")
+        pet = PetFactory.create()
+        permission = HasScopedPermissions()
+
+        request = self.factory.get("/")
+        request.user = user
+        self.assertTrue(permission.has_permission(request, PetViewSet()))
+        self.assertTrue(permission.has_object_permission(request, PetViewSet(), pet))
+
+        request = self.factory.delete("/")
+        request.user = user
+        self.assertFalse(permission.has_object_permission(request, PetViewSet(), pet))
+
+        request.user = AnonymousUser()
+        self.assertFalse(permission.has_permission(request, PetViewSet()))
+
+    def test__scoped_permission_filter_backend__filters_querysets(self):
+        from django_scoped_permissions.rest_framework import (
+            ScopedPermissionFilterBackend,
+        )
+
+        user = UserFactory.create()
+        user.add_or_create_permission("pet:update")
+        PetFactory.create_batch(2)
+        own_pet = PetFactory.create(user=user)
+        request = self.factory.get("/")
+        request.user = user
+
+        self.assertListEqual(
+            [own_pet],
+            list(
+                ScopedPermissionFilterBackend().filter_queryset(
+                    request, Pet.objects.all(), None
+                )
+            ),
+        )
@@ -0,0 +1,343 @@
+import base64
+import hashlib
+import json
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Sequence, Union
+
+import jwt
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+from django_scoped_permissions.core import GrantingScopeSet, partition_scopes
+from django_scoped_permissions.models import (
+    ScopedPermissionHolderMixin,
+    get_cached_granting_scopes,
+)
+
+SCOPES_CLAIM = "scp"
+TOKEN_KEY_SALT = "django_scoped_permissions.tokens"
+DEFAULT_TOKEN_LIFETIME = timedelta(minutes=15)
+
+_PREFIX_REGEX = re.compile(r"^(-?=?)(.*)$", re.DOTALL)
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+class ScopeTokenError(ValueError):
+    """
+    Raised when a scope token is invalid, expired, or its scopes cannot be decoded.
+    """
+
+
+def _is_subsumed(parts: List[str], by_parts: List[str]) -> bool:
+    """
+    Check whether every scope matched by the granting scope `parts` is also matched by `by_parts`,
+    see `scope_matches`.
+    """
+    return len(by_parts) <= len(parts) and all(
+        by_part == "*" or by_part == part for part, by_part in zip(parts, by_parts)
+    )
+
+
+def _without_subsumed(scopes: List[str], covering_scopes: List[str]) -> List[str]:
+    covering_parts = [
+        (scope, scope.lstrip("-").split(":"))
+        for scope in covering_scopes
+        if "{" not in scope
+    ]
+
+    result = []
+    for scope in scopes:
+        parts = scope.lstrip("-").split(":")
+        if "{" in scope or not any(
+            other != scope and _is_subsumed(parts, other_parts)
+            for other, other_parts in covering_parts
+        ):
+            result.append(scope)
+
+    return result
+
+
+def minimize_scopes(scopes: Iterable[str]) -> List[str]:
+    """
+    Remove the granting scopes which never change the outcome of `scopes_grant_permissions`:
+    duplicates, non-exact scopes which are matched by another non-exact scope of the same kind, e.g.
+    "company:1:invoice" next to "company:1", and including scopes matched by an excluding scope, e.g.
+    "company:1:invoice" next to "-company:1". Exact and templated scopes are kept as they are.
+    """
+    exclude_exact, include_exact, exclude, include = partition_scopes(
+        dict.fromkeys(scopes)
+    )
+
+    exclude = _without_subsumed(exclude, exclude)
+    include = _without_subsumed(include, exclude + include)
+
+    return exclude_exact + include_exact + exclude + include
+
+
+def _to_base36(number: int) -> str:
+    digits = ""
+    while True:
+        number, digit = divmod(number, 36)
+        digits = _DIGITS[digit] + digits
+        if not number:
+            return digits
+
+
+def _vocabulary_hash(vocabulary: Sequence[str]) -> str:
+    return hashlib.sha256("\n".join(vocabulary).encode()).hexdigest()[:16]
+
+
+def _compress(scopes: List[str]) -> dict:
+    """
+    Compress scopes with a dictionary of their parts, ordered by frequency. Each scope is written as its
+    prefix followed by the base 36 indices of its parts, e.g. "-company:1" as "-0.1".
+    """
+    split_scopes = []
+    for scope in scopes:
+        prefix, rest = _PREFIX_REGEX.match(scope).groups()
+        split_scopes.append((prefix, rest.split(":")))
+
+    counts = Counter(part for _, parts in split_scopes for part in parts)
+    dictionary = [part for part, _ in counts.most_common()]
+    indices = {part: index for index, part in enumerate(dictionary)}
+
+    return {
+        "p": dictionary,
+        "s": ",".join(
+            prefix + ".".join(_to_base36(indices[part]) for part in parts)
+            for prefix, parts in split_scopes
+        ),
+    }
+
+
+def _decompress(dictionary: List[str], encoded: str) -> List[str]:
+    scopes = []
+    for encoded_scope in encoded.split(","):
+        prefix, indices = _PREFIX_REGEX.match(encoded_scope).groups()
+        scopes.append(
+            prefix
+            + ":".join(dictionary[int(index, 36)] for index in indices.split("."))
+        )
+
+    return scopes
+
+
+def encode_scopes(scopes: Iterable[str], vocabulary: Sequence[str] = ()) -> dict:
+    """
+    Encode granting scopes into a compact claim.
+
+    Scopes in `vocabulary`, a sequence of scopes known to both the issuer and the readers of the claim,
+    are encoded as a bitset of their positions. Other scopes are compressed with a dictionary of their
+    parts, unless listing them as they are is shorter.
+    """
+    claim = {}
+    remaining = []
+
+    if vocabulary:
+        positions = {scope: index for index, scope in enumerate(vocabulary)}
+        bits = 0
+        for scope in scopes:
+            position = positions.get(scope)
+            if position is None:
+                remaining.append(scope)
+            else:
+                bits |= 1 << position
+
+        claim["h"] = _vocabulary_hash(vocabulary)
+        claim["b"] = (
+            base64.urlsafe_b64encode(
+                bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+            )
+            .rstrip(b"=")
+            .decode()
+        )
+    else:
+        remaining = list(scopes)
+
+    if remaining:
+        compressed = _compress(remaining)
+        if len(json.dumps(compressed)) < len(json.dumps(remaining)):
+            claim.update(compressed)
+        else:
+            claim["l"] = remaining
+
+    return claim
+
+
+def decode_scopes(claim: dict, vocabulary: Sequence[str] = ()) -> List[str]:
+    """
+    Decode the granting scopes of a claim created by `encode_scopes`, given the same vocabulary.
+    """
+    try:
+        scopes = []
+
+        if "b" in claim:
+            if claim.get("h") != _vocabulary_hash(vocabulary):
+                raise ScopeTokenError(
+                    "The scopes were encoded with a different vocabulary"
+                )
+
+            encoded_bits = claim["b"]
+            bits = int.from_bytes(
+                base64.urlsafe_b64decode(encoded_bits + "=" * (-len(encoded_bits) % 4)),
+                "little",
+            )
+            scopes.extend(
+                scope for index, scope in enumerate(vocabulary) if bits >> index & 1
+            )
+
+        if "s" in claim:
+            scopes.extend(_decompress(claim["p"], claim["s"]))
+
+        scopes.extend(claim.get("l", []))
+    except ScopeTokenError:
+        raise
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+        raise ScopeTokenError(f"Invalid scopes claim: {e}") from e
+
+    return scopes
+
+
+class ScopeTokenUser(ScopedPermissionHolderMixin):
+    """
+    The holder of a scope token. Its granting scopes are read from the token, so permission checks never
+    query the database.
+    """
+
+    is_active = True
+    is_anonymous = False
+    is_authenticated = True
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, payload: dict, granting_scopes: GrantingScopeSet):
+        self.payload = payload
+        self.pk = self.id = payload.get("sub")
+        self.granting_scopes = granting_scopes
+
+    def __str__(self):
+        return f"ScopeTokenUser({self.pk})"
+
+    def get_granting_scopes(self) -> GrantingScopeSet:
+        return self.granting_scopes
+
+    async def aget_granting_scopes(self) -> GrantingScopeSet:
+        return self.granting_scopes
+
+
+def get_token_key() -> str:
+    """
+    Get the default key of scope tokens: the SCOPED_PERMISSIONS_TOKEN_KEY setting if set, and otherwise a key
+    derived from SECRET_KEY with a salt. Tokens are never signed with SECRET_KEY itself.
+    """
+    key = getattr(settings, "SCOPED_PERMISSIONS_TOKEN_KEY", None)
+    if key:
+        return key
+
+    return salted_hmac(TOKEN_KEY_SALT, "key", algorithm="sha256").hexdigest()
+
+
+def create_scope_token(
+    holder_or_scopes: Union[ScopedPermissionHolderMixin, Iterable[str]],
+    key: Optional[str] = None,
+    algorithm: str = "HS256",
+    expires_in: timedelta = DEFAULT_TOKEN_LIFETIME,
+    vocabulary: Sequence[str] = (),
+    **claims,
+) -> str:
+    """
+    Create a signed JWT carrying the minimized granting scopes of a holder, or the given scopes, see
+    `minimize_scopes` and `encode_scopes`. The primary key of a holder is stored as the "sub" claim. Tokens
+    are signed with `get_token_key()` unless another key is given.
+
+    The scopes are fixed for the lifetime of the token, so keep `expires_in` short.
+    """
+    if isinstance(holder_or_scopes, ScopedPermissionHolderMixin):
+        scopes = holder_or_scopes.get_granting_scopes()
+        if getattr(holder_or_scopes, "pk", None) is not None:
+            claims.setdefault("sub", str(holder_or_scopes.pk))
+    else:
+        scopes = holder_or_scopes
+
+    now = datetime.now(timezone.utc)
+    payload = {
+        "iat": now,
+        "exp": now + expires_in,
+        **claims,
+        SCOPES_CLAIM: encode_scopes(minimize_scopes(scopes), vocabulary),
+    }
+
+    token = jwt.encode(payload, key or get_token_key(), algorithm=algorithm)
+
+    # PyJWT < 2 returns bytes
+    return token.decode() if isinstance(token, bytes) else token
+
+
+def read_scope_token(
+    token: str,
+    key: Optional[str] = None,
+    algorithms: Sequence[str] = ("HS256",),
+    vocabulary: Sequence[str] = (),
+) -> ScopeTokenUser:
+    """
+    Verify a token created by `create_scope_token`, and get its holder. Raises a ScopeTokenError if the
+    token is invalid or expired.
+    """
+    try:
+        payload = jwt.decode(token, key or get_token_key(), algorithms=list(algorithms))
+    except jwt.InvalidTokenError as e:
+        raise ScopeTokenError(f"Invalid scope token: {e}") from e
+
+    if not isinstance(payload.get(SCOPES_CLAIM), dict):
+        raise ScopeTokenError("The token has no scopes claim")
+
+    granting_scopes = GrantingScopeSet(decode_scopes(payload[SCOPES_CLAIM], vocabulary))
+
+    return ScopeTokenUser(payload, granting_scopes)
+
+
+class ScopeTokenMiddleware:
+    """
+    Middleware authenticating requests carrying a scope token in the Authorization header, e.g.
+    "Authorization: Bearer <token>". The request user becomes a ScopeTokenUser, and its granting scopes are
+    read from the token, and primed in the cache of `get_cached_granting_scopes`, without querying the
+    database. Requests with invalid or expired tokens are left as they are.
+
+    Subclasses may set `keyword`, `key`, `algorithms` and `vocabulary`, see `read_scope_token`.
+    """
+
+    keyword = "Bearer"
+    key = None  # type: Optional[str]
+    algorithms = ("HS256",)
+    vocabulary = ()  # type: Sequence[str]
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def get_token(self, request) -> Optional[str]:
+        keyword, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+        if keyword != self.keyword or not token:
+            return None
+
+        return token.strip()
+
+    def __call__(self, request):
+        token = self.get_token(request)
+
+        if token is not None:
+            try:
+                user = read_scope_token(
+                    token,
+                    key=self.key,
+                    algorithms=self.algorithms,
+                    vocabulary=self.vocabulary,
+                )
+            except ScopeTokenError:
+                pass
+            else:
+                request.user = user
+                get_cached_granting_scopes(user)
+
+        return self.get_response(request)
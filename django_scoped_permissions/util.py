@@ -1,11 +1,12 @@
 import itertools
 import re
+from functools import lru_cache
 from graphql import GraphQLError
-from typing import Mapping, Iterable, Union, List
+from promise import Promise
+from promise.dataloader import DataLoader
+from typing import Mapping, Iterable, Union, List, Sequence, Iterator, Callable
 
-from django_scoped_permissions.models import ScopedModel
-
-from pydash import get
+from django_scoped_permissions.models import ScopedModel, get_cached_granting_scopes
 
 
 def create_resolver_from_method(field_name, method):
@@ -18,127 +19,520 @@ def create_resolver_from_method(field_name, method):
     return resolver
 
 
-def create_resolver_from_scopes(field_name: str, permissions: Union[List[str], "ScopedPermissionGuard"]):
-    from django_scoped_permissions.guards import ScopedPermissionGuard
+FIELD_PERMISSION_LOADER_ATTRIBUTE = "_scoped_field_permission_loader"
 
-    permission_guard = ScopedPermissionGuard(permissions)
 
-    def resolver(object, info, **args):
-        user = info.context.user
+def _get_base_scopes(value) -> List[str]:
+    if not isinstance(value, ScopedModel):
+        return [""]
 
-        field_value = getattr(object, field_name, None)
+    return value.get_base_scopes()
 
-        field_value_is_scoped_model = isinstance(field_value, ScopedModel)
-        object_is_scoped_model = isinstance(object, ScopedModel)
 
-        field_value_base_scopes = [""]
-        object_base_scopes = [""]
+def get_field_permission_context(
+    object, field_name: str, get_base_scopes: Callable = _get_base_scopes
+) -> dict:
+    """
+    Create the context in which the field permissions of a field of an object are checked.
+    """
+    field_value_base_scopes = get_base_scopes(getattr(object, field_name, None))
 
-        context = {}
+    return {
+        # Deprecated
+        "base_scopes": field_value_base_scopes,
+        "required_scopes": field_value_base_scopes,
+        "field_scopes": get_base_scopes(object),
+    }
 
-        if field_value_is_scoped_model:
-            field_value_base_scopes = field_value.get_base_scopes()
 
-        if object_is_scoped_model:
-            object_base_scopes = object.get_base_scopes()
+class FieldPermissionLoader(DataLoader):
+    """
+    FieldPermissionLoader batches the field permission checks of a request, see `create_resolver_from_scopes`.
 
-        # Deprecated
-        context["base_scopes"] = field_value_base_scopes
-        context["required_scopes"] = field_value_base_scopes
-        context["field_scopes"] = object_base_scopes
-
-        granting_permissions = (
-            user.get_granting_scopes()
-            if hasattr(user, "get_granting_scopes")
-            else []
-        )
+    Keys are (guard, field_name, object) tuples. The pending checks are grouped by guard, and decided with
+    a single call to `has_permission_many` per guard. The granting scopes of the user are resolved once, see
+    `get_cached_granting_scopes`, and the base scopes of every object once per batch.
+    """
+
+    # Decisions are memoized in the PermissionCache of the request instead
+    cache = False
+
+    def __init__(self, request):
+        super().__init__()
+        self.request = request
+
+    def batch_load_fn(self, keys):
+        from django_scoped_permissions.compiler import get_permission_cache
+
+        granting_scopes = get_cached_granting_scopes(self.request.user)
+        cache = get_permission_cache(self.request)
+
+        # Keyed by id, holding on to the value to keep the id unique during the batch
+        base_scopes = {}
+
+        def get_base_scopes(value):
+            try:
+                return base_scopes[id(value)][1]
+            except KeyError:
+                scopes = _get_base_scopes(value)
+                base_scopes[id(value)] = (value, scopes)
+                return scopes
 
-        if not permission_guard.has_permission(granting_permissions, context=context):
+        indexes_by_guard = {}
+        for index, (guard, _, _) in enumerate(keys):
+            indexes_by_guard.setdefault(guard, []).append(index)
+
+        results = [False] * len(keys)
+        for guard, indexes in indexes_by_guard.items():
+            contexts = []
+            for index in indexes:
+                _, field_name, object = keys[index]
+                contexts.append(
+                    get_field_permission_context(object, field_name, get_base_scopes)
+                )
+
+            decisions = guard.has_permission_many(
+                granting_scopes, contexts, cache=cache
+            )
+            for index, decision in zip(indexes, decisions):
+                results[index] = decision
+
+        return Promise.resolve(results)
+
+
+def get_field_permission_loader(request) -> FieldPermissionLoader:
+    """
+    Get the FieldPermissionLoader of a request, e.g. `info.context` in GraphQL resolvers, creating it on
+    first access. Requests which do not accept attributes get a new loader on every call.
+    """
+    loader = getattr(request, FIELD_PERMISSION_LOADER_ATTRIBUTE, None)
+    if isinstance(loader, FieldPermissionLoader):
+        return loader
+
+    loader = FieldPermissionLoader(request)
+    try:
+        setattr(request, FIELD_PERMISSION_LOADER_ATTRIBUTE, loader)
+    except AttributeError:
+        pass
+
+    return loader
+
+
+def has_field_permission(guard, field_name: str, object, info) -> bool:
+    """
+    Check the field permissions of a field of an object right away, with the cached granting scopes of the
+    user, see `get_cached_granting_scopes`.
+    """
+    from django_scoped_permissions.compiler import get_permission_cache
+
+    return guard.has_permission(
+        get_cached_granting_scopes(info.context.user),
+        get_field_permission_context(object, field_name),
+        cache=get_permission_cache(info.context),
+    )
+
+
+def create_resolver_from_scopes(
+    field_name: str,
+    permissions: Union[List[str], "ScopedPermissionGuard"],
+    batched: bool = False,
+):
+    """
+    Create a resolver which returns the value of a field if the user passes the permissions.
+
+    If `batched` is set, the resolver returns a Promise instead, and the checks of all guarded fields
+    resolved in the same pass are batched, see FieldPermissionLoader.
+    """
+    from django_scoped_permissions.guards import ScopedPermissionGuard
+
+    permission_guard = ScopedPermissionGuard(permissions).compile()
+
+    def resolve(object, has_permission):
+        if not has_permission:
             raise GraphQLError("You are not permitted to view this.")
 
-        return field_value
+        return getattr(object, field_name, None)
 
-    return resolver
+    if not batched:
+
+        def resolver(object, info, **args):
+            return resolve(
+                object, has_field_permission(permission_guard, field_name, object, info)
+            )
+
+        return resolver
+
+    def batched_resolver(object, info, **args):
+        return (
+            get_field_permission_loader(info.context)
+            .load((permission_guard, field_name, object))
+            .then(lambda has_permission: resolve(object, has_permission))
+        )
+
+    return batched_resolver
 
 
 def expand_scopes(
     scopes: Iterable[str], expansion_map: Mapping[str, Iterable[str]] = None
-) -> Iterable[str]:
-    if expansion_map is None or len(list(expansion_map.values())) == 0:
-        return scopes
+) -> List[str]:
+    """
+    Interpolate the variables of the expansion map into the scopes. Variables mapping to
+    multiple values yield one scope per value. See `iter_expand_scopes` for a lazy variant.
+    """
+    return list(iter_expand_scopes(scopes, expansion_map))
 
-    # First get all keys of the expansion map.
-    keys = list(expansion_map.keys())
 
-    values = expansion_map.values()
+def iter_expand_scopes(
+    scopes: Iterable[str], expansion_map: Mapping[str, Iterable[str]] = None
+) -> Iterator[str]:
+    """
+    Lazily generate the scopes of `expand_scopes`, without duplicates, which allows consumers to stop
+    as soon as they have found what they are looking for.
 
-    # Now create the cartesian product of all expansion values
-    product = itertools.product(*values)
+    Every scope is only expanded over the variables it references itself, so a variable with
+    many values does not multiply the work done for any other scope.
+    """
+    if expansion_map is None or len(expansion_map) == 0:
+        return iter(scopes)
 
-    final_scopes = set()
+    return _generate_expanded_scopes(scopes, expansion_map)
 
-    # Brilliant, so now we have all the keys, and all the possible permutations of their
-    # values. We can now create all the final interpolated scopes
-    for permutation in product:
-        # Construct the expansion map for this permutation
-        permutation_expansion_map = {keys[i]: permutation[i] for i in range(len(keys))}
 
-        for scope in scopes:
-            final_scopes.add(scope.format(**permutation_expansion_map))
+def _generate_expanded_scopes(
+    scopes: Iterable[str], expansion_map: Mapping[str, Iterable[str]]
+):
+    seen = set()
 
-    return list(final_scopes)
+    for scope in scopes:
+        # The unique variables of this scope, in order of appearance
+        variables = list(
+            dict.fromkeys(match[1:-1] for match in scope_variable_regex.findall(scope))
+        )
+
+        if not variables:
+            expanded_scopes = (scope,)
+        else:
+            # Now create the cartesian product of the values of this scope's variables only
+            expanded_scopes = (
+                scope.format(**dict(zip(variables, permutation)))
+                for permutation in itertools.product(
+                    *(expansion_map[variable] for variable in variables)
+                )
+            )
+
+        for expanded_scope in expanded_scopes:
+            if expanded_scope not in seen:
+                seen.add(expanded_scope)
+                yield expanded_scope
 
 
 scope_variable_regex = re.compile("{[^{}]+}")
 
 
-def expand_scopes_from_context(scopes: Iterable[str], context):
+class ScopeTemplate:
+    """
+    ScopeTemplate is a scope parsed into its literal parts and its variables. For instance, the scope
+    "company:{input.company}:user:{user.id}" is parsed into the literals "company:", ":user:" and "",
+    and the variables "input.company" and "user.id".
+
+    Parsing happens once, after which expanding the template is a plain join over the
+    precomputed parts. Templates without variables are static, and expand to the scope itself.
+    """
+
+    def __init__(self, scope: str):
+        self.scope = scope
+
+        literals = []
+        slots = []
+        variables = []
+        position = 0
+
+        for match in scope_variable_regex.finditer(scope):
+            variable = match.group(0)[1:-1]
+            if variable not in variables:
+                variables.append(variable)
+
+            literals.append(scope[position : match.start()])
+            slots.append(variables.index(variable))
+            position = match.end()
+
+        literals.append(scope[position:])
+
+        self.variables = tuple(variables)
+        self.is_static = len(self.variables) == 0
+        self._literals = tuple(literals)
+        self._slots = tuple(slots)
+
+    def render(self, values: Sequence[str]) -> str:
+        """
+        Render the template with one string value per variable, in the order of `variables`.
+        """
+        literals = self._literals
+        result = literals[0]
+
+        for index, slot in enumerate(self._slots):
+            result += values[slot] + literals[index + 1]
+
+        return result
+
+    def expand(self, context) -> Iterator[str]:
+        """
+        Lazily generate the scopes of the template, with values extracted from the context.
+        Variables with multiple values yield one scope per value.
+
+        The context may be a ContextValues, in which case already resolved values are reused.
+        """
+        if self.is_static:
+            yield self.scope
+            return
+
+        values = ContextValues.coerce(context)
+        value_lists = [values.get_strings(variable) for variable in self.variables]
+
+        for permutation in itertools.product(*value_lists):
+            yield self.render(permutation)
+
+    def __repr__(self):
+        return f"ScopeTemplate({self.scope!r})"
+
+
+@lru_cache(maxsize=4096)
+def get_scope_template(scope: str) -> ScopeTemplate:
+    """
+    Get the parsed ScopeTemplate of a scope. Parsed templates are cached.
+    """
+    return ScopeTemplate(scope)
+
+
+def expand_scope_templates(
+    templates: Iterable[ScopeTemplate], context
+) -> Iterator[str]:
+    """
+    Lazily expand a number of templates from a context, without duplicates. Every context variable
+    is resolved at most once, even if it is referenced by several templates.
+    """
+    values = ContextValues.coerce(context)
+    seen = set()
+
+    for template in templates:
+        if template.is_static:
+            # Static scopes are passed straight through
+            scope = template.scope
+            if scope not in seen:
+                seen.add(scope)
+                yield scope
+            continue
+
+        for scope in template.expand(values):
+            if scope not in seen:
+                seen.add(scope)
+                yield scope
+
+
+def expand_scopes_from_context(scopes: Iterable[str], context) -> List[str]:
     """
     Takes a context object, and expands all scopes. The context object may contain nested dictionaries,
     or other object types.
 
-    To extract the relevant fields from the context, we use pydash.get.
+    To extract the relevant fields from the context, every variable path is compiled into a
+    ContextAccessor, see `get_context_accessor`.
 
     This method is used to inject appropriate variables into the scope strings. Suppose for instance
     that we have the scope "facilities:{input.facility}:create". The idea here is that we should take
     the input as a context-parameter, and inject the "facility" field into the scope.
 
-    Before sending the variables and scopes to the "expand_scopes" helper method, we translate all
-    dots to double underscores. This is to please the str.format method, which attempts to do
-    magic itself when getting variables with dots. Using variables with double underscores
-    directly in the scopes sent to this method should be unproblematic, but may lead to undefined behaviour.
+    Every scope is parsed into a ScopeTemplate, see `get_scope_template`, and expanded from its
+    parts. Scopes without variables are returned as-is.
 
     Also note that some variables may have multiple target values. This is the case for the magic variable
     {base_scopes}, which can be used for mutations and queries where a singular object of type ScopedModel
     is supplied. This is the case for DjangoPatchMutation, DjangoUpdateMutation and DjangoScopedNode.
 
+    See `iter_expand_scopes_from_context` for a lazy variant.
+
     :param scopes:
     :param context:
     :return:
     """
+    return list(iter_expand_scopes_from_context(scopes, context))
 
-    # First we extract all the variable strings we need to attend to. We prefetch them here, so we
-    # can extract them from the context
-    variable_strings = []
-    new_scopes = []
 
-    for scope in scopes:
-        matches = scope_variable_regex.findall(scope)
-        for match in matches:
-            variable_strings.append(match[1:-1])
-
-        # We translate dots to double underscores here. This is to please
-        # the str.format function, as it itself tries to do some magic
-        # when receiving dotted variables.
-        new_scopes.append(scope.replace(".", "__"))
-
-    extracted_context_values = {
-        # We replace the double underscores here as well, so the lookups match
-        variable.replace(".", "__"): _overload_context_variable(get(context, variable))
-        for variable in variable_strings
-    }
+def iter_expand_scopes_from_context(scopes: Iterable[str], context) -> Iterator[str]:
+    """
+    Lazily generate the scopes of `expand_scopes_from_context`, without duplicates.
+    """
+    return expand_scope_templates(
+        (get_scope_template(scope) for scope in scopes), context
+    )
+
+
+_MISSING = object()
+
+
+def _get_dict_item(key: str, index):
+    def get_dict_item(obj):
+        value = obj.get(key, _MISSING)
+        if value is _MISSING and index is not None:
+            value = obj.get(index, _MISSING)
+        return value
+
+    return get_dict_item
+
+
+def _get_item(key: str, index):
+    def get_item(obj):
+        try:
+            return obj[key]
+        except Exception:
+            pass
+
+        if index is not None:
+            try:
+                return obj[index]
+            except Exception:
+                pass
+
+        return _MISSING
+
+    return get_item
+
+
+def _get_attribute(key: str):
+    def get_attribute(obj):
+        try:
+            return getattr(obj, key)
+        except Exception:
+            return _MISSING
+
+    return get_attribute
+
+
+def _get_item_or_attribute(key: str, index):
+    get_item = _get_item(key, index)
+    get_attribute = _get_attribute(key)
+
+    def get_item_or_attribute(obj):
+        value = get_item(obj)
+        if value is _MISSING:
+            value = get_attribute(obj)
+        return value
+
+    return get_item_or_attribute
+
+
+def _select_getter(obj_type: type, key: str, index) -> Callable:
+    """
+    Select the getter of a single path key for objects of a type.
+    """
+    # Dictionaries, including graphene input objects and addict dictionaries. Like with pydash.get,
+    # the attributes of dictionaries and sequences are never looked up.
+    if issubclass(obj_type, dict):
+        return _get_dict_item(key, index)
+
+    # Namedtuples may be accessed by attribute
+    if issubclass(obj_type, tuple) and hasattr(obj_type, "_fields"):
+        return _get_item_or_attribute(key, index)
+
+    if issubclass(obj_type, (Mapping, Sequence)):
+        return _get_item(key, index)
+
+    # Objects without item access, such as model instances, only support attributes
+    if not hasattr(obj_type, "__getitem__"):
+        return _get_attribute(key)
+
+    return _get_item_or_attribute(key, index)
+
+
+class ContextAccessor:
+    """
+    ContextAccessor is a context variable path, e.g. "input.facility" or "input.facilities.0",
+    compiled into a chain of getters. Lookups follow the semantics of pydash.get: dictionaries
+    and sequences are accessed by item, other objects by item or attribute.
+
+    The getter of every key is selected by the type of the object it is applied to, and kept
+    for subsequent objects of the same type, so repeated lookups skip the type dispatch.
+    Missing keys and attributes resolve to None.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._keys = tuple(
+            (key, int(key) if key.isdigit() else None)
+            for key in path.replace("[", ".").replace("]", "").split(".")
+            if key
+        )
+        self._getters = tuple({} for _ in self._keys)
+
+    def __call__(self, context):
+        value = context
+
+        for (key, index), getters in zip(self._keys, self._getters):
+            value_type = type(value)
+            getter = getters.get(value_type)
+            if getter is None:
+                getter = getters[value_type] = _select_getter(value_type, key, index)
+
+            value = getter(value)
+            if value is _MISSING:
+                return None
+
+        return value
+
+    def __repr__(self):
+        return f"ContextAccessor({self.path!r})"
+
+
+@lru_cache(maxsize=4096)
+def get_context_accessor(path: str) -> ContextAccessor:
+    """
+    Get the compiled ContextAccessor of a context variable path. Accessors are cached.
+    """
+    return ContextAccessor(path)
+
+
+class ContextValues:
+    """
+    ContextValues resolves the variables of a context, caching every resolved value. It is created for
+    a single evaluation, during which the context is assumed not to change, so that a variable
+    referenced by several scopes, such as {input.facility}, is only looked up once.
+    """
 
-    return expand_scopes(new_scopes, extracted_context_values)
+    __slots__ = ("context", "_values", "_strings")
+
+    def __init__(self, context):
+        self.context = context
+        self._values = {}
+        self._strings = {}
+
+    @classmethod
+    def coerce(cls, context) -> "ContextValues":
+        if isinstance(context, ContextValues):
+            return context
+        return cls(context)
+
+    def get(self, variable: str):
+        """
+        Get the value of a context variable, or None if it does not exist.
+        """
+        try:
+            return self._values[variable]
+        except KeyError:
+            value = self._values[variable] = get_context_accessor(variable)(
+                self.context
+            )
+            return value
+
+    def get_strings(self, variable: str) -> List[str]:
+        """
+        Get the values of a context variable as strings, for interpolation into scopes.
+        """
+        try:
+            return self._strings[variable]
+        except KeyError:
+            strings = self._strings[variable] = [
+                str(value) for value in _overload_context_variable(self.get(variable))
+            ]
+            return strings
 
 
 def _overload_context_variable(variable):
@@ -0,0 +1,85 @@
+from typing import Optional
+
+from django.contrib.auth.mixins import AccessMixin
+
+from django_scoped_permissions.compiler import (
+    CompiledScopedPermissionGuard,
+    get_permission_cache,
+)
+from django_scoped_permissions.guards import ScopedPermissionGuard
+from django_scoped_permissions.models import get_cached_granting_scopes
+from django_scoped_permissions.querysets import filter_permitted
+
+
+def compile_permission_guard(
+    permissions,
+) -> Optional[CompiledScopedPermissionGuard]:
+    """
+    Compile the permissions of a view, i.e. anything a ScopedPermissionGuard takes as its argument.
+    """
+    if permissions is None:
+        return None
+
+    return ScopedPermissionGuard(permissions).compile()
+
+
+class ScopedPermissionRequiredMixin(AccessMixin):
+    """
+    ScopedPermissionRequiredMixin is the class-based view counterpart of `function_has_scoped_permissions`.
+
+    The user must satisfy `permission_required`, a scope or a ScopedPermissionGuard, which is compiled once per
+    view class. Besides `user` and `context`, the guard may reference the URL arguments of the view as
+    `kwargs`, e.g. "company:{kwargs.company_id}:invoice". The granting scopes of the user are resolved once,
+    see `get_cached_granting_scopes`.
+
+    If `object_verb` is set, `get_queryset` is filtered down to the objects the user can access with the
+    verb. Detail views thus respond with 404 for objects the user has no access to.
+    """
+
+    permission_required = None
+    object_verb = None  # type: Optional[str]
+
+    _permission_guard = None  # type: Optional[CompiledScopedPermissionGuard]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._permission_guard = compile_permission_guard(cls.permission_required)
+
+    def get_permission_context(self) -> dict:
+        return {
+            "context": self.request,
+            "user": self.request.user,
+            "kwargs": self.kwargs,
+        }
+
+    def has_permission(self) -> bool:
+        if self._permission_guard is None:
+            return True
+
+        user = self.request.user
+        if not user or user.is_anonymous:
+            return False
+
+        return self._permission_guard.has_permission(
+            get_cached_granting_scopes(self.request.user),
+            self.get_permission_context(),
+            cache=get_permission_cache(self.request),
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.has_permission():
+            return self.handle_no_permission()
+
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.object_verb is None:
+            return queryset
+
+        return filter_permitted(
+            queryset,
+            self.request.user,
+            self.object_verb,
+            granting_scopes=get_cached_granting_scopes(self.request.user),
+        )